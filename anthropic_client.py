@@ -0,0 +1,166 @@
+"""
+Shared Anthropic clients for the whole app.
+
+Every Claude call goes through get_client() (or get_async_client() on the
+async serving path), so all of them share one HTTP
+connection pool and keep connections alive between interview turns instead of
+repeating the TCP and TLS handshakes on every request. Pool size, keep-alive,
+timeouts and retries are read from the environment when the client is first
+built:
+
+    ANTHROPIC_MAX_CONNECTIONS      most open connections (default 20)
+    ANTHROPIC_MAX_KEEPALIVE        most idle connections kept open (default 10)
+    ANTHROPIC_KEEPALIVE_EXPIRY     seconds an idle connection is kept (default 60)
+    ANTHROPIC_CONNECT_TIMEOUT      seconds to establish a connection (default 5)
+    ANTHROPIC_TIMEOUT              seconds to wait for a response (default 120)
+    ANTHROPIC_MAX_RETRIES          retries of failed requests (default 3)
+
+Variables missing from the environment are also looked up in .env.local at
+that point. The SDK itself is only imported when a client is built, so
+importing the modules that make Claude calls stays cheap.
+"""
+import os
+import threading
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    import anthropic
+
+_client: Optional["anthropic.Anthropic"] = None
+_async_client: Optional["anthropic.AsyncAnthropic"] = None
+_client_lock = threading.Lock()
+
+
+def build_client(api_key: Optional[str] = None,
+                 base_url: Optional[str] = None,
+                 max_connections: int = 20,
+                 max_keepalive_connections: int = 10,
+                 keepalive_expiry: float = 60.0,
+                 connect_timeout: float = 5.0,
+                 timeout: float = 120.0,
+                 max_retries: int = 3) -> "anthropic.Anthropic":
+    """
+    Build an Anthropic client with its own connection pool.
+    
+    Failed requests (connection errors, 408, 409, 429 and 5xx responses) are
+    retried up to max_retries times with the SDK's capped exponential backoff,
+    honouring retry-after headers.
+    
+    Args:
+        api_key: API key (defaults to ANTHROPIC_API_KEY)
+        base_url: API URL (defaults to ANTHROPIC_BASE_URL or the public API)
+        max_connections: Most connections open at once
+        max_keepalive_connections: Most idle connections kept open for reuse
+        keepalive_expiry: Seconds an idle connection is kept open
+        connect_timeout: Seconds to wait for a connection
+        timeout: Seconds to wait for a response
+        max_retries: Retries of a failed request
+        
+    Returns:
+        The client
+    """
+    import anthropic
+    import httpx
+    http_client = anthropic.DefaultHttpxClient(
+        limits=httpx.Limits(max_connections=max_connections,
+                            max_keepalive_connections=max_keepalive_connections,
+                            keepalive_expiry=keepalive_expiry),
+        timeout=httpx.Timeout(timeout, connect=connect_timeout),
+    )
+    return anthropic.Anthropic(
+        api_key=api_key or os.environ.get("ANTHROPIC_API_KEY"),
+        base_url=base_url or os.environ.get("ANTHROPIC_BASE_URL") or None,
+        http_client=http_client,
+        timeout=httpx.Timeout(timeout, connect=connect_timeout),
+        max_retries=max_retries,
+    )
+
+
+def build_async_client(api_key: Optional[str] = None,
+                       base_url: Optional[str] = None,
+                       max_connections: int = 20,
+                       max_keepalive_connections: int = 10,
+                       keepalive_expiry: float = 60.0,
+                       connect_timeout: float = 5.0,
+                       timeout: float = 120.0,
+                       max_retries: int = 3) -> "anthropic.AsyncAnthropic":
+    """Async counterpart of build_client(), taking the same arguments."""
+    import anthropic
+    import httpx
+    http_client = anthropic.DefaultAsyncHttpxClient(
+        limits=httpx.Limits(max_connections=max_connections,
+                            max_keepalive_connections=max_keepalive_connections,
+                            keepalive_expiry=keepalive_expiry),
+        timeout=httpx.Timeout(timeout, connect=connect_timeout),
+    )
+    return anthropic.AsyncAnthropic(
+        api_key=api_key or os.environ.get("ANTHROPIC_API_KEY"),
+        base_url=base_url or os.environ.get("ANTHROPIC_BASE_URL") or None,
+        http_client=http_client,
+        timeout=httpx.Timeout(timeout, connect=connect_timeout),
+        max_retries=max_retries,
+    )
+
+
+def _settings_from_env() -> dict:
+    from dotenv import load_dotenv
+    load_dotenv(dotenv_path=".env.local")
+    return {
+        "max_connections": int(os.environ.get("ANTHROPIC_MAX_CONNECTIONS", 20)),
+        "max_keepalive_connections": int(os.environ.get("ANTHROPIC_MAX_KEEPALIVE", 10)),
+        "keepalive_expiry": float(os.environ.get("ANTHROPIC_KEEPALIVE_EXPIRY", 60)),
+        "connect_timeout": float(os.environ.get("ANTHROPIC_CONNECT_TIMEOUT", 5)),
+        "timeout": float(os.environ.get("ANTHROPIC_TIMEOUT", 120)),
+        "max_retries": int(os.environ.get("ANTHROPIC_MAX_RETRIES", 3)),
+    }
+
+
+def client_from_env() -> "anthropic.Anthropic":
+    """Build a client configured by the ANTHROPIC_* environment variables."""
+    return build_client(**_settings_from_env())
+
+
+def async_client_from_env(**overrides) -> "anthropic.AsyncAnthropic":
+    """Build an async client configured by the ANTHROPIC_* environment variables and any overrides."""
+    return build_async_client(**{**_settings_from_env(), **overrides})
+
+
+def get_client() -> "anthropic.Anthropic":
+    """Return the process-wide client, building it on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = client_from_env()
+    return _client
+
+
+def get_async_client() -> "anthropic.AsyncAnthropic":
+    """
+    Return the process-wide async client, building it on first use.
+    
+    The client's connection pool belongs to the event loop it is first used
+    on, so it should only be used from the server's loop.
+    """
+    global _async_client
+    if _async_client is None:
+        with _client_lock:
+            if _async_client is None:
+                _async_client = async_client_from_env()
+    return _async_client
+
+
+def set_async_client(client: "anthropic.AsyncAnthropic") -> None:
+    """Make client the process-wide async client, for tools that need other settings than the environment's."""
+    global _async_client
+    with _client_lock:
+        _async_client = client
+
+
+def reset_client() -> None:
+    """Close the shared client so the next get_client() builds a new one from the environment."""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = None
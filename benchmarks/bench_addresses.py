@@ -0,0 +1,76 @@
+"""
+Micro-benchmark for address detection on multi-page resumes.
+
+Compares redactr.detect_addresses with the previous approach, which ran
+pyap.parse six times per document and re-searched the original text with a
+fresh regex for every hit.
+
+    python -m benchmarks.bench_addresses --pages 1 3 10 --repeat 5
+"""
+import argparse
+import re
+import statistics
+import time
+from typing import Callable, List
+
+import pyap
+
+import redactr
+from benchmarks.corpus import locate, make_resume
+
+
+def legacy_detect_addresses(text: str) -> List[redactr.Span]:
+    """The address stage as it was before the offset map."""
+    spans = []
+    normalized_text = re.sub(r'[^\w\s,.]', ' ', text)
+    for country in ["US", "CA", "GB"]:
+        for process_text in [normalized_text, normalized_text.title()]:
+            for address in pyap.parse(process_text, country=country):
+                original_address = _legacy_find_original_address(text, address.full_address)
+                if original_address:
+                    pattern = re.escape(original_address)
+                    spans.extend((match.start(), match.end(), "ADDRESS")
+                                 for match in re.finditer(pattern, text))
+    return spans
+
+
+def _legacy_find_original_address(original_text, normalized_address):
+    parts = re.split(r'[\s,]+', normalized_address)
+    pattern = r'[^\w]*'.join(re.escape(part) for part in parts if part)
+    matches = re.search(pattern, original_text, re.IGNORECASE)
+    if matches:
+        return matches.group(0)
+    return None
+
+
+def time_detector(detector: Callable[[str], List[redactr.Span]], text: str, repeat: int) -> float:
+    """Median wall time of a detector over a text, in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        detector(text)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 3, 10])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'pages':>5} {'chars':>8} {'before ms':>10} {'after ms':>10} {'speedup':>8} {'found':>6}")
+    for page_count in args.pages:
+        resume = make_resume(page_count)
+        text = resume.text
+        before = time_detector(legacy_detect_addresses, text, args.repeat)
+        after = time_detector(redactr.detect_addresses, text, args.repeat)
+        expected = [span for span in locate(text, resume.planted) if span[2] == "ADDRESS"]
+        found = redactr.merge_spans(redactr.detect_addresses(text))
+        covered = sum(any(start <= s and e <= end for start, end, _label in found) for s, e, _label in expected)
+        print(f"{page_count:>5} {len(text):>8} {before:>10.1f} {after:>10.1f} "
+              f"{before / after:>7.1f}x {covered:>3}/{len(expected)}")
+
+
+if __name__ == "__main__":
+    main()
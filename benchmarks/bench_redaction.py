@@ -0,0 +1,322 @@
+"""
+Speed, memory and accuracy benchmark for redactr on synthetic resume PDFs.
+
+Renders resumes with planted personal information (see corpus.py) to PDFs of
+several page counts, then times redact_pdf end to end and each stage on its
+own: text extraction, NER, and the name, email, phone and address detectors.
+For every page count it reports wall time per document, the peak Python heap
+(tracemalloc) of each stage, documents per second through redact_pdf, and
+recall and precision of the detectors against the planted information.
+
+    python -m benchmarks.bench_redaction --pages 1 3 10 --docs 5 --output results.json
+    python -m benchmarks.bench_redaction --baseline results.json
+
+--name-detector picks how names are found (see redactr.NAME_DETECTORS); given
+more than once, the corpus is benchmarked with each and a docs/sec and name
+recall comparison is printed at the end. The NER stage is only timed for
+"ner", the one detector that parses the whole text. Every name in the corpus
+is in the shipped name lists, so "gazetteer" and "hybrid" are also scored as
+"names_unlisted": the same detector with the corpus's names removed from the
+lists, which is how it does on names the lists don't know.
+
+With --baseline the run exits with status 1 if throughput fell by more than
+--max-slowdown or recall fell by more than --max-recall-drop for any page
+count, so it can gate changes in CI.
+"""
+import argparse
+import io
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Sequence
+
+import redactr
+from benchmarks.corpus import FIRST_NAMES, SURNAMES, locate, make_resume
+from benchmarks.pdf_writer import render_pdf
+from name_gazetteer import NameGazetteer
+
+# Detector stages and the label of the planted information each one is scored on
+DETECTORS = {
+    "names": ("PERSON", lambda text, doc: redactr.detect_names(text, doc)),
+    "emails": ("EMAIL", lambda text, doc: redactr.detect_email_addresses(text)),
+    "phones": ("PHONE", lambda text, doc: redactr.detect_phone_numbers(text)),
+    "addresses": ("ADDRESS", lambda text, doc: redactr.merge_spans(redactr.detect_addresses(text))),
+}
+
+
+def detectors_for(name_detector: str, spacy_model_name: str) -> Dict[str, Any]:
+    """
+    DETECTORS with the names stage running the given name detector, plus a
+    names_unlisted stage for the list-based detectors.
+    """
+    if name_detector == "ner":
+        return DETECTORS
+    nlp = redactr.get_nlp(spacy_model_name) if name_detector == "hybrid" else None
+    unlisted = NameGazetteer.from_directory(exclude=FIRST_NAMES + SURNAMES)
+    return dict(DETECTORS,
+                names=("PERSON", lambda text, doc: redactr.detect_names_fast(text, nlp=nlp)),
+                names_unlisted=("PERSON", lambda text, doc: redactr.detect_names_fast(text, nlp=nlp,
+                                                                                     gazetteer=unlisted)))
+
+
+class Document:
+    """A synthetic resume, its PDF and the results of the stages that feed later ones."""
+
+    def __init__(self, page_count: int, seed: int):
+        self.resume = make_resume(page_count, seed)
+        self.pdf_bytes = render_pdf(self.resume.pages)
+        self.text = ""
+        self.doc = None
+
+
+def run_benchmark(page_counts: Sequence[int], docs: int, repeat: int,
+                  spacy_model_name: str = redactr.DEFAULT_SPACY_MODEL,
+                  name_detector: str = "ner") -> Dict[str, Any]:
+    """
+    Benchmark every stage on a corpus of each page count.
+
+    Args:
+        page_counts: Page counts of the generated resumes
+        docs: Number of resumes (different seeds) per page count
+        repeat: Timing runs per stage; the median is reported
+        spacy_model_name: Name or path of the spaCy model to use for NER
+        name_detector: How redact_pdf finds names, one of redactr.NAME_DETECTORS
+
+    Returns:
+        JSON-serialisable results, keyed by page count
+    """
+    # "gazetteer" runs without spaCy, so only the other detectors load a model
+    redactr.warmup(redactr.spacy_models_for(name_detector, spacy_model_name))
+    detectors = detectors_for(name_detector, spacy_model_name)
+
+    results = {}
+    for page_count in page_counts:
+        documents = [Document(page_count, seed) for seed in range(docs)]
+
+        def extract(document):
+            document.text = redactr.extract_text_from_pdf(io.BytesIO(document.pdf_bytes))
+
+        def ner(document):
+            document.doc = redactr.get_nlp(spacy_model_name)(document.text)
+
+        def redact(document):
+            redactr.redact_pdf(document.pdf_bytes, spacy_model_name, cache=None, name_detector=name_detector)
+
+        # Extraction and NER run first, since the detectors need their output
+        stages = {"extract": extract}
+        if name_detector == "ner":
+            stages["ner"] = ner
+        for stage_name, (_label, detector) in detectors.items():
+            stages[stage_name] = lambda document, detector=detector: detector(document.text, document.doc)
+        stages["redact_pdf"] = redact
+
+        stage_results = {name: measure_stage(stage, documents, repeat) for name, stage in stages.items()}
+        redact_seconds = stage_results["redact_pdf"]["seconds"]
+        results[str(page_count)] = {
+            "docs": docs,
+            "chars_per_doc": statistics.mean(len(document.text) for document in documents),
+            "docs_per_sec": docs / redact_seconds if redact_seconds else None,
+            "stages": stage_results,
+            "accuracy": score_detectors(documents, detectors, name_detector, spacy_model_name),
+        }
+    return {
+        "config": {
+            "spacy_model": spacy_model_name,
+            "name_detector": name_detector,
+            "docs": docs,
+            "repeat": repeat,
+            "redaction": redactr.redaction_config(spacy_model_name, name_detector),
+        },
+        "results": results,
+    }
+
+
+def measure_stage(stage: Callable[[Document], Any], documents: List[Document], repeat: int) -> Dict[str, float]:
+    """
+    Time a stage over every document, then measure its peak memory in a separate pass.
+
+    tracemalloc slows allocation-heavy code down a lot, so it is only switched on
+    for the memory pass and doesn't distort the timings.
+    """
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for document in documents:
+            stage(document)
+        timings.append(time.perf_counter() - started)
+
+    peak = 0
+    tracemalloc.start()
+    try:
+        for document in documents:
+            tracemalloc.reset_peak()
+            baseline, _peak = tracemalloc.get_traced_memory()
+            stage(document)
+            _current, document_peak = tracemalloc.get_traced_memory()
+            peak = max(peak, document_peak - baseline)
+    finally:
+        tracemalloc.stop()
+
+    seconds = statistics.median(timings)
+    return {
+        "seconds": seconds,
+        "ms_per_doc": seconds * 1000 / len(documents),
+        "peak_kb": peak / 1024,
+    }
+
+
+def score_detectors(documents: List[Document], detectors: Dict[str, Any] = DETECTORS, name_detector: str = "ner",
+                    spacy_model_name: str = redactr.DEFAULT_SPACY_MODEL) -> Dict[str, Dict[str, float]]:
+    """
+    Score each detector, and detect_pii as a whole, against the planted information.
+
+    A planted item counts as found when detected spans cover all of it; a detected
+    span counts as correct when it overlaps planted information of its stage's label
+    (any label for "all").
+    """
+    counts = {name: {"planted": 0, "found": 0, "detected": 0, "correct": 0}
+              for name in [*detectors, "all"]}
+    for document in documents:
+        expected = locate(document.text, document.resume.planted)
+        scored = [(name, label, detector(document.text, document.doc))
+                  for name, (label, detector) in detectors.items()]
+        scored.append(("all", None, redactr.detect_pii(document.text, document.doc, name_detector=name_detector,
+                                                       spacy_model_name=spacy_model_name)))
+        for name, label, spans in scored:
+            targets = [span for span in expected if label is None or span[2] == label]
+            counts[name]["planted"] += len(targets)
+            counts[name]["found"] += sum(_is_covered(target, spans) for target in targets)
+            counts[name]["detected"] += len(spans)
+            counts[name]["correct"] += sum(any(_overlaps(span, target) for target in targets) for span in spans)
+
+    return {
+        name: {
+            "recall": count["found"] / count["planted"] if count["planted"] else 1.0,
+            "precision": count["correct"] / count["detected"] if count["detected"] else 1.0,
+            "planted": count["planted"],
+            "detected": count["detected"],
+        }
+        for name, count in counts.items()
+    }
+
+
+def _is_covered(target: redactr.Span, spans: List[redactr.Span]) -> bool:
+    """Whether the spans together cover every character of the target."""
+    position = target[0]
+    for start, end, _label in sorted(spans):
+        if start <= position < end:
+            position = end
+        if position >= target[1]:
+            return True
+    return False
+
+
+def _overlaps(span: redactr.Span, target: redactr.Span) -> bool:
+    return span[0] < target[1] and target[0] < span[1]
+
+
+def find_regressions(results: Dict[str, Any], baseline: Dict[str, Any],
+                     max_slowdown: float, max_recall_drop: float) -> List[str]:
+    """
+    Compare a run against a baseline run.
+
+    Args:
+        results: Output of run_benchmark
+        baseline: Output of an earlier run_benchmark
+        max_slowdown: Largest tolerated fall in docs/sec, as a fraction of the baseline
+        max_recall_drop: Largest tolerated fall in recall for any detector
+
+    Returns:
+        One message per regression (empty if there are none)
+    """
+    regressions = []
+    for page_count, current in results["results"].items():
+        previous = baseline["results"].get(page_count)
+        if previous is None:
+            continue
+        if previous["docs_per_sec"] and current["docs_per_sec"] is not None:
+            floor = previous["docs_per_sec"] * (1 - max_slowdown)
+            if current["docs_per_sec"] < floor:
+                regressions.append(f"{page_count} pages: {current['docs_per_sec']:.2f} docs/sec, "
+                                   f"below {floor:.2f} (baseline {previous['docs_per_sec']:.2f})")
+        for name, score in current["accuracy"].items():
+            previous_score = previous["accuracy"].get(name)
+            if previous_score and score["recall"] < previous_score["recall"] - max_recall_drop:
+                regressions.append(f"{page_count} pages: {name} recall {score['recall']:.3f}, "
+                                   f"down from {previous_score['recall']:.3f}")
+    return regressions
+
+
+def print_report(results: Dict[str, Any]) -> None:
+    print(f"\nName detector: {results['config']['name_detector']}")
+    for page_count, result in results["results"].items():
+        print(f"\n{page_count} page(s), {result['docs']} docs, "
+              f"{result['chars_per_doc']:.0f} chars/doc, {result['docs_per_sec']:.2f} docs/sec")
+        print(f"  {'stage':<14} {'ms/doc':>9} {'peak KiB':>9}")
+        for name, stage in result["stages"].items():
+            print(f"  {name:<14} {stage['ms_per_doc']:>9.1f} {stage['peak_kb']:>9.0f}")
+        print(f"  {'detector':<14} {'recall':>9} {'precision':>9} {'planted':>8}")
+        for name, score in result["accuracy"].items():
+            print(f"  {name:<14} {score['recall']:>9.3f} {score['precision']:>9.3f} {score['planted']:>8}")
+
+
+def print_comparison(runs: List[Dict[str, Any]]) -> None:
+    print(f"\n{'name detector':<14} {'pages':>5} {'docs/sec':>9} {'names ms':>9} "
+          f"{'name recall':>11} {'unlisted':>9} {'name prec.':>10} {'all recall':>10}")
+    for run in runs:
+        for page_count, result in run["results"].items():
+            names = result["accuracy"]["names"]
+            # NER doesn't use the name lists, so every name is "unlisted" to it
+            unlisted = result["accuracy"].get("names_unlisted", names)
+            print(f"{run['config']['name_detector']:<14} {page_count:>5} {result['docs_per_sec']:>9.2f} "
+                  f"{result['stages']['names']['ms_per_doc']:>9.1f} {names['recall']:>11.3f} "
+                  f"{unlisted['recall']:>9.3f} {names['precision']:>10.3f} "
+                  f"{result['accuracy']['all']['recall']:>10.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 3, 10])
+    parser.add_argument("--docs", type=int, default=5, help="resumes per page count")
+    parser.add_argument("--repeat", type=int, default=3, help="timing runs per stage")
+    parser.add_argument("--model", default=redactr.DEFAULT_SPACY_MODEL, help="spaCy model name or path")
+    parser.add_argument("--name-detector", action="append", choices=redactr.NAME_DETECTORS,
+                        help="how to find names (repeatable, to compare detectors; default ner)")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--max-slowdown", type=float, default=0.2,
+                        help="tolerated fall in docs/sec relative to the baseline (default 0.2)")
+    parser.add_argument("--max-recall-drop", type=float, default=0.0,
+                        help="tolerated fall in recall for any detector (default 0)")
+    args = parser.parse_args()
+    name_detectors = args.name_detector or ["ner"]
+    if len(name_detectors) > 1 and (args.output or args.baseline):
+        parser.error("--output and --baseline take a single --name-detector")
+
+    runs = [run_benchmark(args.pages, args.docs, args.repeat, args.model, name_detector)
+            for name_detector in name_detectors]
+    for results in runs:
+        print_report(results)
+    if len(runs) > 1:
+        print_comparison(runs)
+    results = runs[0]
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = find_regressions(results, baseline, args.max_slowdown, args.max_recall_drop)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print(f"\nNo regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Cold-start profile of the app's entry points.
+
+Imports each target module in a fresh interpreter with -X importtime and
+reports how long the whole import took and what each of the modules it
+imports directly cost, heaviest first. With --budget-ms the run exits with
+status 1 if any target's import takes longer, so CI can hold worker boot and
+test collection to a budget.
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup privacv redactr --top 15 --budget-ms 500
+
+--warmup also times redactr.warmup(), the part of startup that is deliberately
+left out of the imports (loading spaCy and the NER model).
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from typing import Any, Dict, List, NamedTuple, Sequence
+
+DEFAULT_TARGETS = ["redactr", "claude_utils", "mock_interview_integration", "privacv", "privacv_asgi", "bulk_review"]
+# The repository root, where the target modules live
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class ImportRecord(NamedTuple):
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def profile_import(module: str) -> List[ImportRecord]:
+    """
+    Import a module in a new interpreter and parse its -X importtime report.
+
+    Returns:
+        One record per module imported, in the order the report lists them
+        (every module after the ones it imported)
+
+    Raises:
+        RuntimeError: If the import fails
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    records = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        records.append(ImportRecord(name.strip(), int(self_us), int(cumulative_us), depth))
+    return records
+
+
+def profile_target(module: str, repeat: int, top: int) -> Dict[str, Any]:
+    """
+    Profile a target repeat times and summarise the median run.
+
+    Returns:
+        The median total import time in ms, and the heaviest direct imports of
+        that run as (module, ms) pairs
+    """
+    runs = []
+    for _ in range(repeat):
+        records = profile_import(module)
+        total = next(record.cumulative_us for record in reversed(records)
+                     if record.module == module and record.depth == 0)
+        runs.append((total, records))
+    runs.sort(key=lambda run: run[0])
+    total, records = runs[len(runs) // 2]
+    direct = sorted((record for record in records if record.depth == 1),
+                    key=lambda record: record.cumulative_us, reverse=True)
+    return {
+        "total_ms": total / 1000,
+        "totals_ms": [run[0] / 1000 for run in runs],
+        "heaviest": [(record.module, record.cumulative_us / 1000) for record in direct[:top]],
+    }
+
+
+def time_warmup(repeat: int) -> float:
+    """Median seconds redactr.warmup() takes in a new interpreter, after redactr is imported."""
+    script = ("import time, redactr\n"
+              "started = time.perf_counter()\n"
+              "redactr.warmup()\n"
+              "print(time.perf_counter() - started)")
+    timings = []
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"redactr.warmup() failed:\n{result.stderr[-2000:]}")
+        timings.append(float(result.stdout.strip().splitlines()[-1]))
+    return statistics.median(timings)
+
+
+def print_report(results: Dict[str, Dict[str, Any]]) -> None:
+    for module, result in results.items():
+        spread = ", ".join(f"{total:.0f}" for total in result["totals_ms"])
+        print(f"\nimport {module}: {result['total_ms']:.0f} ms (runs: {spread})")
+        for name, ms in result["heaviest"]:
+            print(f"  {name:<40} {ms:>8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("targets", nargs="*", default=DEFAULT_TARGETS, help="modules to import")
+    parser.add_argument("--repeat", type=int, default=3, help="imports per target; the median is reported")
+    parser.add_argument("--top", type=int, default=10, help="direct imports listed per target")
+    parser.add_argument("--budget-ms", type=float, help="fail if any target takes longer than this to import")
+    parser.add_argument("--warmup", action="store_true", help="also time redactr.warmup()")
+    args = parser.parse_args()
+
+    results = {module: profile_target(module, args.repeat, args.top) for module in args.targets}
+    print_report(results)
+    if args.warmup:
+        print(f"\nredactr.warmup(): {time_warmup(args.repeat) * 1000:.0f} ms")
+
+    if args.budget_ms is not None:
+        over = [module for module, result in results.items() if result["total_ms"] > args.budget_ms]
+        for module in over:
+            print(f"OVER BUDGET: import {module} took {results[module]['total_ms']:.0f} ms, "
+                  f"budget {args.budget_ms:.0f} ms", file=sys.stderr)
+        if over:
+            sys.exit(1)
+        print(f"\nEvery import is within {args.budget_ms:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Memory per gunicorn worker, with and without loading the models before forking.
+
+Starts privacv under gunicorn (with gunicorn.conf.py) once per mode, waits
+for every worker to come up, sends each some uploads so the models have been
+used, then reads /proc/<pid>/smaps_rollup of the master and every worker.
+For each process it reports RSS split into pages shared with other processes
+and pages private to it, plus PSS (each shared page divided among the
+processes sharing it). Private memory is what every extra worker costs.
+
+    python -m benchmarks.bench_workers --workers 4
+    python -m benchmarks.bench_workers --workers 4 --mode preload --uploads 20
+
+Linux only. REDACTION_SPACY_MODEL and REDACTION_NAME_DETECTOR are passed
+through to the server, so other models and detectors can be measured too.
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+import httpx
+
+from benchmarks.corpus import make_resume
+from benchmarks.pdf_writer import render_pdf
+
+# The repository root, where gunicorn.conf.py and the app live
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = {"preload": "1", "per-worker": "0"}
+SMAPS_FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+
+
+def read_memory(pid: int) -> Dict[str, float]:
+    """
+    Memory of a process from /proc/<pid>/smaps_rollup.
+
+    Returns:
+        rss, pss, shared and private memory in MiB
+    """
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            field, _, rest = line.partition(":")
+            if field in SMAPS_FIELDS:
+                values[field] = int(rest.split()[0]) / 1024
+    return {
+        "rss": values["Rss"],
+        "pss": values["Pss"],
+        "shared": values["Shared_Clean"] + values["Shared_Dirty"],
+        "private": values["Private_Clean"] + values["Private_Dirty"],
+    }
+
+
+def child_pids(pid: int) -> List[int]:
+    """Processes whose parent is pid."""
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name in parentheses may contain spaces
+                fields = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == pid:
+            children.append(int(entry))
+    return sorted(children)
+
+
+def measure_mode(preload: str, workers: int, uploads: int, timeout: float) -> Dict[str, Dict[str, float]]:
+    """
+    Run the app under gunicorn and measure its processes.
+
+    Args:
+        preload: PRIVACV_PRELOAD value
+        workers: Number of gunicorn workers
+        uploads: Uploads to send per worker before measuring
+        timeout: Seconds to wait for the workers to boot
+
+    Returns:
+        Memory of the master and of each worker, keyed "master" and "worker <pid>"
+    """
+    port = _free_port()
+    with tempfile.TemporaryDirectory() as store_dir:
+        env = dict(os.environ, PRIVACV_PRELOAD=preload, WEB_CONCURRENCY=str(workers),
+                   PRIVACV_BIND=f"127.0.0.1:{port}", INTERVIEW_STORE_DIR=store_dir)
+        env.setdefault("FLASK_SECRET_KEY", "bench-workers")
+        server = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "privacv:app"],
+                                  cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        try:
+            worker_pids = _wait_for_workers(server, workers, f"http://127.0.0.1:{port}", timeout)
+            pdfs = [render_pdf(make_resume(1, seed).pages) for seed in range(workers * uploads)]
+            with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=timeout) as client:
+                for pdf in pdfs:
+                    response = client.post("/upload", data={"jd_text": "Software Engineer"},
+                                           files={"pdf_file": ("resume.pdf", pdf, "application/pdf")})
+                    response.raise_for_status()
+            memory = {"master": read_memory(server.pid)}
+            for pid in worker_pids:
+                memory[f"worker {pid}"] = read_memory(pid)
+            return memory
+        finally:
+            server.terminate()
+            server.wait(timeout)
+
+
+def _wait_for_workers(server: subprocess.Popen, workers: int, url: str, timeout: float) -> List[int]:
+    # The page loads as soon as one worker is up; wait until all of them
+    # exist too, then give the rest a moment to finish booting
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"gunicorn exited:\n{server.stderr.read().decode()[-2000:]}")
+        pids = child_pids(server.pid)
+        if len(pids) == workers and _responds(url):
+            time.sleep(1)
+            return child_pids(server.pid)
+        time.sleep(0.2)
+    raise RuntimeError(f"{workers} workers weren't up after {timeout:.0f}s")
+
+
+def _responds(url: str) -> bool:
+    try:
+        return httpx.get(url, timeout=1).status_code == 200
+    except httpx.HTTPError:
+        return False
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def print_report(mode: str, memory: Dict[str, Dict[str, float]]) -> None:
+    print(f"\n{mode}")
+    print(f"  {'process':<16} {'RSS MiB':>9} {'shared':>9} {'private':>9} {'PSS MiB':>9}")
+    for name, values in memory.items():
+        print(f"  {name:<16} {values['rss']:>9.1f} {values['shared']:>9.1f} "
+              f"{values['private']:>9.1f} {values['pss']:>9.1f}")
+    workers = [values for name, values in memory.items() if name != "master"]
+    print(f"  total PSS {sum(values['pss'] for values in memory.values()):.1f} MiB, "
+          f"{sum(values['private'] for values in workers) / len(workers):.1f} MiB private per worker")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4, help="gunicorn workers")
+    parser.add_argument("--mode", choices=list(MODES), action="append",
+                        help="mode to measure (repeatable; default both)")
+    parser.add_argument("--uploads", type=int, default=5, help="uploads per worker before measuring")
+    parser.add_argument("--timeout", type=float, default=120, help="seconds to wait for the workers")
+    args = parser.parse_args()
+
+    for mode in args.mode or list(MODES):
+        print_report(mode, measure_mode(MODES[mode], args.workers, args.uploads, args.timeout))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""
+Local stand-in for the Anthropic Messages API, for load tests.
+
+Answers POST /v1/messages with generated text, streaming or not, with the
+same response shapes and usage fields as the real API (including prompt-cache
+token counts). Latency, token rate and error rates are configurable, so load
+tests exercise the app's concurrency without spending API budget or depending
+on the network.
+
+    python -m benchmarks.claude_standin --port 8011 --latency-ms 600 --tokens-per-sec 80
+
+then start the app with ANTHROPIC_BASE_URL=http://127.0.0.1:8011 (every client
+in the app is built by anthropic_client, which reads it).
+"""
+import argparse
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+# Rough size of a token in English text, as in mock_interview_integration
+CHARS_PER_TOKEN = 4
+# Tokens sent per content_block_delta event
+TOKENS_PER_DELTA = 3
+
+WORDS = ["experience", "project", "impact", "Python", "team", "results", "data", "role",
+         "clearly", "quantify", "leadership", "analysis", "skills", "highlight", "the",
+         "your", "with", "and", "for", "a", "to", "of", "in", "more"]
+
+
+class StandInConfig(NamedTuple):
+    latency_ms: float = 500
+    latency_distribution: str = "lognormal"
+    latency_sigma: float = 0.5
+    tokens_per_sec: float = 80
+    output_tokens: int = 300
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    retry_after: int = 1
+    seed: Optional[int] = None
+
+
+class ClaudeStandIn(ThreadingHTTPServer):
+    """HTTP server that mimics the Messages API."""
+
+    daemon_threads = True
+
+    def __init__(self, config: StandInConfig = StandInConfig(), host: str = "127.0.0.1", port: int = 0):
+        """
+        Args:
+            config: Latency, token rate and error injection settings
+            host: Interface to listen on
+            port: Port to listen on (0 for any free port)
+        """
+        super().__init__((host, port), StandInHandler)
+        self.config = config
+        self._random = random.Random(config.seed)
+        self._lock = threading.Lock()
+        self._cached_prefixes = set()
+        self.request_count = 0
+        self.error_count = 0
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "ClaudeStandIn":
+        """Serve from a background thread, returning self."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def plan(self, request: Dict[str, Any]) -> Tuple[Optional[Tuple[int, str]], float, Dict[str, int], str]:
+        """
+        Decide how to answer a request.
+
+        Returns:
+            (status, error type) to fail with or None, seconds before the first
+            token, the usage to report, and the reply text
+        """
+        config = self.config
+        with self._lock:
+            self.request_count += 1
+            roll = self._random.random()
+            failure = None
+            if roll < config.rate_limit_rate:
+                failure = (429, "rate_limit_error")
+            elif roll < config.rate_limit_rate + config.error_rate:
+                failure = (529, "overloaded_error")
+            if failure:
+                self.error_count += 1
+            delay = self._latency()
+            output_tokens = max(1, min(int(self._random.gauss(config.output_tokens, config.output_tokens / 4)),
+                                       request.get("max_tokens", config.output_tokens)))
+            text = self._text(output_tokens)
+            usage = self._usage(request, output_tokens)
+        return failure, delay, usage, text
+
+    def _latency(self) -> float:
+        config = self.config
+        mean = config.latency_ms / 1000
+        if config.latency_distribution == "fixed":
+            return mean
+        if config.latency_distribution == "uniform":
+            return self._random.uniform(0, 2 * mean)
+        # lognormal, scaled so its mean is latency_ms
+        return self._random.lognormvariate(0, config.latency_sigma) * mean / math.exp(config.latency_sigma ** 2 / 2)
+
+    def _text(self, output_tokens: int) -> str:
+        words = [self._random.choice(WORDS) for _ in range(output_tokens)]
+        paragraphs = [" ".join(words[index:index + 40]).capitalize() + "." for index in range(0, len(words), 40)]
+        return "\n\n".join(paragraphs)
+
+    def _usage(self, request: Dict[str, Any], output_tokens: int) -> Dict[str, int]:
+        """Token counts, treating everything up to the last cache_control breakpoint as the cached prefix."""
+        blocks = _as_blocks(request.get("system"))
+        for message in request.get("messages", []):
+            blocks.extend(_as_blocks(message.get("content")))
+        cached_blocks = []
+        for index, block in enumerate(blocks):
+            if block.get("cache_control"):
+                cached_blocks = blocks[:index + 1]
+        cached_tokens = _estimate_tokens(cached_blocks)
+        total_tokens = _estimate_tokens(blocks)
+
+        usage = {"input_tokens": total_tokens - cached_tokens, "output_tokens": output_tokens,
+                 "cache_creation_input_tokens": 0, "cache_read_input_tokens": 0}
+        if cached_blocks:
+            prefix = hashlib.sha256(json.dumps(cached_blocks, sort_keys=True).encode("utf-8")).digest()
+            if prefix in self._cached_prefixes:
+                usage["cache_read_input_tokens"] = cached_tokens
+            else:
+                self._cached_prefixes.add(prefix)
+                usage["cache_creation_input_tokens"] = cached_tokens
+        return usage
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep connections open between requests
+    server: ClaudeStandIn
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if not self.path.rstrip("/").endswith("/messages"):
+            self._send_json(404, _error_body("not_found_error", f"No route for {self.path}"))
+            return
+        request = json.loads(body)
+        failure, delay, usage, text = self.server.plan(request)
+
+        time.sleep(delay)
+        if failure:
+            status, error_type = failure
+            headers = {"retry-after": str(self.server.config.retry_after)} if status == 429 else {}
+            self._send_json(status, _error_body(error_type, "Injected by the stand-in"), headers)
+        elif request.get("stream"):
+            self._stream(request, usage, text)
+        else:
+            time.sleep(usage["output_tokens"] / self.server.config.tokens_per_sec)
+            self._send_json(200, {
+                "id": _message_id(),
+                "type": "message",
+                "role": "assistant",
+                "model": request.get("model"),
+                "content": [{"type": "text", "text": text}],
+                "stop_reason": "end_turn",
+                "stop_sequence": None,
+                "usage": usage,
+            })
+
+    def _stream(self, request: Dict[str, Any], usage: Dict[str, int], text: str) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        start_usage = dict(usage, output_tokens=1)
+        self._event("message_start", {"type": "message_start", "message": {
+            "id": _message_id(), "type": "message", "role": "assistant", "model": request.get("model"),
+            "content": [], "stop_reason": None, "stop_sequence": None, "usage": start_usage}})
+        self._event("content_block_start", {"type": "content_block_start", "index": 0,
+                                            "content_block": {"type": "text", "text": ""}})
+        self._event("ping", {"type": "ping"})
+
+        step = TOKENS_PER_DELTA * CHARS_PER_TOKEN
+        pause = TOKENS_PER_DELTA / self.server.config.tokens_per_sec
+        for index in range(0, len(text), step):
+            time.sleep(pause)
+            self._event("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                                "delta": {"type": "text_delta", "text": text[index:index + step]}})
+
+        self._event("content_block_stop", {"type": "content_block_stop", "index": 0})
+        self._event("message_delta", {"type": "message_delta",
+                                      "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                                      "usage": {"output_tokens": usage["output_tokens"]}})
+        self._event("message_stop", {"type": "message_stop"})
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _event(self, event: str, data: Dict[str, Any]) -> None:
+        chunk = f"event: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8")
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+        self.wfile.flush()
+
+    def _send_json(self, status: int, payload: Dict[str, Any], headers: Dict[str, str] = None) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _as_blocks(content: Any) -> List[Dict[str, Any]]:
+    """A system prompt or message content as a list of content blocks."""
+    if not content:
+        return []
+    if isinstance(content, str):
+        return [{"type": "text", "text": content}]
+    return list(content)
+
+
+def _estimate_tokens(content: List[Any]) -> int:
+    return len(json.dumps(content)) // CHARS_PER_TOKEN
+
+
+def _error_body(error_type: str, message: str) -> Dict[str, Any]:
+    return {"type": "error", "error": {"type": error_type, "message": message}}
+
+
+def _message_id() -> str:
+    return "msg_standin_" + hashlib.sha1(str(time.perf_counter_ns()).encode("ascii")).hexdigest()[:16]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8011)
+    parser.add_argument("--latency-ms", type=float, default=500, help="mean time to first token")
+    parser.add_argument("--latency-distribution", choices=["fixed", "uniform", "lognormal"], default="lognormal")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="spread of the lognormal distribution")
+    parser.add_argument("--tokens-per-sec", type=float, default=80, help="output token rate")
+    parser.add_argument("--output-tokens", type=int, default=300, help="mean reply length in tokens")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered 529 overloaded")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of requests answered 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="retry-after seconds sent with 429s")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    config = StandInConfig(args.latency_ms, args.latency_distribution, args.latency_sigma, args.tokens_per_sec,
+                           args.output_tokens, args.error_rate, args.rate_limit_rate, args.retry_after, args.seed)
+    server = ClaudeStandIn(config, args.host, args.port)
+    print(f"Messages API stand-in listening; start the app with ANTHROPIC_BASE_URL={server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"{server.request_count} requests, {server.error_count} injected errors")
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Synthetic resume text with known, planted personal information.
+
+Every generated document is deterministic for a given seed, so benchmark runs
+can be compared with each other.
+"""
+import random
+from typing import List, NamedTuple, Tuple
+
+FIRST_NAMES = ["Jade", "Karina", "Zainab", "Priya", "Mateo", "Olivia", "Wei", "Amara",
+               "Lucas", "Fatima", "Noah", "Sofia", "Hiroshi", "Chloe", "Daniel", "Aisha"]
+SURNAMES = ["Nair", "Chung", "Adamji", "Patel", "Garcia", "Thompson", "Zhang", "Okafor",
+            "Martin", "Hassan", "Williams", "Rossi", "Tanaka", "Dubois", "Kowalski", "Khan"]
+
+EMAIL_DOMAINS = ["gmail.com", "outlook.com", "college.harvard.edu", "proton.me"]
+
+# (phone as written, region) pairs; the numbers are valid but not assigned to anyone real
+PHONES = [
+    ("(617) 253-1000", "US"),
+    ("617.495.1000", "US"),
+    ("+1 416 978 2011", "CA"),
+    ("+44 20 7946 0958", "GB"),
+    ("020 7946 0958", "GB"),
+    ("+61 2 9374 4000", "AU"),
+    ("+91 98765 43210", "IN"),
+]
+
+ADDRESSES = [
+    "123 Main Street, Springfield, IL 62704",
+    "45 Oak Avenue, Boston, MA 02118",
+    "1600 Amphitheatre Parkway, Mountain View, CA 94043",
+    "350 Fifth Avenue, New York, NY 10118",
+    "100 Queen Street West, Toronto, ON M5H 2N2",
+    "221 Baker Street, London, NW1 6XE",
+]
+
+ROLES = ["Software Engineer", "Research Assistant", "Data Analyst", "Teaching Fellow",
+         "Product Intern", "Machine Learning Engineer"]
+ORGS = ["Harvard Computer Society", "Kempner Institute", "Salata Institute",
+        "Atmospheric Chemistry Modeling Group", "Economics Department", "Harvard Forest"]
+SKILLS = ["Python", "Keras", "Flask", "Numpy", "pandas", "PyTorch", "C/C++", "R",
+          "JavaScript (React)", "HTML/CSS", "SQL", "NLP", "API development"]
+BULLETS = [
+    "Developed a data scraping and analysis pipeline in {skill} assessing real-time data availability for 1,500+ chargers.",
+    "Engineered, implemented, and extended Bayesian data filtering algorithms in {skill} for language model pre-training.",
+    "Analyzed over 2 million rows of sensor data and implemented regression models in {skill}.",
+    "Organized and ran eleven professional development events with panelists from Google and Microsoft.",
+    "Created a data mining methodology in {skill} to automate company sourcing, saving 10 hours of manual work weekly.",
+    "Presented findings at AGU 2023, the largest gathering of environmental scientists in the U.S.",
+]
+
+# Roughly one page of resume text
+SECTIONS_PER_PAGE = 4
+
+
+class PlantedPII(NamedTuple):
+    text: str
+    label: str
+
+
+class SyntheticResume(NamedTuple):
+    pages: List[str]
+    planted: List[PlantedPII]
+
+    @property
+    def text(self) -> str:
+        return "".join(self.pages)
+
+
+def make_resume(page_count: int, seed: int = 0) -> SyntheticResume:
+    """
+    Build a synthetic resume with personal information planted at known places.
+    
+    Args:
+        page_count: Number of pages of text to generate
+        seed: Random seed; the same seed always gives the same resume
+        
+    Returns:
+        The page texts and the planted personal information
+    """
+    rng = random.Random(seed)
+    first, last = rng.choice(FIRST_NAMES), rng.choice(SURNAMES)
+    name = f"{first} {last}"
+    email = f"{first.lower()}.{last.lower()}@{rng.choice(EMAIL_DOMAINS)}"
+    phone, _region = rng.choice(PHONES)
+    address = rng.choice(ADDRESSES)
+    reference_name = f"{rng.choice(FIRST_NAMES)} {rng.choice(SURNAMES)}"
+    reference_phone, _region = rng.choice(PHONES)
+
+    planted = [
+        PlantedPII(name, "PERSON"),
+        PlantedPII(email, "EMAIL"),
+        PlantedPII(phone, "PHONE"),
+        PlantedPII(address, "ADDRESS"),
+    ]
+    pages = []
+    for page_number in range(page_count):
+        lines = []
+        if page_number == 0:
+            lines.append(f"{name} ")
+            lines.append(f"{address} • {email} • {phone} • LinkedIn • GitHub ")
+        for _ in range(SECTIONS_PER_PAGE):
+            lines.append(f"{rng.choice(ORGS).upper()} {rng.choice(ROLES)} "
+                         f"{rng.choice(['January', 'June', 'September'])} {rng.randint(2019, 2024)} – Present ")
+            for _ in range(4):
+                lines.append("● " + rng.choice(BULLETS).format(skill=rng.choice(SKILLS)) + " ")
+        if page_number == page_count - 1:
+            lines.append(f"REFERENCES {reference_name}, Research Supervisor, {reference_phone}. "
+                         f"Contact {name.split()[0]} {name.split()[1]} for more. ")
+            planted.append(PlantedPII(reference_name, "PERSON"))
+            planted.append(PlantedPII(reference_phone, "PHONE"))
+        pages.append("".join(lines))
+    return SyntheticResume(pages, planted)
+
+
+def locate(text: str, planted: List[PlantedPII]) -> List[Tuple[int, int, str]]:
+    """
+    Find every occurrence of the planted personal information in a text.
+    
+    Args:
+        text: Text the resume was rendered into
+        planted: The planted personal information
+        
+    Returns:
+        (start, end, label) spans, one per occurrence
+    """
+    spans = []
+    for item in set(planted):
+        start = text.find(item.text)
+        while start != -1:
+            spans.append((start, start + len(item.text), item.label))
+            start = text.find(item.text, start + 1)
+    return sorted(spans)
@@ -0,0 +1,193 @@
+"""
+End-to-end load test for a running privacv server.
+
+Each simulated user runs a whole session: upload a synthetic resume PDF, get
+the review, start a mock interview, answer --turns questions and end the
+interview. --concurrency users run at once until --sessions sessions are done.
+At the end it prints p50/p95/p99 latency and error counts per route, plus
+overall throughput.
+
+Point the app at the Messages API stand-in so the test costs nothing:
+
+    python -m benchmarks.claude_standin --port 8011
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8011 ANTHROPIC_API_KEY=stand-in python privacv.py
+    python -m benchmarks.loadtest --url http://127.0.0.1:5000 --concurrency 20 --sessions 100
+
+--stream uses the /stream variants of the Claude routes; their latency is
+measured to the end of the event stream, and time to the first event is
+reported as a separate "<route> first event" row.
+"""
+import argparse
+import asyncio
+import collections
+import json
+import math
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks.corpus import make_resume
+from benchmarks.pdf_writer import render_pdf
+
+JOB_DESCRIPTION = ("Software Engineer. Build data pipelines in Python, work with product teams "
+                   "and communicate results clearly.")
+ANSWERS = [
+    "I led a team of three building a data pipeline in Python that cut processing time by half.",
+    "We disagreed about the schema, so I wrote up both options and we tested them on real data.",
+    "I'd start by measuring where the time goes before changing anything.",
+    "I want to work on products where data quality decides whether users trust the results.",
+]
+
+
+class LoadTest:
+    """Runs sessions against the app and collects per-route latencies."""
+
+    def __init__(self, url: str, turns: int, stream: bool, pdfs: List[bytes], timeout: float):
+        self.url = url.rstrip("/")
+        self.turns = turns
+        self.stream = stream
+        self.pdfs = pdfs
+        self.timeout = timeout
+        self.latencies: Dict[str, List[float]] = collections.defaultdict(list)
+        self.errors: Dict[str, int] = collections.Counter()
+        self.completed_sessions = 0
+
+    async def run(self, concurrency: int, sessions: int) -> float:
+        """
+        Run the sessions, at most concurrency at a time.
+
+        Returns:
+            Wall time of the whole run, in seconds
+        """
+        queue = asyncio.Queue()
+        for session_number in range(sessions):
+            queue.put_nowait(session_number)
+
+        async def user():
+            while not queue.empty():
+                session_number = queue.get_nowait()
+                await self.session(self.pdfs[session_number % len(self.pdfs)])
+
+        started = time.perf_counter()
+        await asyncio.gather(*(user() for _ in range(concurrency)))
+        return time.perf_counter() - started
+
+    async def session(self, pdf_bytes: bytes) -> None:
+        """One user's visit; stops at the first failed request."""
+        # Each user gets its own client, and so its own session cookie
+        async with httpx.AsyncClient(base_url=self.url, timeout=self.timeout) as client:
+            redacted = await self.upload(client, pdf_bytes)
+            if redacted is None:
+                return
+            form = {"redacted_text": redacted, "job_description": JOB_DESCRIPTION}
+            if not await self.claude_route(client, "/process_with_claude", form):
+                return
+            if not await self.claude_route(client, "/start_interview", form):
+                return
+            for turn in range(self.turns):
+                if not await self.claude_route(client, "/continue_interview",
+                                               {"user_response": ANSWERS[turn % len(ANSWERS)]}):
+                    return
+            if not await self.claude_route(client, "/end_interview", {}):
+                return
+        self.completed_sessions += 1
+
+    async def upload(self, client: httpx.AsyncClient, pdf_bytes: bytes) -> Optional[str]:
+        """Upload a PDF, following the job status URL if the app queues it, and return the redacted text."""
+        started = time.perf_counter()
+        try:
+            response = await client.post("/upload", data={"jd_text": JOB_DESCRIPTION},
+                                         files={"pdf_file": ("resume.pdf", pdf_bytes, "application/pdf")})
+            while response.status_code in (202, 503):
+                await asyncio.sleep(float(response.headers.get("Retry-After", 1)))
+                if response.status_code == 503:
+                    response = await client.post("/upload", data={"jd_text": JOB_DESCRIPTION},
+                                                 files={"pdf_file": ("resume.pdf", pdf_bytes, "application/pdf")})
+                else:
+                    response = await client.get(response.json().get("status_url") or response.request.url)
+            response.raise_for_status()
+            redacted = response.json()["redacted_text"]
+        except (httpx.HTTPError, KeyError, ValueError) as e:
+            print(f"/upload failed: {e}")
+            self.errors["/upload"] += 1
+            return None
+        self.latencies["/upload"].append(time.perf_counter() - started)
+        return redacted
+
+    async def claude_route(self, client: httpx.AsyncClient, route: str, form: Dict[str, str]) -> bool:
+        """Call one of the Claude-bound routes, returning whether it succeeded."""
+        if self.stream:
+            route += "/stream"
+        started = time.perf_counter()
+        try:
+            if self.stream:
+                await self._read_stream(client, route, form, started)
+            else:
+                response = await client.post(route, data=form)
+                response.raise_for_status()
+                if not response.json().get("success"):
+                    raise ValueError(response.json().get("error"))
+        except (httpx.HTTPError, ValueError) as e:
+            print(f"{route} failed: {e}")
+            self.errors[route] += 1
+            return False
+        self.latencies[route].append(time.perf_counter() - started)
+        return True
+
+    async def _read_stream(self, client: httpx.AsyncClient, route: str, form: Dict[str, str], started: float) -> None:
+        first_event = None
+        async with client.stream("POST", route, data=form) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if first_event is None and line.startswith("event:"):
+                    first_event = time.perf_counter()
+                    self.latencies[f"{route} first event"].append(first_event - started)
+                if line.startswith("event: error"):
+                    raise ValueError("error event")
+                if line.startswith("data:") and '"success": false' in line:
+                    raise ValueError(json.loads(line[5:]).get("error"))
+
+    def report(self, elapsed: float) -> None:
+        requests = sum(len(values) for route, values in self.latencies.items() if "first event" not in route)
+        print(f"{'route':<38} {'count':>6} {'errors':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        for route, values in self.latencies.items():
+            values = sorted(values)
+            print(f"{route:<38} {len(values):>6} {self.errors.get(route, 0):>6} "
+                  f"{percentile(values, 50) * 1000:>8.0f} {percentile(values, 95) * 1000:>8.0f} "
+                  f"{percentile(values, 99) * 1000:>8.0f}")
+        for route, count in self.errors.items():
+            if route not in self.latencies:
+                print(f"{route:<38} {0:>6} {count:>6}")
+        print(f"\n{self.completed_sessions} sessions completed in {elapsed:.1f}s: "
+              f"{self.completed_sessions / elapsed:.2f} sessions/sec, {requests / elapsed:.2f} requests/sec")
+
+
+def percentile(sorted_values: List[float], percent: float) -> float:
+    """Nearest-rank percentile of already sorted values."""
+    if not sorted_values:
+        return math.nan
+    rank = max(1, math.ceil(percent / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:5000", help="base URL of the running app")
+    parser.add_argument("--concurrency", type=int, default=10, help="users running sessions at once")
+    parser.add_argument("--sessions", type=int, default=50, help="total sessions to run")
+    parser.add_argument("--turns", type=int, default=3, help="interview answers per session")
+    parser.add_argument("--pages", type=int, default=2, help="pages per resume PDF")
+    parser.add_argument("--stream", action="store_true", help="use the /stream variants of the Claude routes")
+    parser.add_argument("--timeout", type=float, default=300, help="per-request timeout in seconds")
+    args = parser.parse_args()
+
+    # A different resume per session, so the redaction cache doesn't answer every upload
+    pdfs = [render_pdf(make_resume(args.pages, seed).pages) for seed in range(max(1, args.sessions))]
+    load_test = LoadTest(args.url, args.turns, args.stream, pdfs, args.timeout)
+    elapsed = asyncio.run(load_test.run(args.concurrency, args.sessions))
+    load_test.report(elapsed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Minimal PDF writer for the synthetic resumes.
+
+Writes one Helvetica text object per page and nothing else, which is enough
+for PyPDF2 to extract the text back. Each line keeps its trailing space, so
+that after redactr drops the line breaks the extracted text matches the
+generated text (apart from characters Helvetica can't encode).
+"""
+from typing import List
+
+LINE_WIDTH = 100
+PAGE_HEIGHT = 792
+PAGE_WIDTH = 612
+FONT_SIZE = 9
+LEADING = 11
+
+
+def render_pdf(pages: List[str], line_width: int = LINE_WIDTH) -> bytes:
+    """
+    Render page texts into a PDF.
+
+    Args:
+        pages: Text of each page
+        line_width: Most characters per line; lines are broken after a space
+
+    Returns:
+        The PDF file's bytes
+    """
+    page_count = len(pages)
+    # Objects 1-3 are the catalog, page tree and font; each page then takes
+    # two objects, the page and its content stream
+    kids = " ".join(f"{4 + 2 * index} 0 R" for index in range(page_count))
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{kids}] /Count {page_count} >>".encode("ascii"),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+    for index, page_text in enumerate(pages):
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * index} 0 R >>".encode("ascii"))
+        objects.append(_content_stream(wrap_lines(page_text, line_width)))
+
+    pdf = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += f"{number} 0 obj\n".encode("ascii") + body + b"\nendobj\n"
+
+    xref_offset = len(pdf)
+    pdf += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("ascii")
+    pdf += b"".join(f"{offset:010d} 00000 n \n".encode("ascii") for offset in offsets)
+    pdf += (f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\n"
+            f"startxref\n{xref_offset}\n%%EOF\n").encode("ascii")
+    return bytes(pdf)
+
+
+def wrap_lines(text: str, line_width: int = LINE_WIDTH) -> List[str]:
+    """
+    Break text into lines of at most line_width characters, keeping every character.
+
+    Args:
+        text: Text to break
+        line_width: Most characters per line (longer words get a line of their own)
+
+    Returns:
+        Lines that join back into the original text
+    """
+    lines = []
+    start = 0
+    while len(text) - start > line_width:
+        end = text.rfind(" ", start, start + line_width)
+        end = end + 1 if end > start else start + line_width
+        lines.append(text[start:end])
+        start = end
+    if start < len(text):
+        lines.append(text[start:])
+    return lines
+
+
+def _content_stream(lines: List[str]) -> bytes:
+    """Build a page content stream that shows each line below the last."""
+    shown = " ".join(f"({_escape(line)}) Tj T*" for line in lines)
+    stream = (f"BT /F1 {FONT_SIZE} Tf {LEADING} TL 40 {PAGE_HEIGHT - 40} Td {shown} ET"
+              .encode("cp1252", errors="replace"))
+    return b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream"
+
+
+def _escape(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
@@ -0,0 +1,214 @@
+"""
+Review a directory of resume PDFs against one or more job descriptions.
+
+    python bulk_review.py resumes/ --jd backend.txt --jd data.txt --output reviews.jsonl
+
+Every PDF is redacted once, by a pool of worker processes (redactr.redact_many),
+and reviewed against every job description. Reviews go to Claude a bounded
+number at a time; rate-limit and overload errors are retried with backoff,
+honouring the API's retry-after (the client's own retries are turned off, so
+--attempts is the total per review). PDFs without extractable text aren't sent
+to Claude; they are recorded as errors. Each finished review is appended to the output
+as one JSON line, so a run that is interrupted can be resumed with the same
+command: (PDF, job description) pairs that already have a successful line are
+skipped, failed ones are tried again.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import threading
+import time
+from typing import Dict, List, Set, Tuple
+
+import anthropic
+
+from anthropic_client import async_client_from_env, set_async_client
+from claude_utils import async_get_full_resume_review
+from redactr import DEFAULT_SPACY_MODEL, NO_TEXT, redact_many
+
+# Errors worth waiting out; anything else fails the review straight away
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+DEFAULT_CONCURRENCY = 8
+DEFAULT_ATTEMPTS = 6
+# Backoff before retry n (from 0) is BACKOFF_BASE * 2**n seconds plus jitter, capped at BACKOFF_MAX
+BACKOFF_BASE = 2
+BACKOFF_MAX = 60
+
+
+def find_pdfs(pdf_dir: str) -> List[str]:
+    """PDF files under pdf_dir, as sorted paths relative to it."""
+    found = []
+    for root, _dirs, files in os.walk(pdf_dir):
+        for name in files:
+            if name.lower().endswith(".pdf"):
+                found.append(os.path.relpath(os.path.join(root, name), pdf_dir))
+    return sorted(found)
+
+
+def load_done(output_path: str) -> Set[Tuple[str, str]]:
+    """(pdf, job description) pairs with a successful review already in the output file."""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # a line cut short when an earlier run was killed
+            if record.get("status") == "ok":
+                done.add((record["pdf"], record["jd"]))
+    return done
+
+
+class Progress:
+    """Counts finished reviews and redraws a one-line throughput display on stderr."""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.redacted = 0
+        self.ok = 0
+        self.failed = 0
+        self.started = time.perf_counter()
+
+    def show(self, final: bool = False) -> None:
+        elapsed = time.perf_counter() - self.started
+        finished = self.ok + self.failed
+        rate = finished / elapsed * 60 if elapsed else 0
+        eta = f"~{(self.total - finished) / rate:.0f} min left" if finished else "estimating"
+        print(f"\r{finished}/{self.total} reviews ({self.failed} failed), {self.redacted} PDFs redacted, "
+              f"{rate:.1f} reviews/min, {eta}   ",
+              end="\n" if final else "", file=sys.stderr, flush=True)
+
+
+async def review_with_backoff(resume_text: str, jd_text: str, attempts: int) -> str:
+    """
+    Review one resume, retrying rate-limit, overload and connection errors.
+
+    Raises:
+        anthropic.APIError: If the last attempt fails, or on an error that isn't worth retrying
+    """
+    for attempt in range(attempts):
+        try:
+            return await async_get_full_resume_review(resume_text, jd_text, raise_errors=True)
+        except (anthropic.APIConnectionError, anthropic.APIStatusError) as e:
+            status = getattr(e, "status_code", None)
+            if attempt == attempts - 1 or (status is not None and status not in RETRYABLE_STATUS_CODES):
+                raise
+            await asyncio.sleep(_retry_delay(e, attempt))
+
+
+def _retry_delay(error: Exception, attempt: int) -> float:
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    try:
+        return min(float(retry_after), BACKOFF_MAX)
+    except (TypeError, ValueError):
+        return min(BACKOFF_BASE * 2 ** attempt, BACKOFF_MAX) + random.uniform(0, 1)
+
+
+async def run(pdf_dir: str, jd_paths: List[str], output_path: str, concurrency: int, workers: int,
+              attempts: int, spacy_model_name: str) -> Progress:
+    jds = {}
+    for path in jd_paths:
+        with open(path, encoding="utf-8") as f:
+            jds[os.path.basename(path)] = f.read()
+
+    done = load_done(output_path)
+    todo: Dict[str, List[str]] = {}
+    for pdf in find_pdfs(pdf_dir):
+        remaining = [jd for jd in jds if (pdf, jd) not in done]
+        if remaining:
+            todo[pdf] = remaining
+    progress = Progress(sum(len(remaining) for remaining in todo.values()))
+    if not todo:
+        return progress
+
+    # review_with_backoff does the retrying; with the SDK retrying too, every
+    # attempt could become several requests
+    set_async_client(async_client_from_env(max_retries=0))
+    loop = asyncio.get_running_loop()
+    redacted: asyncio.Queue = asyncio.Queue()
+
+    def redact_all():
+        # redact_many is a blocking iterator over a process pool, so it runs on
+        # its own thread and hands each result over to the event loop
+        try:
+            files = (_read(os.path.join(pdf_dir, pdf)) for pdf in todo)
+            for pdf, text in zip(todo, redact_many(files, n_process=workers, spacy_model_name=spacy_model_name)):
+                loop.call_soon_threadsafe(redacted.put_nowait, (pdf, text))
+        finally:
+            loop.call_soon_threadsafe(redacted.put_nowait, None)
+
+    threading.Thread(target=redact_all, daemon=True).start()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    with open(output_path, "a", encoding="utf-8") as output:
+        def write(record: dict) -> None:
+            output.write(json.dumps(record, ensure_ascii=False) + "\n")
+            output.flush()
+            progress.show()
+
+        async def review(pdf: str, resume_text: str, jd: str) -> None:
+            async with semaphore:
+                started = time.perf_counter()
+                record = {"pdf": pdf, "jd": jd}
+                try:
+                    record["review"] = await review_with_backoff(resume_text, jds[jd], attempts)
+                    record["status"] = "ok"
+                    progress.ok += 1
+                except anthropic.APIError as e:
+                    record["status"] = "error"
+                    record["error"] = str(e)
+                    progress.failed += 1
+                record["seconds"] = round(time.perf_counter() - started, 2)
+            write(record)
+
+        reviews = []
+        while (item := await redacted.get()) is not None:
+            pdf, resume_text = item
+            progress.redacted += 1
+            if not resume_text.strip() or resume_text == NO_TEXT:
+                # Nothing to review; recorded as failed so a later run tries the PDF again
+                for jd in todo[pdf]:
+                    progress.failed += 1
+                    write({"pdf": pdf, "jd": jd, "status": "error", "error": "no text could be extracted from the PDF"})
+                continue
+            progress.show()
+            reviews.extend(asyncio.create_task(review(pdf, resume_text, jd)) for jd in todo[pdf])
+        await asyncio.gather(*reviews)
+    return progress
+
+
+def _read(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdf_dir", help="directory of resume PDFs (searched recursively)")
+    parser.add_argument("--jd", action="append", required=True, help="job description text file (repeatable)")
+    parser.add_argument("--output", default="reviews.jsonl", help="JSONL file to append reviews to")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="reviews in flight at once")
+    parser.add_argument("--workers", type=int, default=-1, help="redaction processes (-1 for one per CPU)")
+    parser.add_argument("--attempts", type=int, default=DEFAULT_ATTEMPTS, help="tries per review before giving up")
+    parser.add_argument("--model", default=DEFAULT_SPACY_MODEL, help="spaCy model for redaction")
+    args = parser.parse_args()
+
+    progress = asyncio.run(run(args.pdf_dir, args.jd, args.output, args.concurrency, args.workers,
+                               args.attempts, args.model))
+    if progress.total == 0:
+        print("Nothing to do: every PDF already has a review for every job description", file=sys.stderr)
+        return
+    progress.show(final=True)
+    if progress.failed:
+        print(f"{progress.failed} reviews failed; run the same command again to retry them", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,41 +1,320 @@
 # This is a wrapper file that wraps all the Claude API logic 
-import anthropic
-import os
-from dotenv import load_dotenv
-from prompts import full_review_prompt
+from anthropic_client import get_async_client, get_client
+from metrics import claude_call, record_usage
+from prompts import REVIEW_SECTIONS, full_review_prompt, review_context_prompt, review_section_prompt
+from response_cache import AsyncSingleFlight, SingleFlight, cache_from_env, make_key
+import asyncio
+import concurrent.futures
 import re
+import threading
 import markdown2
 
-# loading the .env file where your key is stored
-load_dotenv(dotenv_path=".env.local")
+# the API key is read from the environment or .env.local when the client is
+# first built (see anthropic_client)
 
-# setting up the Claude client
-client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+CLAUDE_MODEL = "claude-3-7-sonnet-20250219"
+CLAUDE_TEMPERATURE = 0.7
+DEFAULT_SYSTEM_MSG = "You are a resume reviewer. Also, we know the resume is redacted so ignore that."
+CLAUDE_ERROR_MESSAGE = "Claude is not responding right now. Please try again."
 
-# helper function to send prompt and get a response
-def call_claude(prompt, system_msg="You are a resume reviewer. Also, we know the resume is redacted so ignore that."):
+# identical prompts within the TTL are answered from here (see response_cache.cache_from_env)
+response_cache = cache_from_env()
+# identical prompts that are already on their way to Claude wait for that call
+_in_flight = SingleFlight()
+_async_in_flight = AsyncSingleFlight()
+
+# helper function to send prompt and get a response; errors are reported as
+# CLAUDE_ERROR_MESSAGE unless raise_errors is set
+def call_claude(prompt, system_msg=DEFAULT_SYSTEM_MSG, raise_errors=False):
     try:
-        # claude message call (you can change model, temp, etc.)
-        response = client.messages.create(
-            model="claude-3-7-sonnet-20250219",
-            max_tokens=4000,
-            temperature=0.7,
-            system=system_msg,
-            messages=[
-                {"role": "user", "content": prompt}
-            ]
-        )
-        # return just the useful part
-        print(response)
-        return ''.join([block.text for block in response.content if block.type == "text"])
+        return _cached_response(_prompt_request(prompt, system_msg),
+                                lambda request: _create("review", request), _in_flight)
     except Exception as e:
+        if raise_errors:
+            raise
         print(f"[Claude error] {e}")
-        return "Claude is not responding right now. Please try again."
-    
-    
-def get_full_resume_review(resume_text, jd_text):
+        return CLAUDE_ERROR_MESSAGE
+
+
+def stream_claude(prompt, system_msg=DEFAULT_SYSTEM_MSG):
+    # streaming version of call_claude: yields the response text as it arrives
+    return _cached_stream("review", _prompt_request(prompt, system_msg))
+
+
+async def async_call_claude(prompt, system_msg=DEFAULT_SYSTEM_MSG, raise_errors=False):
+    # async version of call_claude, for the ASGI app
+    try:
+        return await _async_cached_response(_prompt_request(prompt, system_msg),
+                                            lambda request: _async_create("review", request), _async_in_flight)
+    except Exception as e:
+        if raise_errors:
+            raise
+        print(f"[Claude error] {e}")
+        return CLAUDE_ERROR_MESSAGE
+
+
+def async_stream_claude(prompt, system_msg=DEFAULT_SYSTEM_MSG):
+    # async version of stream_claude
+    return _async_cached_stream("review", _prompt_request(prompt, system_msg))
+
+
+# Every cached Claude call goes through these: the key is a hash of the whole
+# request, and only successful responses are cached, so errors are retried
+# next time. The async versions go through the cache's async methods, which
+# keep the SQLite backend's I/O off the event loop.
+
+def _prompt_request(prompt, system_msg):
+    # claude message call (you can change model, temp, etc.)
+    return dict(
+        model=CLAUDE_MODEL,
+        max_tokens=4000,
+        temperature=CLAUDE_TEMPERATURE,
+        system=system_msg,
+        messages=[
+            {"role": "user", "content": prompt}
+        ]
+    )
+
+
+def _cached_response(request, produce, in_flight=None):
+    # the cached response to request, or produce(request), cached; identical
+    # requests already on their way share the call when in_flight is given
+    cache_key = make_key(**request)
+    if response_cache is not None:
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    def produce_and_store():
+        text = produce(request)
+        if response_cache is not None:
+            response_cache.set(cache_key, text)
+        return text
+
+    return in_flight.do(cache_key, produce_and_store) if in_flight is not None else produce_and_store()
+
+
+async def _async_cached_response(request, produce, in_flight=None):
+    # async version of _cached_response; produce returns an awaitable
+    cache_key = make_key(**request)
+    if response_cache is not None:
+        cached = await response_cache.async_get(cache_key)
+        if cached is not None:
+            return cached
+
+    async def produce_and_store():
+        text = await produce(request)
+        if response_cache is not None:
+            await response_cache.async_set(cache_key, text)
+        return text
+
+    return await (in_flight.do(cache_key, produce_and_store) if in_flight is not None else produce_and_store())
+
+
+def _cached_stream(label, request):
+    # yields the cached response to request, or streams it from Claude and caches it
+    cache_key = make_key(**request)
+    if response_cache is not None:
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+
+    chunks = []
+    for text in _stream(label, request):
+        chunks.append(text)
+        yield text
+    if response_cache is not None:
+        response_cache.set(cache_key, ''.join(chunks))
+
+
+async def _async_cached_stream(label, request):
+    # async version of _cached_stream
+    cache_key = make_key(**request)
+    if response_cache is not None:
+        cached = await response_cache.async_get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+
+    chunks = []
+    async for text in _async_stream(label, request):
+        chunks.append(text)
+        yield text
+    if response_cache is not None:
+        await response_cache.async_set(cache_key, ''.join(chunks))
+
+
+def _create(label, request):
+    with claude_call(label):
+        response = get_client().messages.create(**request)
+    record_usage(label, response.usage)
+    # return just the useful part
+    return ''.join([block.text for block in response.content if block.type == "text"])
+
+
+async def _async_create(label, request):
+    with claude_call(label):
+        response = await get_async_client().messages.create(**request)
+    record_usage(label, response.usage)
+    return ''.join([block.text for block in response.content if block.type == "text"])
+
+
+def _stream(label, request):
+    with claude_call(label), get_client().messages.stream(**request) as stream:
+        yield from stream.text_stream
+        record_usage(label, stream.get_final_message().usage)
+
+
+async def _async_stream(label, request):
+    with claude_call(label):
+        async with get_async_client().messages.stream(**request) as stream:
+            async for text in stream.text_stream:
+                yield text
+            record_usage(label, (await stream.get_final_message()).usage)
+
+
+def get_full_resume_review(resume_text, jd_text, raise_errors=False):
+    prompt = full_review_prompt(resume_text, jd_text)
+    return call_claude(prompt, raise_errors=raise_errors)
+
+
+def stream_full_resume_review(resume_text, jd_text):
+    prompt = full_review_prompt(resume_text, jd_text)
+    return stream_claude(prompt)
+
+
+async def async_get_full_resume_review(resume_text, jd_text, raise_errors=False):
     prompt = full_review_prompt(resume_text, jd_text)
-    return call_claude(prompt)
+    return await async_call_claude(prompt, raise_errors=raise_errors)
+
+
+def async_stream_full_resume_review(resume_text, jd_text):
+    prompt = full_review_prompt(resume_text, jd_text)
+    return async_stream_claude(prompt)
+
+
+# Fan-out review: each part of the full review is written by its own request, so
+# the review takes about as long as its slowest section rather than all three.
+# The requests share the resume and job description as a cached prefix. It is
+# written by the first section's request; the others go out as soon as that one
+# starts responding, so they read the prefix from the cache.
+
+# how long the later sections wait for the first to start before going anyway
+PREFIX_WARMUP_TIMEOUT = 30
+
+
+def get_fanout_resume_review(resume_text, jd_text):
+    sections = dict(iter_fanout_resume_review(resume_text, jd_text))
+    return merge_review_sections(sections)
+
+
+def iter_fanout_resume_review(resume_text, jd_text):
+    # yields (section, text) pairs in the order the sections finish
+    prefix_cached = threading.Event()
+    first, *rest = REVIEW_SECTIONS
+    with concurrent.futures.ThreadPoolExecutor(len(REVIEW_SECTIONS)) as executor:
+        futures = {executor.submit(_request_section, resume_text, jd_text, first, prefix_cached): first}
+        prefix_cached.wait(PREFIX_WARMUP_TIMEOUT)
+        for section in rest:
+            futures[executor.submit(_request_section, resume_text, jd_text, section)] = section
+        for future in concurrent.futures.as_completed(futures):
+            yield futures[future], future.result()
+
+
+async def async_get_fanout_resume_review(resume_text, jd_text):
+    sections = {section: text async for section, text in async_iter_fanout_resume_review(resume_text, jd_text)}
+    return merge_review_sections(sections)
+
+
+async def async_iter_fanout_resume_review(resume_text, jd_text):
+    # async version of iter_fanout_resume_review
+    prefix_cached = asyncio.Event()
+    first, *rest = REVIEW_SECTIONS
+
+    async def request(section, started=None):
+        return section, await _async_request_section(resume_text, jd_text, section, started)
+
+    tasks = [asyncio.create_task(request(first, prefix_cached))]
+    try:
+        try:
+            await asyncio.wait_for(prefix_cached.wait(), PREFIX_WARMUP_TIMEOUT)
+        except asyncio.TimeoutError:
+            pass
+        tasks.extend(asyncio.create_task(request(section)) for section in rest)
+        for task in asyncio.as_completed(tasks):
+            yield await task
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def merge_review_sections(sections):
+    # put the sections back into full_review_prompt's <analysis> structure
+    parts = [f"<{section}>\n{sections[section]}\n</{section}>" for section in REVIEW_SECTIONS if section in sections]
+    return "<analysis>\n" + "\n\n".join(parts) + "\n</analysis>"
+
+
+def _section_request(resume_text, jd_text, section):
+    return dict(
+        model=CLAUDE_MODEL,
+        max_tokens=2000,
+        temperature=CLAUDE_TEMPERATURE,
+        system=DEFAULT_SYSTEM_MSG,
+        messages=[
+            {"role": "user", "content": [
+                {"type": "text", "text": review_context_prompt(resume_text, jd_text),
+                 "cache_control": {"type": "ephemeral"}},
+                {"type": "text", "text": review_section_prompt(section)},
+            ]}
+        ]
+    )
+
+
+def _section_text(section, text):
+    # the section's text without its own <section> tags
+    return re.sub(rf"</?{section}>", "", text).strip()
+
+
+def _request_section(resume_text, jd_text, section, started=None):
+    # one section of the fan-out review; started is set once the request is
+    # under way (or has failed), releasing the other sections
+    def produce(request):
+        chunks = []
+        for text in _stream("review_section", request):
+            if started is not None:
+                started.set()
+            chunks.append(text)
+        return _section_text(section, ''.join(chunks))
+
+    try:
+        return _cached_response(_section_request(resume_text, jd_text, section), produce)
+    except Exception as e:
+        print(f"[Claude error] {e}")
+        return CLAUDE_ERROR_MESSAGE
+    finally:
+        if started is not None:
+            started.set()
+
+
+async def _async_request_section(resume_text, jd_text, section, started=None):
+    # async version of _request_section
+    async def produce(request):
+        chunks = []
+        async for text in _async_stream("review_section", request):
+            if started is not None:
+                started.set()
+            chunks.append(text)
+        return _section_text(section, ''.join(chunks))
+
+    try:
+        return await _async_cached_response(_section_request(resume_text, jd_text, section), produce)
+    except Exception as e:
+        print(f"[Claude error] {e}")
+        return CLAUDE_ERROR_MESSAGE
+    finally:
+        if started is not None:
+            started.set()
 
 
 def clean_claude_response(text: str) -> str:
@@ -43,4 +322,46 @@ def clean_claude_response(text: str) -> str:
     # Remove any <tags> like <job_fit> and <analysis> that Claude uses
     cleaned = re.sub(r"</?[\w_]+>", "", text)
     # Convert Markdown to HTML
-    return markdown2.markdown(cleaned)
\ No newline at end of file
+    return markdown2.markdown(cleaned)
+
+
+def clean_claude_stream(chunks):
+    """Apply clean_claude_response to streamed text one finished Markdown block at a time.
+
+    Text is held back until a blank line ends a block (outside fenced code), so
+    every HTML fragment yielded is complete and safe to append to the page.
+    """
+    pending = ""
+    for chunk in chunks:
+        pending += chunk
+        split_at = _last_block_boundary(pending)
+        if split_at > 0:
+            block, pending = pending[:split_at], pending[split_at:]
+            html = clean_claude_response(block)
+            if html.strip():
+                yield html
+    if pending.strip():
+        yield clean_claude_response(pending)
+
+
+async def async_clean_claude_stream(chunks):
+    """Async version of clean_claude_stream, for async iterators of text."""
+    pending = ""
+    async for chunk in chunks:
+        pending += chunk
+        split_at = _last_block_boundary(pending)
+        if split_at > 0:
+            block, pending = pending[:split_at], pending[split_at:]
+            html = clean_claude_response(block)
+            if html.strip():
+                yield html
+    if pending.strip():
+        yield clean_claude_response(pending)
+
+
+def _last_block_boundary(text):
+    # end of the last blank line that isn't inside a ``` fence, or 0 if none
+    boundary = text.rfind("\n\n")
+    while boundary != -1 and text.count("```", 0, boundary) % 2 == 1:
+        boundary = text.rfind("\n\n", 0, boundary)
+    return boundary + 2 if boundary != -1 else 0
@@ -0,0 +1,56 @@
+"""
+gunicorn settings for privacv.
+
+    gunicorn privacv:app
+    gunicorn privacv_asgi:app -k uvicorn.workers.UvicornWorker
+
+With PRIVACV_PRELOAD=1 (the default) the master imports the app and runs
+redactr.warmup() (spaCy model, phonenumbers metadata, name lists, address
+parsers) before it forks, so the workers start with those pages shared
+copy-on-write instead of each loading its own copy. Garbage collection is
+kept off in the master and everything it allocated is moved to gc.freeze()'s
+permanent generation right before the fork; otherwise the first collection in
+each worker writes to every tracked object's header and un-shares the pages
+they sit on. The workers turn collection back on as soon as they start.
+
+PRIVACV_PRELOAD=0 loads everything in each worker instead, which is slower to
+boot and uses more memory, but lets `kill -HUP` pick up code changes.
+benchmarks/bench_workers.py measures shared and private memory per worker
+in both modes.
+
+    WEB_CONCURRENCY   worker processes (default 2)
+    PRIVACV_BIND      address to listen on (default 127.0.0.1:8000)
+    PRIVACV_PRELOAD   1 to load models in the master before forking (default 1)
+"""
+import gc
+import os
+
+bind = os.environ.get("PRIVACV_BIND", "127.0.0.1:8000")
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+preload_app = os.environ.get("PRIVACV_PRELOAD", "1") != "0"
+# Reviews and interview turns wait on Claude for up to a couple of minutes
+timeout = 180
+
+if preload_app:
+    # This file is read before the app is imported, so nothing the master
+    # loads is collected, and the heap isn't left with freed holes, before the fork
+    gc.disable()
+
+
+def when_ready(server):
+    # Runs in the master after the app is imported and before any worker is forked
+    if preload_app:
+        from redactr import warmup
+        warmup()
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    if preload_app:
+        gc.enable()
+
+
+def post_worker_init(worker):
+    if not preload_app:
+        from redactr import warmup
+        warmup()
@@ -0,0 +1,339 @@
+"""
+Compact server-side storage for mock interview sessions.
+
+The browser session only carries an interview id. Resume and job description
+text is stored once per distinct content, keyed by its hash, and the
+transcript is an append-only log of msgpack-encoded records, so a turn writes
+two new messages and a small metadata record instead of re-pickling the whole
+interview. Interviews that have been idle for longer than the timeout are
+removed by a background sweeper, along with content no interview refers to.
+
+Messages folded into the summary stay in the log, but the meta records
+where the active ones start, so a load only decodes the turns since then.
+
+Layout under the store's root directory, which only its owner can read:
+
+    content/<sha256>             resume and job description texts
+    interviews/<id>/meta         InterviewMeta, rewritten on every save
+    interviews/<id>/transcript   length-prefixed MessageRecord/UsageRecord log
+"""
+import hashlib
+import os
+import shutil
+import struct
+import tempfile
+import threading
+import time
+import uuid
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
+
+import msgspec
+from cachetools import LRUCache
+
+DEFAULT_IDLE_TIMEOUT = 2 * 60 * 60
+DEFAULT_SWEEP_INTERVAL = 10 * 60
+
+_RECORD_HEADER = struct.Struct(">I")
+
+
+class MessageRecord(msgspec.Struct, tag="m", array_like=True):
+    role: str
+    content: str
+
+
+class UsageRecord(msgspec.Struct, tag="u", array_like=True):
+    input_tokens: int
+    output_tokens: int
+    cache_creation_input_tokens: int
+    cache_read_input_tokens: int
+    latency_ms: int
+
+
+class InterviewMeta(msgspec.Struct):
+    resume_hash: str
+    jd_hash: str
+    current_stage: str
+    question_count: int
+    stages: List[str]
+    summary: str = ""
+    summarized_messages: int = 0
+    # Records already in the transcript log
+    logged_messages: int = 0
+    logged_usage: int = 0
+    # Where the records after the last summarized message start in the log,
+    # and how many usage records come before that
+    active_offset: int = 0
+    usage_before_offset: int = 0
+
+
+_meta_encoder = msgspec.msgpack.Encoder()
+_meta_decoder = msgspec.msgpack.Decoder(InterviewMeta)
+_record_encoder = msgspec.msgpack.Encoder()
+_record_decoder = msgspec.msgpack.Decoder(Union[MessageRecord, UsageRecord])
+
+
+class InterviewStore:
+    """File-backed store of interview sessions, shared safely by the threads of one process."""
+
+    def __init__(self, root: str, idle_timeout: float = DEFAULT_IDLE_TIMEOUT):
+        """
+        Args:
+            root: Directory to keep interviews and content in
+            idle_timeout: Seconds after its last use that an interview expires
+        """
+        self.root = root
+        self.idle_timeout = idle_timeout
+        self._content_dir = os.path.join(root, "content")
+        self._interviews_dir = os.path.join(root, "interviews")
+        # Interview answers are private to the server's user. The root may be a
+        # predictable path in a shared temp dir, so refuse one somebody else made
+        os.makedirs(root, mode=0o700, exist_ok=True)
+        if hasattr(os, "getuid") and os.stat(root).st_uid != os.getuid():
+            raise PermissionError(f"Interview store {root} belongs to another user")
+        os.chmod(root, 0o700)
+        os.makedirs(self._content_dir, mode=0o700, exist_ok=True)
+        os.makedirs(self._interviews_dir, mode=0o700, exist_ok=True)
+        self._content_cache = LRUCache(maxsize=256)
+        self._lock = threading.Lock()
+        self._sweeper: Optional[threading.Thread] = None
+
+    def create(self, resume_text: str, jd_text: str, interview_state: Dict) -> str:
+        """
+        Start storing a new interview.
+        
+        Args:
+            resume_text: The redacted resume text
+            jd_text: The job description text
+            interview_state: Initial state of the interview
+            
+        Returns:
+            Id to keep in the session
+        """
+        interview_id = uuid.uuid4().hex
+        os.makedirs(self._interview_dir(interview_id), mode=0o700)
+        meta = InterviewMeta(resume_hash=self._put_content(resume_text),
+                             jd_hash=self._put_content(jd_text),
+                             current_stage=interview_state["current_stage"],
+                             question_count=interview_state["question_count"],
+                             stages=interview_state["stages"])
+        _open_transcript(self._transcript_path(interview_id)).close()
+        self._write_meta(interview_id, meta)
+        self.save(interview_id, interview_state)
+        return interview_id
+
+    def load(self, interview_id: str) -> Optional[Tuple[str, str, Dict]]:
+        """
+        Read an interview back, marking it as recently used.
+        
+        Args:
+            interview_id: Id returned by create()
+            
+        Returns:
+            (resume text, job description, interview state), or None if the
+            interview doesn't exist or has expired
+        """
+        meta = self._read_meta(interview_id)
+        if meta is None:
+            return None
+        os.utime(self._meta_path(interview_id))
+
+        messages = []
+        usage = []
+        for record, _ in self._read_transcript(interview_id, meta.active_offset):
+            if isinstance(record, MessageRecord):
+                messages.append({"role": record.role, "content": record.content})
+            else:
+                usage.append(msgspec.structs.asdict(record))
+
+        # Messages folded into the summary since the offset was recorded may still be in it
+        active_messages = meta.logged_messages - meta.summarized_messages
+        interview_state = {
+            "messages": messages[max(0, len(messages) - active_messages):],
+            "question_count": meta.question_count,
+            "current_stage": meta.current_stage,
+            "stages": meta.stages,
+            "usage": usage,
+            "summary": meta.summary,
+            "summarized_messages": meta.summarized_messages,
+        }
+        return self._get_content(meta.resume_hash), self._get_content(meta.jd_hash), interview_state
+
+    def save(self, interview_id: str, interview_state: Dict) -> None:
+        """
+        Persist the changes made to an interview since it was loaded.
+        
+        Only messages and usage entries that aren't in the log yet are
+        appended; messages folded into the summary stay in the log, and the
+        offset load() starts reading from moves past them.
+        
+        Args:
+            interview_id: Id returned by create()
+            interview_state: Updated state of the interview, as returned by
+                load() (or passed to create()) since the last save
+        """
+        with self._lock:
+            meta = self._read_meta(interview_id)
+            if meta is None:
+                raise KeyError(f"Interview {interview_id} not found or expired")
+
+            summarized = interview_state.get("summarized_messages", 0)
+            total_messages = summarized + len(interview_state["messages"])
+            unlogged = total_messages - meta.logged_messages
+            new_messages = interview_state["messages"][max(0, len(interview_state["messages"]) - unlogged):]
+            # A loaded state only holds the usage records after the offset
+            usage = interview_state.get("usage", [])
+            new_usage = usage[meta.logged_usage - meta.usage_before_offset:]
+
+            records = [MessageRecord(message["role"], message["content"]) for message in new_messages]
+            records.extend(UsageRecord(**entry) for entry in new_usage)
+            if records:
+                with _open_transcript(self._transcript_path(interview_id)) as transcript:
+                    transcript.write(b"".join(_encode_record(record) for record in records))
+            if summarized > meta.summarized_messages:
+                self._skip_summarized(interview_id, meta, summarized - meta.summarized_messages)
+
+            meta.current_stage = interview_state["current_stage"]
+            meta.question_count = interview_state["question_count"]
+            meta.summary = interview_state.get("summary", "")
+            meta.summarized_messages = summarized
+            meta.logged_messages = total_messages
+            meta.logged_usage += len(new_usage)
+            self._write_meta(interview_id, meta)
+
+    def delete(self, interview_id: str) -> None:
+        """Remove an interview. Its content is left for the sweeper."""
+        shutil.rmtree(self._interview_dir(interview_id), ignore_errors=True)
+
+    def sweep(self) -> int:
+        """
+        Remove expired interviews and unreferenced content.
+        
+        Returns:
+            Number of interviews removed
+        """
+        cutoff = time.time() - self.idle_timeout
+        removed = 0
+        referenced = set()
+        for interview_id in os.listdir(self._interviews_dir):
+            try:
+                if os.path.getmtime(self._meta_path(interview_id)) < cutoff:
+                    self.delete(interview_id)
+                    removed += 1
+                    continue
+            except FileNotFoundError:
+                # Being created or deleted right now
+                continue
+            meta = self._read_meta(interview_id)
+            if meta is not None:
+                referenced.update((meta.resume_hash, meta.jd_hash))
+
+        # Content is only removed once it is both unreferenced and old, so
+        # content written for an interview that is still being created survives
+        for name in os.listdir(self._content_dir):
+            try:
+                path = os.path.join(self._content_dir, name)
+                if name not in referenced and os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except FileNotFoundError:
+                pass
+        return removed
+
+    def start_sweeper(self, interval: float = DEFAULT_SWEEP_INTERVAL) -> None:
+        """Run sweep() every interval seconds in a daemon thread."""
+        if self._sweeper is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.sweep()
+                except Exception as e:
+                    print(f"Error sweeping interview store: {e}")
+
+        self._sweeper = threading.Thread(target=run, name="interview-store-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def _put_content(self, text: str) -> str:
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        path = os.path.join(self._content_dir, digest)
+        if os.path.exists(path):
+            # Refresh it so the sweeper doesn't remove it from under a new interview
+            os.utime(path)
+        else:
+            _atomic_write(path, text.encode("utf-8"))
+        self._content_cache[digest] = text
+        return digest
+
+    def _get_content(self, digest: str) -> str:
+        text = self._content_cache.get(digest)
+        if text is None:
+            with open(os.path.join(self._content_dir, digest), "rb") as f:
+                text = f.read().decode("utf-8")
+            self._content_cache[digest] = text
+        return text
+
+    def _read_meta(self, interview_id: str) -> Optional[InterviewMeta]:
+        try:
+            with open(self._meta_path(interview_id), "rb") as f:
+                return _meta_decoder.decode(f.read())
+        except (FileNotFoundError, NotADirectoryError, KeyError):
+            return None
+
+    def _write_meta(self, interview_id: str, meta: InterviewMeta) -> None:
+        _atomic_write(self._meta_path(interview_id), _meta_encoder.encode(meta))
+
+    def _read_transcript(self, interview_id: str,
+                         offset: int = 0) -> Iterator[Tuple[Union[MessageRecord, UsageRecord], int]]:
+        # Records from offset on, each with the offset just past it
+        with open(self._transcript_path(interview_id), "rb") as f:
+            f.seek(offset)
+            data = f.read()
+        position = 0
+        while position < len(data):
+            (length,) = _RECORD_HEADER.unpack_from(data, position)
+            position += _RECORD_HEADER.size
+            record = _record_decoder.decode(data[position:position + length])
+            position += length
+            yield record, offset + position
+
+    def _skip_summarized(self, interview_id: str, meta: InterviewMeta, count: int) -> None:
+        # Move the active offset past the next count messages, which have just
+        # been folded into the summary
+        for record, end in self._read_transcript(interview_id, meta.active_offset):
+            if isinstance(record, UsageRecord):
+                meta.usage_before_offset += 1
+            else:
+                count -= 1
+            meta.active_offset = end
+            if count == 0:
+                break
+
+    def _interview_dir(self, interview_id: str) -> str:
+        # Ids come from the session cookie; never let one escape the store
+        if not interview_id.isalnum():
+            raise KeyError(f"Invalid interview id: {interview_id!r}")
+        return os.path.join(self._interviews_dir, interview_id)
+
+    def _meta_path(self, interview_id: str) -> str:
+        return os.path.join(self._interview_dir(interview_id), "meta")
+
+    def _transcript_path(self, interview_id: str) -> str:
+        return os.path.join(self._interview_dir(interview_id), "transcript")
+
+
+def _encode_record(record: Union[MessageRecord, UsageRecord]) -> bytes:
+    payload = _record_encoder.encode(record)
+    return _RECORD_HEADER.pack(len(payload)) + payload
+
+
+def _open_transcript(path: str) -> BinaryIO:
+    # Created readable by the owner only, like the files _atomic_write makes
+    return os.fdopen(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600), "ab")
+
+
+def _atomic_write(path: str, data: bytes) -> None:
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(temp_path, path)
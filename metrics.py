@@ -0,0 +1,98 @@
+"""
+Prometheus metrics for PDF redaction, its cache and the Claude calls, served on /metrics.
+
+Recording an observation is a lock and a couple of additions; nothing is
+formatted until /metrics is scraped, so the hooks cost next to nothing when
+no one is scraping.
+
+Metrics live in each process's memory. Work done in the redaction process
+pools (UPLOAD_MODE=job, the ASGI app) and in separate gunicorn workers is only
+included if PROMETHEUS_MULTIPROC_DIR points at a shared, empty directory (see
+the prometheus_client documentation on multiprocess mode).
+"""
+import contextlib
+import os
+import time
+from typing import Any, Iterator, Tuple
+
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram,
+                               generate_latest, multiprocess)
+
+STAGE_BUCKETS = (.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30)
+CLAUDE_BUCKETS = (.25, .5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+# Token counts reported in a response's usage, by the label they're recorded under
+USAGE_FIELDS = {
+    "input": "input_tokens",
+    "output": "output_tokens",
+    "cache_creation": "cache_creation_input_tokens",
+    "cache_read": "cache_read_input_tokens",
+}
+
+STAGE_SECONDS = Histogram("privacv_stage_seconds", "Wall time of PDF extraction and each redaction stage",
+                          ["stage"], buckets=STAGE_BUCKETS)
+CLAUDE_SECONDS = Histogram("privacv_claude_request_seconds", "Wall time of Claude calls, to the end of the response",
+                           ["call"], buckets=CLAUDE_BUCKETS)
+CLAUDE_REQUESTS = Counter("privacv_claude_requests", "Claude calls by outcome", ["call", "outcome"])
+CLAUDE_TOKENS = Counter("privacv_claude_tokens", "Tokens used by Claude calls", ["call", "kind"])
+REDACTION_CACHE_LOOKUPS = Counter("privacv_redaction_cache_lookups",
+                                  "Redaction cache lookups by result: memory_hit, disk_hit or miss", ["result"])
+
+
+def stage_timer(stage: str):
+    """
+    Time a pipeline stage into privacv_stage_seconds.
+
+    Args:
+        stage: Name of the stage, e.g. "extract" or "phones"
+
+    Returns:
+        Object usable both as a decorator and as a context manager
+    """
+    return STAGE_SECONDS.labels(stage).time()
+
+
+@contextlib.contextmanager
+def claude_call(call: str) -> Iterator[None]:
+    """
+    Time a Claude call and count it as "ok" or "error" depending on whether the block raises.
+
+    Args:
+        call: Which call this is, e.g. "review" or "interview"
+    """
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        CLAUDE_SECONDS.labels(call).observe(time.perf_counter() - started)
+        CLAUDE_REQUESTS.labels(call, outcome).inc()
+
+
+def record_usage(call: str, usage: Any) -> None:
+    """
+    Add the token counts of a Claude response to privacv_claude_tokens.
+
+    Args:
+        call: Which call this is, as passed to claude_call
+        usage: The response's usage
+    """
+    for kind, field in USAGE_FIELDS.items():
+        tokens = getattr(usage, field, None)
+        if tokens:
+            CLAUDE_TOKENS.labels(call, kind).inc(tokens)
+
+
+def render() -> Tuple[bytes, str]:
+    """
+    Format every metric in the Prometheus text format.
+
+    Returns:
+        The response body and its content type
+    """
+    registry = REGISTRY
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
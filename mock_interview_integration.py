@@ -1,7 +1,42 @@
-from anthropic import Anthropic
-import os
-from typing import List, Dict, Any
+from anthropic_client import get_async_client, get_client
+from metrics import claude_call, record_usage
+from typing import List, Dict, Any, AsyncIterator, Iterator, Optional, Tuple
 import json
+import os
+import time
+
+INTERVIEW_MODEL = "claude-3-7-sonnet-20250219"
+
+# Once the transcript is estimated to be longer than this many tokens, turns
+# older than the last INTERVIEW_KEEP_TURNS are folded into a running summary
+INTERVIEW_SUMMARY_THRESHOLD_TOKENS = int(os.environ.get("INTERVIEW_SUMMARY_THRESHOLD_TOKENS", 4000))
+INTERVIEW_KEEP_TURNS = int(os.environ.get("INTERVIEW_KEEP_TURNS", 4))
+# Turns are only folded once they add up to this many estimated tokens, so an
+# interview whose kept turns alone pass the threshold doesn't pay for a summary
+# call on every turn
+INTERVIEW_SUMMARY_MIN_TOKENS = int(os.environ.get("INTERVIEW_SUMMARY_MIN_TOKENS", 1000))
+
+# Rough size of a token in English text, for estimating transcript length
+CHARS_PER_TOKEN = 4
+
+
+def new_interview_state() -> Dict:
+    """
+    Create the state of an interview that hasn't started yet.
+    
+    Returns:
+        Dict holding the conversation history and the interview's position
+    """
+    return {
+        "messages": [],
+        "question_count": 0,
+        "current_stage": "introduction",
+        "stages": ["introduction", "technical", "behavioral", "closing"],
+        "usage": [],
+        "summary": "",
+        "summarized_messages": 0
+    }
+
 
 def conduct_mock_interview(resume_text: str, job_description: str, user_response: str = None, interview_state: Dict = None) -> Dict:
     """
@@ -16,26 +51,260 @@ def conduct_mock_interview(resume_text: str, job_description: str, user_response
     Returns:
         Dict containing the interview response, updated state, and any other relevant information
     """
-    # Initialize the client
-    client = Anthropic(api_key=os.environ.get("ANTHROPIC_API_KEY"))
+    # Shared client, so interview turns reuse pooled connections
+    client = get_client()
     
     # If this is a new interview, initialize the state
     if interview_state is None:
-        interview_state = {
-            "messages": [],
-            "question_count": 0,
-            "current_stage": "introduction",
-            "stages": ["introduction", "technical", "behavioral", "closing"]
-        }
-
-    # Create system prompt with context
-    system_prompt = f"""
-    You are an expert technical interviewer conducting a job interview. 
+        interview_state = new_interview_state()
+
+    request, turn_content = _prepare_turn(resume_text, job_description, user_response, interview_state)
     
-    # Context
-    The candidate's resume: {resume_text}
+    # Call Claude with the complete context
+    started = time.perf_counter()
+    with claude_call("interview"):
+        response = client.messages.create(**request)
     
-    The job description: {job_description}
+    _record_turn(interview_state, turn_content, response.content[0].text, user_response)
+    _record_usage(interview_state, response.usage, time.perf_counter() - started)
+    compact_interview_state(interview_state)
+    
+    return {
+        "interviewer_response": response.content[0].text,
+        "interview_state": interview_state,
+        "success": True
+    }
+
+
+def stream_mock_interview(resume_text: str, job_description: str, user_response: str = None, interview_state: Dict = None) -> Iterator[str]:
+    """
+    Streaming version of conduct_mock_interview.
+    
+    Args:
+        resume_text: The redacted resume text
+        job_description: The job description text
+        user_response: The user's latest response in the interview (None for first interaction)
+        interview_state: Current state of the interview (see new_interview_state); it is
+            updated in place once the interviewer's reply is complete
+    
+    Returns:
+        Iterator over chunks of the interviewer's reply as Claude produces them
+    """
+    request, turn_content = _prepare_turn(resume_text, job_description, user_response, interview_state)
+    
+    chunks = []
+    started = time.perf_counter()
+    with claude_call("interview"), get_client().messages.stream(**request) as stream:
+        for text in stream.text_stream:
+            chunks.append(text)
+            yield text
+        usage = stream.get_final_message().usage
+    
+    _record_turn(interview_state, turn_content, "".join(chunks), user_response)
+    _record_usage(interview_state, usage, time.perf_counter() - started)
+    compact_interview_state(interview_state)
+
+
+async def async_conduct_mock_interview(resume_text: str, job_description: str, user_response: str = None, interview_state: Dict = None) -> Dict:
+    """Async version of conduct_mock_interview, for the ASGI app."""
+    if interview_state is None:
+        interview_state = new_interview_state()
+
+    request, turn_content = _prepare_turn(resume_text, job_description, user_response, interview_state)
+    
+    started = time.perf_counter()
+    with claude_call("interview"):
+        response = await get_async_client().messages.create(**request)
+    
+    _record_turn(interview_state, turn_content, response.content[0].text, user_response)
+    _record_usage(interview_state, response.usage, time.perf_counter() - started)
+    await async_compact_interview_state(interview_state)
+    
+    return {
+        "interviewer_response": response.content[0].text,
+        "interview_state": interview_state,
+        "success": True
+    }
+
+
+async def async_stream_mock_interview(resume_text: str, job_description: str, user_response: str = None, interview_state: Dict = None) -> AsyncIterator[str]:
+    """Async version of stream_mock_interview."""
+    request, turn_content = _prepare_turn(resume_text, job_description, user_response, interview_state)
+    
+    chunks = []
+    started = time.perf_counter()
+    with claude_call("interview"):
+        async with get_async_client().messages.stream(**request) as stream:
+            async for text in stream.text_stream:
+                chunks.append(text)
+                yield text
+            usage = (await stream.get_final_message()).usage
+    
+    _record_turn(interview_state, turn_content, "".join(chunks), user_response)
+    _record_usage(interview_state, usage, time.perf_counter() - started)
+    await async_compact_interview_state(interview_state)
+
+
+def compact_interview_state(interview_state: Dict,
+                            threshold_tokens: int = None,
+                            keep_turns: int = None) -> bool:
+    """
+    Fold older turns into a running summary once the transcript gets long.
+    
+    Without this, every turn resends the whole history, so input tokens grow
+    quadratically over an interview. Only the last keep_turns turns are kept
+    verbatim; everything before them lives in interview_state["summary"].
+    Compaction is best-effort: if the summary call fails, the state is left
+    as it was and the next turn tries again.
+    
+    Args:
+        interview_state: Current state of the interview, updated in place
+        threshold_tokens: Estimated transcript size that triggers compaction
+            (defaults to INTERVIEW_SUMMARY_THRESHOLD_TOKENS)
+        keep_turns: Number of recent turns to keep verbatim (defaults to INTERVIEW_KEEP_TURNS)
+    
+    Returns:
+        True if older turns were summarized
+    """
+    older = _turns_to_summarize(interview_state, threshold_tokens, keep_turns)
+    if older is None:
+        return False
+    
+    try:
+        with claude_call("interview_summary"):
+            response = get_client().messages.create(**_summary_request(interview_state.get("summary", ""), older))
+    except Exception as e:
+        print(f"[Interview summary error] {e}")
+        return False
+    record_usage("interview_summary", response.usage)
+    _apply_summary(interview_state, response.content[0].text, len(older))
+    return True
+
+
+async def async_compact_interview_state(interview_state: Dict,
+                                        threshold_tokens: int = None,
+                                        keep_turns: int = None) -> bool:
+    """Async version of compact_interview_state."""
+    older = _turns_to_summarize(interview_state, threshold_tokens, keep_turns)
+    if older is None:
+        return False
+    
+    try:
+        with claude_call("interview_summary"):
+            response = await get_async_client().messages.create(**_summary_request(interview_state.get("summary", ""), older))
+    except Exception as e:
+        print(f"[Interview summary error] {e}")
+        return False
+    record_usage("interview_summary", response.usage)
+    _apply_summary(interview_state, response.content[0].text, len(older))
+    return True
+
+
+def _turns_to_summarize(interview_state: Dict, threshold_tokens: Optional[int], keep_turns: Optional[int]) -> Optional[List[Dict]]:
+    if threshold_tokens is None:
+        threshold_tokens = INTERVIEW_SUMMARY_THRESHOLD_TOKENS
+    if keep_turns is None:
+        keep_turns = INTERVIEW_KEEP_TURNS
+    
+    messages = interview_state["messages"]
+    # Each turn is a user message followed by the interviewer's reply
+    keep_messages = 2 * keep_turns
+    if len(messages) <= keep_messages or estimate_tokens(messages) <= threshold_tokens:
+        return None
+    older = messages[:len(messages) - keep_messages]
+    if estimate_tokens(older) < INTERVIEW_SUMMARY_MIN_TOKENS:
+        return None
+    return older
+
+
+def _apply_summary(interview_state: Dict, summary: str, summarized_count: int) -> None:
+    interview_state["summary"] = summary
+    interview_state["messages"] = interview_state["messages"][summarized_count:]
+    interview_state["summarized_messages"] = interview_state.get("summarized_messages", 0) + summarized_count
+
+
+def estimate_tokens(messages: List[Dict]) -> int:
+    """Estimate the number of tokens in a list of messages."""
+    return sum(len(message["content"]) for message in messages) // CHARS_PER_TOKEN
+
+
+def _summary_request(summary: str, messages: List[Dict]) -> Dict[str, Any]:
+    transcript = "\n\n".join(
+        f"{'Candidate' if message['role'] == 'user' else 'Interviewer'}: {message['content']}"
+        for message in messages
+    )
+    prompt = f"""
+    Update the running summary of a mock job interview with the turns below.
+    Keep every question asked, the substance of each answer, and anything the
+    interviewer said they would come back to. Write in compact prose, no more
+    than 300 words.
+    
+    <summary>
+    {summary or "The interview has just started."}
+    </summary>
+    
+    <turns>
+    {transcript}
+    </turns>
+    """
+    return {
+        "model": INTERVIEW_MODEL,
+        "max_tokens": 512,
+        "messages": [{"role": "user", "content": prompt}]
+    }
+
+
+def interview_feedback_request(resume_text: str, job_description: str, interview_state: Dict) -> Dict[str, Any]:
+    """
+    Build the Messages API request that asks for feedback on a finished interview.
+    
+    Args:
+        resume_text: The redacted resume text
+        job_description: The job description text
+        interview_state: State of the finished interview
+    
+    Returns:
+        Keyword arguments for client.messages.create or client.messages.stream
+    """
+    # Extract conversation history
+    messages = interview_state["messages"]
+    
+    summary = interview_state.get("summary")
+    earlier_turns = f"""
+        Summary of the earlier part of the interview: {summary}
+        """ if summary else ""
+    
+    feedback_prompt = f"""
+        # Interview Feedback Request
+        
+        Resume: {resume_text}
+        Job Description: {job_description}
+        {earlier_turns}
+        Please provide constructive feedback on this mock interview, including:
+        1. Overall assessment
+        2. Communication strengths
+        3. Areas for improvement
+        4. Alignment with the job requirements
+        """
+    
+    return {
+        "model": INTERVIEW_MODEL,
+        "max_tokens": 2048,
+        "messages": [
+            {"role": "assistant", "content": "You are an expert interview coach providing constructive feedback."},
+            *messages,
+            {"role": "user", "content": feedback_prompt}
+        ]
+    }
+
+
+def _prepare_turn(resume_text: str, job_description: str, user_response: str, interview_state: Dict) -> Tuple[Dict[str, Any], str]:
+    # The instructions, resume and job description are the same on every turn,
+    # so they form a stable prefix that Claude can cache (prefixes under the
+    # model's minimum cacheable length are simply not cached). The stage
+    # metadata changes every turn and goes after the cache breakpoint.
+    static_prompt = f"""
+    You are an expert technical interviewer conducting a job interview. 
     
     # Interview Instructions
     - Your role is to act as the interviewer, asking questions relevant to the resume and job description
@@ -47,38 +316,49 @@ def conduct_mock_interview(resume_text: str, job_description: str, user_response
     - Do not simulate or generate the candidate's responses
     - Do not break character as the interviewer
     
+    # Context
+    The candidate's resume: {resume_text}
+    
+    The job description: {job_description}
+    """
+    stage_prompt = f"""
     Current stage: {interview_state["current_stage"]}
     Questions asked so far: {interview_state["question_count"]}
     """
-    
-    # Build the conversation history for context
-    messages = [
-        {"role": "system", "content": system_prompt}
+    if interview_state.get("summary"):
+        # Older turns have been folded into a summary (see compact_interview_state)
+        stage_prompt += f"""
+    Summary of the interview before the messages below: {interview_state["summary"]}
+    """
+    system_prompt = [
+        {"type": "text", "text": static_prompt, "cache_control": {"type": "ephemeral"}},
+        {"type": "text", "text": stage_prompt}
     ]
     
-    # Add conversation history
-    for msg in interview_state["messages"]:
-        messages.append(msg)
+    # Build the conversation history for context
+    messages = list(interview_state["messages"])
     
     # If this is the first interaction, generate initial interviewer greeting
     if user_response is None:
-        interviewer_prompt = "Begin the interview with a professional introduction and your first question."
-        messages.append({"role": "user", "content": interviewer_prompt})
+        turn_content = "Begin the interview with a professional introduction and your first question."
     else:
         # Add the user's response to the messages
-        messages.append({"role": "user", "content": user_response})
-    
-    # Call Claude with the complete context
-    response = client.messages.create(
-        model="claude-3-7-sonnet-20250219",
-        max_tokens=1024,
-        system=system_prompt,
-        messages=messages[1:]  # Exclude system prompt as it's passed separately
-    )
+        turn_content = user_response
+    messages.append({"role": "user", "content": turn_content})
     
+    request = {
+        "model": INTERVIEW_MODEL,
+        "max_tokens": 1024,
+        "system": system_prompt,
+        "messages": messages
+    }
+    return request, turn_content
+
+
+def _record_turn(interview_state: Dict, turn_content: str, interviewer_response: str, user_response: str) -> None:
     # Update interview state
-    interview_state["messages"].append({"role": "user", "content": user_response if user_response else interviewer_prompt})
-    interview_state["messages"].append({"role": "assistant", "content": response.content[0].text})
+    interview_state["messages"].append({"role": "user", "content": turn_content})
+    interview_state["messages"].append({"role": "assistant", "content": interviewer_response})
     
     # Update question count if this was an interviewer question
     if user_response is not None:
@@ -89,9 +369,16 @@ def conduct_mock_interview(resume_text: str, job_description: str, user_response
         current_index = interview_state["stages"].index(interview_state["current_stage"])
         if current_index < len(interview_state["stages"]) - 1:
             interview_state["current_stage"] = interview_state["stages"][current_index + 1]
-    
-    return {
-        "interviewer_response": response.content[0].text,
-        "interview_state": interview_state,
-        "success": True
-    }
+
+
+def _record_usage(interview_state: Dict, usage: Any, elapsed: float) -> None:
+    # Per-turn token counts, including how much of the prompt was written to
+    # or read from the prompt cache, plus the turn's wall time
+    record_usage("interview", usage)
+    interview_state.setdefault("usage", []).append({
+        "input_tokens": usage.input_tokens,
+        "output_tokens": usage.output_tokens,
+        "cache_creation_input_tokens": usage.cache_creation_input_tokens or 0,
+        "cache_read_input_tokens": usage.cache_read_input_tokens or 0,
+        "latency_ms": round(elapsed * 1000)
+    })
@@ -0,0 +1,73 @@
+"""
+First-name and surname lists for redactr's rule-based name detector.
+
+The lists live in name_data/ as one lower-case name per line: the US Census
+first names and surnames (about 5,000 and 89,000) plus common names from other
+countries that the census lacks. They are loaded into marisa-trie tries, which
+hold them in a fraction of the memory a Python set of strings would take and
+are shared read-only between forked workers.
+"""
+import functools
+import os
+from typing import Iterable
+
+import marisa_trie
+
+NAME_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "name_data")
+
+
+class NameGazetteer:
+    """Case-insensitive lookups of first names and surnames."""
+
+    def __init__(self, first_names: Iterable[str], surnames: Iterable[str]):
+        """
+        Args:
+            first_names: Known first names, in any case
+            surnames: Known surnames, in any case
+        """
+        self._first_names = marisa_trie.Trie(_normalize(name) for name in first_names)
+        self._surnames = marisa_trie.Trie(_normalize(name) for name in surnames)
+
+    @classmethod
+    def from_directory(cls, directory: str = NAME_DATA_DIR, exclude: Iterable[str] = ()) -> "NameGazetteer":
+        """
+        Load first_names.txt and surnames.txt from a directory.
+        
+        Args:
+            directory: Directory holding the lists
+            exclude: Names to leave out of both lists, e.g. to measure how the
+                detector does on names it doesn't know
+        """
+        excluded = {_normalize(name) for name in exclude}
+        return cls([name for name in _read_names(os.path.join(directory, "first_names.txt"))
+                    if _normalize(name) not in excluded],
+                   [name for name in _read_names(os.path.join(directory, "surnames.txt"))
+                    if _normalize(name) not in excluded])
+
+    def is_first_name(self, word: str) -> bool:
+        return _lookup(self._first_names, word)
+
+    def is_surname(self, word: str) -> bool:
+        return _lookup(self._surnames, word)
+
+
+@functools.lru_cache(maxsize=None)
+def get_gazetteer() -> NameGazetteer:
+    """Return the process-wide gazetteer, loading it from NAME_DATA_DIR on first use."""
+    return NameGazetteer.from_directory()
+
+
+def _lookup(trie: marisa_trie.Trie, word: str) -> bool:
+    # A hyphenated name matches if any of its parts does ("Garcia-Lopez")
+    key = _normalize(word)
+    return key in trie or ("-" in key and any(part in trie for part in key.split("-")))
+
+
+def _normalize(name: str) -> str:
+    # The census lists spell "O'Brien" as "obrien"
+    return name.strip().lower().replace("’", "").replace("'", "")
+
+
+def _read_names(path: str) -> Iterable[str]:
+    with open(path, encoding="utf-8") as f:
+        return [line for line in f if line.strip() and not line.startswith("#")]
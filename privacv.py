@@ -1,27 +1,39 @@
-from flask import Flask, render_template, session, request, send_file, jsonify, make_response
+from flask import Flask, Request, Response, render_template, session, request, jsonify, stream_with_context, url_for
 from flask_session import Session
 
 import os
-import io
 import tempfile
-from werkzeug.utils import secure_filename
-import spacy
-import phonenumbers
-import pyap
-import re
-from typing import Dict, List, Tuple, Optional, BinaryIO, Union
-from PyPDF2 import PdfReader
-from redactr import redact_pdf
-from claude_utils import get_full_resume_review, clean_claude_response
-from mock_interview_integration import conduct_mock_interview
-from anthropic import Anthropic
+import threading
+import uuid
 
+from cachetools import TTLCache
+
+# Load .env.local before the app's modules, which read some settings from the
+# environment when they are imported
 from dotenv import load_dotenv
 load_dotenv(dotenv_path=".env.local")
 
+from redactr import redact_pdf, rescan, scan_text, start_scan, warmup
+from claude_utils import get_full_resume_review, get_fanout_resume_review, iter_fanout_resume_review, stream_full_resume_review, clean_claude_response
+from prompts import REVIEW_SECTIONS
+from mock_interview_integration import conduct_mock_interview, stream_mock_interview, new_interview_state, interview_feedback_request
+from anthropic_client import get_client
+from interview_store import InterviewStore, DEFAULT_IDLE_TIMEOUT
+from redaction_jobs import RedactionJobQueue, QueueFull
+from upload_io import STREAM_DOWNLOAD_MIN_CHARS, UploadBuffer, iter_encoded, spool_file
+from sse import SSE_HEADERS, SSE_MEDIA_TYPE, sse_chunks, sse_sections
+import metrics
+
+
+class SpooledRequest(Request):
+    """Request that parses uploaded files straight into an upload_io spool, held in memory unless large."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return spool_file()
+
 
 app = Flask(__name__)
-app.config['UPLOAD_FOLDER'] = tempfile.mkdtemp()
+app.request_class = SpooledRequest
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max upload size
 app.config["SESSION_TYPE"] = "filesystem"  # Store sessions on server filesystem
 
@@ -29,9 +41,37 @@ app.secret_key = os.environ.get("FLASK_SECRET_KEY")
 
 Session(app)
 
+# The NER model is loaded on the first upload unless the server calls warmup()
+# once per worker at startup, as the __main__ block below and privacv_asgi do
+
+# Interview content and transcripts live here, under the temp dir unless
+# INTERVIEW_STORE_DIR says otherwise; the session only holds an interview id
+interview_store = InterviewStore(
+    os.environ.get("INTERVIEW_STORE_DIR", os.path.join(tempfile.gettempdir(), "privacv_interview_store")),
+    idle_timeout=float(os.environ.get("INTERVIEW_IDLE_TIMEOUT", DEFAULT_IDLE_TIMEOUT)),
+)
+interview_store.start_sweeper()
+
+# Rescan state for /verify_redaction holds the PII that was removed from the
+# resume, so it stays in this process's memory and expires with the interview;
+# the session only holds its id. A check that lands on another worker, or
+# comes after expiry, scans the whole text instead.
+scan_states = TTLCache(maxsize=1024, ttl=interview_store.idle_timeout)
+scan_states_lock = threading.Lock()
+
+# "job" queues uploads for a pool of redaction worker processes instead of
+# redacting inside the request; the page then polls /upload/status/<job_id>
+UPLOAD_MODE = os.environ.get("UPLOAD_MODE", "inline")
+redaction_jobs = RedactionJobQueue.from_env() if UPLOAD_MODE == "job" else None
+
+# "fanout" writes the sections of /process_with_claude's review as concurrent
+# requests (see claude_utils.iter_fanout_resume_review) instead of one long one
+REVIEW_MODE = os.environ.get("REVIEW_MODE", "single")
+
 @app.route('/', methods=['GET'])
 def index():
-    return render_template('index.html')
+    # In "fanout" mode the page renders each section of the review as it arrives
+    return render_template('index.html', review_mode=REVIEW_MODE, review_sections=list(REVIEW_SECTIONS))
 
 
 @app.route('/upload', methods=['POST'])
@@ -47,9 +87,29 @@ def upload_pdf():
     if len(jd_text) == 0:
         return jsonify({'error': 'No job description'}), 400
     
-    # if file and '.' in file.filename and file.filename.rsplit('.', 1)[1].lower() == 'pdf':
-        # Process the PDF
-    redacted_text = redact_pdf(file)
+    # The upload was spooled once while the form was parsed; hashing, the cache
+    # and PdfReader all read that buffer
+    with UploadBuffer.load(file.stream) as upload:
+        if redaction_jobs is not None:
+            try:
+                job_id = redaction_jobs.submit(upload.view)
+            except QueueFull as e:
+                response = jsonify({'error': str(e)})
+                response.headers['Retry-After'] = str(e.retry_after)
+                return response, 503
+            
+            return jsonify({
+                'job_id': job_id,
+                'status_url': url_for('upload_status', job_id=job_id),
+                'job_description': jd_text
+            }), 202
+        
+        # if file and '.' in file.filename and file.filename.rsplit('.', 1)[1].lower() == 'pdf':
+            # Process the PDF
+        known_terms = {}
+        redacted_text = redact_pdf(upload, known_terms=known_terms)
+    # Baseline for /verify_redaction to check the user's edits against
+    save_scan(start_scan(redacted_text, known_terms))
     
     # Create a response with the redacted text and statistics
     response = {
@@ -63,26 +123,82 @@ def upload_pdf():
     # return jsonify({'error': 'File must be a PDF'}), 400
 
 
+@app.route('/upload/status/<job_id>', methods=['GET'])
+def upload_status(job_id):
+    """Report on a queued redaction job, returning the redacted text once it's done"""
+    job = redaction_jobs.status(job_id) if redaction_jobs is not None else None
+    
+    if job is None:
+        return jsonify({'error': 'Unknown or expired job'}), 404
+    if job['status'] == 'pending':
+        response = jsonify(job)
+        response.headers['Retry-After'] = '1'
+        return response, 202
+    if job['status'] == 'failed':
+        return jsonify({'error': job['error'], 'status': 'failed'}), 500
+    
+    save_scan(start_scan(job['redacted_text'], job['known_terms']))
+    return jsonify({
+        'status': 'done',
+        'redacted_text': job['redacted_text'],
+        'auto_switch_tab': True  # Flag to trigger automatic tab switch
+    })
+
+
+@app.route('/verify_redaction', methods=['POST'])
+def verify_redaction():
+    """Check the user's edited text for personal information added since the last check"""
+    text = request.form.get('text', '')
+    previous = load_scan()
+    
+    if previous is None:
+        # Nothing to compare against (e.g. the upload went through the ASGI app), so scan it all once
+        state = scan_text(text)
+        new_spans = state.spans
+    else:
+        state, new_spans = rescan(previous, text)
+    save_scan(state)
+    
+    def describe(spans):
+        return [{'start': start, 'end': end, 'label': label, 'text': text[start:end]}
+                for start, end, label in spans]
+    
+    return jsonify({
+        'clean': not state.spans,
+        'new_spans': describe(new_spans),
+        'spans': describe(state.spans)
+    })
+
+
+def save_scan(state):
+    """Keep the session's rescan state server-side, storing only its id in the session."""
+    scan_id = session.get('scan_id')
+    if scan_id is None:
+        scan_id = session['scan_id'] = uuid.uuid4().hex
+    with scan_states_lock:
+        scan_states[scan_id] = state
+
+
+def load_scan():
+    """The session's rescan state, or None if it has none or it has expired."""
+    scan_id = session.get('scan_id')
+    if scan_id is None:
+        return None
+    with scan_states_lock:
+        return scan_states.get(scan_id)
+
+
 @app.route('/download', methods=['POST'])
 def download_redacted():
     text = request.form.get('text', '')
     if not text:
         return jsonify({'error': 'No text provided'}), 400
     
-    # Create a temporary file
-    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.txt')
-    temp_file.write(text.encode('utf-8'))
-    temp_file.close()
-    
-    response = make_response(send_file(temp_file.name, as_attachment=True, 
-                                      download_name='redacted_text.txt'))
-    
-    # Clean up the file after sending
-    @response.call_on_close
-    def cleanup():
-        os.remove(temp_file.name)
-    
-    return response
+    # Served from memory; long texts are encoded and sent a chunk at a time
+    # rather than as one more full copy
+    body = text.encode('utf-8') if len(text) < STREAM_DOWNLOAD_MIN_CHARS else iter_encoded(text)
+    return Response(body, mimetype='text/plain',
+                    headers={'Content-Disposition': 'attachment; filename=redacted_text.txt'})
 
 
 @app.route('/process_with_claude', methods=['POST'])
@@ -105,7 +221,10 @@ def call_claude_wrapper(redacted_text, jd_text):
     Function to process redacted text with Claude API
     This is a placeholder - implement the actual Claude API call here
     """
-    raw_output = get_full_resume_review(redacted_text, jd_text)
+    if REVIEW_MODE == "fanout":
+        raw_output = get_fanout_resume_review(redacted_text, jd_text)
+    else:
+        raw_output = get_full_resume_review(redacted_text, jd_text)
     return clean_claude_response(raw_output)
 
 @app.route('/start_interview', methods=['POST'])
@@ -120,10 +239,9 @@ def start_interview():
     try:
         # Start new interview without user response (initial greeting)
         interview_response = conduct_mock_interview(redacted_text, jd_text)
-        # Store interview state in session
-        session['interview_state'] = interview_response['interview_state']
-        session['resume_text'] = redacted_text
-        session['job_description'] = jd_text
+        # Store the interview, keeping only its id in the session
+        session['interview_id'] = interview_store.create(
+            redacted_text, jd_text, interview_response['interview_state'])
         
         return jsonify({
             'interviewer_message': interview_response['interviewer_response'],
@@ -142,13 +260,13 @@ def continue_interview():
         return jsonify({'error': 'User response is required'}), 400
 
     try:
-        # Get interview state from session
-        interview_state = session.get('interview_state')
-        resume_text = session.get('resume_text')
-        jd_text = session.get('job_description')
+        # Get interview state from the store
+        interview_id = session.get('interview_id')
+        interview = interview_store.load(interview_id) if interview_id else None
         
-        if not interview_state or not resume_text or not jd_text:
+        if not interview:
             return jsonify({'error': 'Interview session not found or expired'}), 400
+        resume_text, jd_text, interview_state = interview
         
         # Continue interview with user response
         interview_response = conduct_mock_interview(
@@ -158,8 +276,8 @@ def continue_interview():
             interview_state
         )
         
-        # Update interview state in session
-        session['interview_state'] = interview_response['interview_state']
+        # Append the new turn to the stored interview
+        interview_store.save(interview_id, interview_response['interview_state'])
 
         return jsonify({
             'interviewer_message': interview_response['interviewer_response'],
@@ -174,40 +292,17 @@ def end_interview():
     """End the current interview session and get feedback"""
     try:
         # Clear session data
-        interview_state = session.pop('interview_state', None)
-        resume_text = session.pop('resume_text', None)
-        jd_text = session.pop('job_description', None)
+        interview = pop_interview()
         
-        if not interview_state or not resume_text or not jd_text:
+        if not interview:
             return jsonify({'error': 'No active interview session found'}), 400
+        resume_text, jd_text, interview_state = interview
         
-        client = Anthropic(api_key=os.environ.get("ANTHROPIC_API_KEY"))
-        
-        # Extract conversation history
-        messages = interview_state["messages"]
-        
-        feedback_prompt = f"""
-        # Interview Feedback Request
-        
-        Resume: {resume_text}
-        Job Description: {jd_text}
-        
-        Please provide constructive feedback on this mock interview, including:
-        1. Overall assessment
-        2. Communication strengths
-        3. Areas for improvement
-        4. Alignment with the job requirements
-        """
-        
-        response = client.messages.create(
-            model="claude-3-7-sonnet-20250219",
-            max_tokens=2048,
-            messages=[
-                {"role": "assistant", "content": "You are an expert interview coach providing constructive feedback."},
-                *messages,
-                {"role": "user", "content": feedback_prompt}
-            ]
-        )
+        with metrics.claude_call("interview_feedback"):
+            response = get_client().messages.create(
+                **interview_feedback_request(resume_text, jd_text, interview_state)
+            )
+        metrics.record_usage("interview_feedback", response.usage)
         
         return jsonify({
             'feedback': clean_claude_response(response.content[0].text),
@@ -217,5 +312,120 @@ def end_interview():
         print(e)
         return jsonify({'error': str(e), 'success': False}), 500
 
+# Streaming variants of the Claude routes. Each responds with server-sent events
+# (see sse.py): "chunk" events carrying ready-to-append HTML as Claude writes,
+# then a "done" event, or an "error" event if the call fails part way.
+
+def sse_response(events):
+    """Stream server-sent events (from sse.sse_chunks or sse.sse_sections) to the browser."""
+    return Response(stream_with_context(events), mimetype=SSE_MEDIA_TYPE, headers=SSE_HEADERS)
+
+
+def pop_interview():
+    """Remove the session's interview, returning (resume, job description, state) or None."""
+    interview_id = session.pop('interview_id', None)
+    interview = interview_store.load(interview_id) if interview_id else None
+    if interview:
+        interview_store.delete(interview_id)
+    return interview
+
+
+@app.route('/process_with_claude/stream', methods=['POST'])
+def process_with_claude_stream():
+    redacted_text = request.form.get('redacted_text', '')
+    jd_text = request.form.get('job_description', '')
+
+    if not redacted_text:
+        return jsonify({'error': 'No text provided for processing'}), 400
+
+    return sse_response(sse_chunks(stream_full_resume_review(redacted_text, jd_text)))
+
+
+@app.route('/process_with_claude/sections', methods=['POST'])
+def process_with_claude_sections():
+    """Fan-out review, sending each section as a "section" event as soon as it is written"""
+    redacted_text = request.form.get('redacted_text', '')
+    jd_text = request.form.get('job_description', '')
+
+    if not redacted_text:
+        return jsonify({'error': 'No text provided for processing'}), 400
+
+    return sse_response(sse_sections(iter_fanout_resume_review(redacted_text, jd_text)))
+
+
+@app.route('/start_interview/stream', methods=['POST'])
+def start_interview_stream():
+    """Initialize a new mock interview session, streaming the interviewer's greeting"""
+    redacted_text = request.form.get('redacted_text', '')
+    jd_text = request.form.get('job_description', '')
+
+    if not redacted_text or not jd_text:
+        return jsonify({'error': 'Resume text and job description are required'}), 400
+
+    interview_state = new_interview_state()
+    # Created up front so the id goes out with the response headers, and
+    # removed again if the greeting fails, so the next answer isn't sent to
+    # an interview that never started
+    interview_id = interview_store.create(redacted_text, jd_text, interview_state)
+    session['interview_id'] = interview_id
+
+    def commit():
+        interview_store.save(interview_id, interview_state)
+
+    def discard():
+        interview_store.delete(interview_id)
+
+    return sse_response(sse_chunks(stream_mock_interview(redacted_text, jd_text, None, interview_state),
+                                   commit, discard))
+
+
+@app.route('/continue_interview/stream', methods=['POST'])
+def continue_interview_stream():
+    """Continue an existing interview, streaming the interviewer's reply"""
+    user_response = request.form.get('user_response', '')
+
+    if not user_response:
+        return jsonify({'error': 'User response is required'}), 400
+
+    interview_id = session.get('interview_id')
+    interview = interview_store.load(interview_id) if interview_id else None
+
+    if not interview:
+        return jsonify({'error': 'Interview session not found or expired'}), 400
+    resume_text, jd_text, interview_state = interview
+
+    def commit():
+        interview_store.save(interview_id, interview_state)
+
+    return sse_response(sse_chunks(stream_mock_interview(resume_text, jd_text, user_response, interview_state), commit))
+
+
+@app.route('/end_interview/stream', methods=['POST'])
+def end_interview_stream():
+    """End the current interview session, streaming the feedback"""
+    interview = pop_interview()
+
+    if not interview:
+        return jsonify({'error': 'No active interview session found'}), 400
+    resume_text, jd_text, interview_state = interview
+
+    def stream_feedback():
+        with metrics.claude_call("interview_feedback"), get_client().messages.stream(
+            **interview_feedback_request(resume_text, jd_text, interview_state)
+        ) as stream:
+            yield from stream.text_stream
+            metrics.record_usage("interview_feedback", stream.get_final_message().usage)
+
+    return sse_response(sse_chunks(stream_feedback()))
+
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Stage and Claude call timings and token counts, in the Prometheus text format"""
+    body, content_type = metrics.render()
+    return Response(body, content_type=content_type)
+
 if __name__ == '__main__':
+    # Fail fast if the NER model isn't installed
+    warmup()
     app.run(debug=True)
\ No newline at end of file
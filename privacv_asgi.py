@@ -0,0 +1,303 @@
+"""
+ASGI entry point that serves the Claude-bound routes asynchronously.
+
+    uvicorn privacv_asgi:app
+
+The review and interview routes, and their /stream variants, run as coroutines
+on AsyncAnthropic, so one process can hold hundreds of in-flight Claude calls
+instead of one per worker thread. Redaction is CPU-bound and runs in a process
+pool, off the event loop. Every other route (the page itself, /download) is
+passed through to the Flask app in privacv.
+
+The interview id lives in this app's own signed session cookie; interviews are
+kept in the same InterviewStore as the Flask app's.
+"""
+import asyncio
+import concurrent.futures
+import contextlib
+import gc
+import os
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.sessions import SessionMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Mount, Route
+
+import metrics
+from anthropic_client import get_async_client
+from claude_utils import async_get_full_resume_review, async_get_fanout_resume_review, async_iter_fanout_resume_review, async_stream_full_resume_review, clean_claude_response
+from mock_interview_integration import async_conduct_mock_interview, async_stream_mock_interview, new_interview_state, interview_feedback_request
+from privacv import REVIEW_MODE, app as flask_app, interview_store
+from redactr import redact_pdf, warmup
+from sse import SSE_HEADERS, SSE_MEDIA_TYPE, async_sse_chunks, async_sse_sections
+
+# Worker processes for redaction (defaults to one per CPU)
+REDACTION_WORKERS = int(os.environ.get("REDACTION_WORKERS", 0)) or None
+
+redaction_pool: concurrent.futures.ProcessPoolExecutor = None
+
+# The session cookie carries the interview id; Starlette would sign it with
+# str(None) if no key were set, so anyone could forge one
+if not flask_app.secret_key:
+    raise RuntimeError("FLASK_SECRET_KEY must be set to sign session cookies")
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    global redaction_pool
+    # This process still runs the Flask routes' redaction (/verify_redaction).
+    # The pool's workers are forked after the model is loaded, and after it is
+    # frozen out of the garbage collector's reach, so they share this copy
+    warmup()
+    gc.freeze()
+    redaction_pool = concurrent.futures.ProcessPoolExecutor(REDACTION_WORKERS, initializer=warmup)
+    try:
+        yield
+    finally:
+        redaction_pool.shutdown(cancel_futures=True)
+        await get_async_client().close()
+
+
+async def upload_pdf(request: Request):
+    form = await request.form()
+    file = form.get('pdf_file')
+    jd_text = form.get('jd_text', '')
+
+    if file is None or isinstance(file, str):
+        return JSONResponse({'error': 'No file part'}, status_code=400)
+    if file.filename == '':
+        return JSONResponse({'error': 'No selected file'}, status_code=400)
+    if len(jd_text) == 0:
+        return JSONResponse({'error': 'No job description'}, status_code=400)
+
+    pdf_bytes = await file.read()
+    redacted_text = await asyncio.get_running_loop().run_in_executor(redaction_pool, redact_pdf, pdf_bytes)
+
+    return JSONResponse({
+        'redacted_text': redacted_text,
+        'job_description': jd_text,
+        'auto_switch_tab': True  # Flag to trigger automatic tab switch
+    })
+
+
+async def process_with_claude(request: Request):
+    form = await request.form()
+    redacted_text = form.get('redacted_text', '')
+    jd_text = form.get('job_description', '')
+
+    if not redacted_text:
+        return JSONResponse({'error': 'No text provided for processing'}, status_code=400)
+
+    try:
+        if REVIEW_MODE == "fanout":
+            raw_output = await async_get_fanout_resume_review(redacted_text, jd_text)
+        else:
+            raw_output = await async_get_full_resume_review(redacted_text, jd_text)
+        return JSONResponse({'claude_response': clean_claude_response(raw_output), 'success': True})
+    except Exception as e:
+        return JSONResponse({'error': str(e), 'success': False}, status_code=500)
+
+
+async def start_interview(request: Request):
+    """Initialize a new mock interview session"""
+    form = await request.form()
+    redacted_text = form.get('redacted_text', '')
+    jd_text = form.get('job_description', '')
+
+    if not redacted_text or not jd_text:
+        return JSONResponse({'error': 'Resume text and job description are required'}, status_code=400)
+
+    try:
+        interview_response = await async_conduct_mock_interview(redacted_text, jd_text)
+        request.session['interview_id'] = await run_in_threadpool(
+            interview_store.create, redacted_text, jd_text, interview_response['interview_state'])
+
+        return JSONResponse({
+            'interviewer_message': interview_response['interviewer_response'],
+            'success': True
+        })
+    except Exception as e:
+        return JSONResponse({'error': str(e), 'success': False}, status_code=500)
+
+
+async def continue_interview(request: Request):
+    """Continue an existing interview with user's response"""
+    form = await request.form()
+    user_response = form.get('user_response', '')
+
+    if not user_response:
+        return JSONResponse({'error': 'User response is required'}, status_code=400)
+
+    try:
+        interview_id = request.session.get('interview_id')
+        interview = await run_in_threadpool(interview_store.load, interview_id) if interview_id else None
+
+        if not interview:
+            return JSONResponse({'error': 'Interview session not found or expired'}, status_code=400)
+        resume_text, jd_text, interview_state = interview
+
+        interview_response = await async_conduct_mock_interview(resume_text, jd_text, user_response, interview_state)
+        await run_in_threadpool(interview_store.save, interview_id, interview_response['interview_state'])
+
+        return JSONResponse({
+            'interviewer_message': interview_response['interviewer_response'],
+            'success': True
+        })
+    except Exception as e:
+        return JSONResponse({'error': str(e), 'success': False}, status_code=500)
+
+
+async def end_interview(request: Request):
+    """End the current interview session and get feedback"""
+    try:
+        interview = await pop_interview(request)
+
+        if not interview:
+            return JSONResponse({'error': 'No active interview session found'}, status_code=400)
+        resume_text, jd_text, interview_state = interview
+
+        with metrics.claude_call("interview_feedback"):
+            response = await get_async_client().messages.create(
+                **interview_feedback_request(resume_text, jd_text, interview_state)
+            )
+        metrics.record_usage("interview_feedback", response.usage)
+
+        return JSONResponse({
+            'feedback': clean_claude_response(response.content[0].text),
+            'success': True
+        })
+    except Exception as e:
+        print(e)
+        return JSONResponse({'error': str(e), 'success': False}, status_code=500)
+
+
+async def pop_interview(request: Request):
+    """Remove the session's interview, returning (resume, job description, state) or None."""
+    interview_id = request.session.pop('interview_id', None)
+    interview = await run_in_threadpool(interview_store.load, interview_id) if interview_id else None
+    if interview:
+        await run_in_threadpool(interview_store.delete, interview_id)
+    return interview
+
+
+# Streaming variants, with the same server-sent events as privacv's (see sse.py)
+
+
+def sse_response(events):
+    """Stream server-sent events (from sse.async_sse_chunks or async_sse_sections) to the browser."""
+    return StreamingResponse(events, media_type=SSE_MEDIA_TYPE, headers=SSE_HEADERS)
+
+
+async def process_with_claude_stream(request: Request):
+    form = await request.form()
+    redacted_text = form.get('redacted_text', '')
+    jd_text = form.get('job_description', '')
+
+    if not redacted_text:
+        return JSONResponse({'error': 'No text provided for processing'}, status_code=400)
+
+    return sse_response(async_sse_chunks(async_stream_full_resume_review(redacted_text, jd_text)))
+
+
+async def process_with_claude_sections(request: Request):
+    """Fan-out review, sending each section as a "section" event as soon as it is written"""
+    form = await request.form()
+    redacted_text = form.get('redacted_text', '')
+    jd_text = form.get('job_description', '')
+
+    if not redacted_text:
+        return JSONResponse({'error': 'No text provided for processing'}, status_code=400)
+
+    return sse_response(async_sse_sections(async_iter_fanout_resume_review(redacted_text, jd_text)))
+
+
+async def start_interview_stream(request: Request):
+    """Initialize a new mock interview session, streaming the interviewer's greeting"""
+    form = await request.form()
+    redacted_text = form.get('redacted_text', '')
+    jd_text = form.get('job_description', '')
+
+    if not redacted_text or not jd_text:
+        return JSONResponse({'error': 'Resume text and job description are required'}, status_code=400)
+
+    interview_state = new_interview_state()
+    # Created up front so the id goes out with the response headers, and
+    # removed again if the greeting fails (see privacv)
+    interview_id = await run_in_threadpool(interview_store.create, redacted_text, jd_text, interview_state)
+    request.session['interview_id'] = interview_id
+
+    async def commit():
+        await run_in_threadpool(interview_store.save, interview_id, interview_state)
+
+    async def discard():
+        await run_in_threadpool(interview_store.delete, interview_id)
+
+    return sse_response(async_sse_chunks(async_stream_mock_interview(redacted_text, jd_text, None, interview_state),
+                                         commit, discard))
+
+
+async def continue_interview_stream(request: Request):
+    """Continue an existing interview, streaming the interviewer's reply"""
+    form = await request.form()
+    user_response = form.get('user_response', '')
+
+    if not user_response:
+        return JSONResponse({'error': 'User response is required'}, status_code=400)
+
+    interview_id = request.session.get('interview_id')
+    interview = await run_in_threadpool(interview_store.load, interview_id) if interview_id else None
+
+    if not interview:
+        return JSONResponse({'error': 'Interview session not found or expired'}, status_code=400)
+    resume_text, jd_text, interview_state = interview
+
+    async def commit():
+        await run_in_threadpool(interview_store.save, interview_id, interview_state)
+
+    return sse_response(async_sse_chunks(async_stream_mock_interview(resume_text, jd_text, user_response, interview_state), commit))
+
+
+async def end_interview_stream(request: Request):
+    """End the current interview session, streaming the feedback"""
+    interview = await pop_interview(request)
+
+    if not interview:
+        return JSONResponse({'error': 'No active interview session found'}, status_code=400)
+    resume_text, jd_text, interview_state = interview
+
+    async def stream_feedback():
+        with metrics.claude_call("interview_feedback"):
+            async with get_async_client().messages.stream(
+                **interview_feedback_request(resume_text, jd_text, interview_state)
+            ) as stream:
+                async for text in stream.text_stream:
+                    yield text
+                metrics.record_usage("interview_feedback", (await stream.get_final_message()).usage)
+
+    return sse_response(async_sse_chunks(stream_feedback()))
+
+
+app = Starlette(
+    routes=[
+        Route('/upload', upload_pdf, methods=['POST']),
+        Route('/process_with_claude', process_with_claude, methods=['POST']),
+        Route('/start_interview', start_interview, methods=['POST']),
+        Route('/continue_interview', continue_interview, methods=['POST']),
+        Route('/end_interview', end_interview, methods=['POST']),
+        Route('/process_with_claude/stream', process_with_claude_stream, methods=['POST']),
+        Route('/process_with_claude/sections', process_with_claude_sections, methods=['POST']),
+        Route('/start_interview/stream', start_interview_stream, methods=['POST']),
+        Route('/continue_interview/stream', continue_interview_stream, methods=['POST']),
+        Route('/end_interview/stream', end_interview_stream, methods=['POST']),
+        Mount('/', WSGIMiddleware(flask_app)),
+    ],
+    middleware=[
+        # A different cookie from Flask's, which carries Flask-Session's id
+        Middleware(SessionMiddleware, secret_key=flask_app.secret_key, session_cookie='privacv_async_session'),
+    ],
+    lifespan=lifespan,
+)
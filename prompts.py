@@ -52,3 +52,62 @@ Remember to be constructive and specific in your feedback, providing clear
 explanations for your suggestions and assessments.
 """
 
+
+
+# The parts of the full review, in the order they appear in <analysis>. Each
+# can be written by its own request (see claude_utils.iter_fanout_resume_review).
+REVIEW_SECTIONS = {
+    "job_fit": """Analyze whether the job is a good fit for the candidate. Consider their skills, 
+experience, and qualifications in relation to the job requirements.
+
+[Provide your assessment of whether the job is a good fit for the candidate and why]""",
+    "key_points": """Identify key points in the resume that the candidate should emphasize for this 
+specific job description. These should be aspects of their background that align 
+well with the job requirements.
+
+[List the key points from the resume that the candidate should emphasize, explaining 
+why each is relevant to the job description]""",
+    "tailoring_suggestions": """Suggest ways to tailor the wording or framing of the resume to better match the 
+job description, while maintaining truthfulness. This may include rephrasing certain 
+accomplishments or highlighting specific skills.
+
+[Offer specific suggestions for tailoring the wording or framing of the resume, 
+ensuring that all suggestions maintain truthfulness]""",
+}
+
+
+def review_context_prompt(resume_text, jd_text):
+    # identical for every section, so it can be cached and shared between them
+    return f"""
+You are an AI resume reviewer tasked with providing tailored feedback on a resume 
+based on a specific job description. Your goal is to help the job seeker improve 
+their chances of landing the position by offering insightful analysis and suggestions. 
+The resume you will be provided has had personal information anonymized. Please 
+ignore this when you are providing feedback.
+
+First, carefully read the following job description:
+
+<job_description>
+{jd_text}
+</job_description>
+
+Now, review the following resume:
+
+<resume>
+{resume_text}
+</resume>
+"""
+
+
+def review_section_prompt(section):
+    return f"""
+Based on the job description and resume provided, complete the following task:
+
+{REVIEW_SECTIONS[section]}
+
+This is one part of a longer review; other parts are written separately, so cover 
+only this task. Write your answer inside <{section}> tags.
+
+Remember to be constructive and specific in your feedback, providing clear 
+explanations for your suggestions and assessments.
+"""
@@ -0,0 +1,119 @@
+"""
+Content-addressed cache for redaction results.
+
+Results are keyed by a hash of the PDF bytes plus the redaction configuration,
+so a re-uploaded resume is served without parsing it again. An in-memory LRU
+tier bounded by size sits in front of an optional on-disk tier that survives
+restarts.
+"""
+import hashlib
+import json
+import os
+import sys
+import threading
+from typing import Any, Dict, Optional, Union
+
+from cachelib import FileSystemCache
+from cachetools import LRUCache
+
+from metrics import REDACTION_CACHE_LOOKUPS
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_DISK_THRESHOLD = 10000
+
+
+class RedactionCache:
+    """Two-tier cache of redacted text keyed by make_key()."""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, cache_dir: Optional[str] = None,
+                 disk_threshold: int = DEFAULT_DISK_THRESHOLD):
+        """
+        Args:
+            max_bytes: Approximate memory budget of the in-memory tier
+            cache_dir: Directory for the on-disk tier (None to disable it)
+            disk_threshold: Maximum number of entries kept on disk
+        """
+        self._memory = LRUCache(maxsize=max_bytes, getsizeof=sys.getsizeof)
+        self._disk = FileSystemCache(cache_dir, threshold=disk_threshold, default_timeout=0) if cache_dir else None
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls) -> "RedactionCache":
+        """Build a cache configured by REDACTION_CACHE_MAX_BYTES and REDACTION_CACHE_DIR."""
+        return cls(max_bytes=int(os.environ.get("REDACTION_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)),
+                   cache_dir=os.environ.get("REDACTION_CACHE_DIR") or None)
+
+    @staticmethod
+    def make_key(pdf_bytes: Union[bytes, memoryview], config: Dict[str, Any]) -> str:
+        """
+        Build the cache key for a document.
+        
+        Args:
+            pdf_bytes: Contents of the PDF file, as bytes or any buffer (such as
+                an UploadBuffer's view), which is hashed without being copied
+            config: Everything that affects the redaction result (model, regions, detector versions)
+            
+        Returns:
+            Hex digest identifying the document and configuration
+        """
+        digest = hashlib.sha256(pdf_bytes)
+        digest.update(json.dumps(config, sort_keys=True).encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached result for a key, or None on a miss; counted in stats() and on /metrics."""
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self.memory_hits += 1
+                REDACTION_CACHE_LOOKUPS.labels("memory_hit").inc()
+                return value
+
+        value = self._disk.get(key) if self._disk is not None else None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                REDACTION_CACHE_LOOKUPS.labels("miss").inc()
+                return None
+            self.disk_hits += 1
+            REDACTION_CACHE_LOOKUPS.labels("disk_hit").inc()
+            self._remember(key, value)
+        return value
+
+    def set(self, key: str, value: str) -> None:
+        """Store a result in both tiers."""
+        with self._lock:
+            self._remember(key, value)
+        if self._disk is not None:
+            self._disk.set(key, value)
+
+    def clear(self) -> None:
+        """Drop every entry from both tiers and reset the counters."""
+        with self._lock:
+            self._memory.clear()
+            self.memory_hits = self.disk_hits = self.misses = 0
+        if self._disk is not None:
+            self._disk.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Hit and miss counters plus the current size of the memory tier."""
+        with self._lock:
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory.currsize,
+            }
+
+    def _remember(self, key: str, value: str) -> None:
+        # Results bigger than the whole memory tier are only kept on disk
+        if sys.getsizeof(value) <= self._memory.maxsize:
+            self._memory[key] = value
+
+
+# Shared by every redact_pdf call in the process
+default_cache = RedactionCache.from_env()
@@ -0,0 +1,162 @@
+"""
+Background queue that runs PDF redaction in a pool of worker processes.
+
+spaCy NER and address parsing hold the CPU (and the GIL) for the whole
+document, so instead of redacting inside the request handler, /upload can
+submit the PDF bytes here and hand back a job id. Workers are separate
+processes with the NER model loaded once each, so a burst of uploads no longer
+starves the web workers. The queue is bounded: once max_pending jobs are
+waiting or running, submit() raises QueueFull and the caller should ask the
+client to retry later.
+"""
+import concurrent.futures
+import os
+import threading
+import uuid
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from cachetools import TTLCache
+
+from redaction_cache import RedactionCache, default_cache
+from redactr import DEFAULT_NAME_DETECTOR, DEFAULT_SPACY_MODEL, redact_pdf, redaction_config, spacy_models_for, warmup
+
+DEFAULT_MAX_PENDING = 32
+DEFAULT_RESULT_TTL = 600
+DEFAULT_RETRY_AFTER = 5
+MAX_FINISHED_JOBS = 1024
+
+
+class QueueFull(Exception):
+    """Raised by RedactionJobQueue.submit() when no more jobs can be accepted."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Redaction queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class RedactionJobQueue:
+    """Bounded queue of redaction jobs served by a process pool."""
+
+    def __init__(self, max_workers: Optional[int] = None, max_pending: int = DEFAULT_MAX_PENDING,
+                 result_ttl: float = DEFAULT_RESULT_TTL, retry_after: int = DEFAULT_RETRY_AFTER,
+                 spacy_model_name: str = DEFAULT_SPACY_MODEL,
+                 cache: Optional[RedactionCache] = default_cache,
+                 name_detector: str = DEFAULT_NAME_DETECTOR):
+        """
+        Args:
+            max_workers: Number of worker processes (defaults to one per CPU)
+            max_pending: Most jobs that may be queued or running at once
+            result_ttl: Seconds a finished job's result stays available
+            retry_after: Seconds clients are told to wait when the queue is full
+            spacy_model_name: Name of the spaCy model the workers use for NER
+            cache: Cache of earlier results, checked before a job is queued (None to disable)
+            name_detector: How the workers find person names, one of redactr.NAME_DETECTORS
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.retry_after = retry_after
+        self.spacy_model_name = spacy_model_name
+        self.cache = cache
+        self.name_detector = name_detector
+        self._pool = None
+        self._pending: Dict[str, concurrent.futures.Future] = {}
+        self._finished = TTLCache(maxsize=MAX_FINISHED_JOBS, ttl=result_ttl)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "RedactionJobQueue":
+        """Build a queue configured by REDACTION_WORKERS, REDACTION_QUEUE_SIZE and REDACTION_JOB_TTL."""
+        return cls(max_workers=int(os.environ.get("REDACTION_WORKERS", 0)) or None,
+                   max_pending=int(os.environ.get("REDACTION_QUEUE_SIZE", DEFAULT_MAX_PENDING)),
+                   result_ttl=float(os.environ.get("REDACTION_JOB_TTL", DEFAULT_RESULT_TTL)))
+
+    def submit(self, pdf_bytes: Union[bytes, memoryview]) -> str:
+        """
+        Queue a PDF for redaction.
+
+        Args:
+            pdf_bytes: Contents of the PDF file, as bytes or a buffer; a buffer is
+                only copied if the job has to go to a worker
+
+        Returns:
+            Id to pass to status()
+
+        Raises:
+            QueueFull: If max_pending jobs are already queued or running
+        """
+        job_id = uuid.uuid4().hex
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache.make_key(pdf_bytes, redaction_config(self.spacy_model_name, self.name_detector))
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                with self._lock:
+                    self._finished[job_id] = {'status': 'done', 'redacted_text': cached, 'known_terms': {}}
+                return job_id
+
+        with self._lock:
+            if len(self._pending) >= self.max_pending:
+                raise QueueFull(self.retry_after)
+            if self._pool is None:
+                # Started on first use so importing the app doesn't fork workers;
+                # they only load a spaCy model if their name detector uses one
+                self._pool = concurrent.futures.ProcessPoolExecutor(
+                    self.max_workers, initializer=warmup,
+                    initargs=(spacy_models_for(self.name_detector, self.spacy_model_name),))
+            # The workers skip their own cache; results are cached here in the parent
+            future = self._pool.submit(_redact_job, bytes(pdf_bytes), self.spacy_model_name, self.name_detector)
+            self._pending[job_id] = future
+        future.add_done_callback(lambda f: self._finish(job_id, f, cache_key))
+        return job_id
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a job.
+
+        Args:
+            job_id: Id returned by submit()
+
+        Returns:
+            {'status': 'pending'}, {'status': 'done', 'redacted_text': ..., 'known_terms': ...}
+            or {'status': 'failed', 'error': ...}; None if the job is unknown or expired
+        """
+        with self._lock:
+            if job_id in self._pending:
+                return {'status': 'pending'}
+            return self._finished.get(job_id)
+
+    def pending(self) -> int:
+        """Number of jobs queued or running."""
+        with self._lock:
+            return len(self._pending)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the worker processes, cancelling jobs that haven't started."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=True)
+
+    def _finish(self, job_id: str, future: concurrent.futures.Future, cache_key: Optional[str]) -> None:
+        """Move a completed job's outcome from the pending set to the finished results."""
+        if future.cancelled():
+            result = {'status': 'failed', 'error': 'Redaction was cancelled'}
+        elif future.exception() is not None:
+            print(future.exception())
+            result = {'status': 'failed', 'error': str(future.exception())}
+        else:
+            redacted_text, known_terms = future.result()
+            result = {'status': 'done', 'redacted_text': redacted_text, 'known_terms': known_terms}
+            if cache_key is not None:
+                self.cache.set(cache_key, result['redacted_text'])
+
+        with self._lock:
+            self._pending.pop(job_id, None)
+            self._finished[job_id] = result
+
+
+def _redact_job(pdf_bytes: bytes, spacy_model_name: str, name_detector: str) -> Tuple[str, Dict[str, List[str]]]:
+    """Run in a worker: redact a PDF, also returning the removed strings (see redact_pdf's known_terms)."""
+    known_terms = {}
+    redacted_text = redact_pdf(pdf_bytes, spacy_model_name, None, known_terms, name_detector)
+    return redacted_text, {label: sorted(terms) for label, terms in known_terms.items()}
@@ -1,73 +1,1167 @@
+import collections
+import concurrent.futures
+import functools
 import io
+import itertools
+import multiprocessing
+import os
 import re
-import spacy
-import phonenumbers
-import pyap
-from typing import BinaryIO, Union, Optional
-from PyPDF2 import PdfReader
+import threading
+from typing import TYPE_CHECKING, BinaryIO, Dict, Iterable, Iterator, List, NamedTuple, Set, Tuple, Union, Optional
 
+from metrics import stage_timer
+from name_gazetteer import NameGazetteer, get_gazetteer
+from redaction_cache import RedactionCache, default_cache
+from upload_io import UploadBuffer
 
-def redact_pdf(uploaded_file: Union[BinaryIO, io.BytesIO], 
-               spacy_model_name: str = "en_core_web_sm") -> str:
+# spaCy, PyPDF2, phonenumbers and pyap are imported where they are first used
+# (or by warmup), so importing this module stays cheap for processes that never
+# redact anything, such as the ASGI front end and test collection
+if TYPE_CHECKING:
+    import phonenumbers
+    from PyPDF2 import PdfReader
+    from pyap.parser import AddressParser
+    from spacy.language import Language
+    from spacy.tokens import Doc
+
+# A detected piece of sensitive text: (start, end, label) offsets into the original text
+Span = Tuple[int, int, str]
+
+# Bump whenever a detector changes what it finds, so cached results from the
+# old detectors are no longer served
+DETECTOR_VERSION = 2
+
+# What redaction returns for a PDF with no extractable text
+NO_TEXT = "no text"
+
+# When a caller asks for parallel extraction, documents with at least this many
+# pages are extracted by a worker pool, EXTRACTION_CHUNK_PAGES pages per task
+PARALLEL_EXTRACTION_MIN_PAGES = 32
+EXTRACTION_CHUNK_PAGES = 8
+
+# Regions whose nationally formatted phone numbers are recognised
+PHONE_REGIONS = ("US", "GB", "CA", "AU", "IN")
+PHONE_MIN_DIGITS = 7
+PHONE_MAX_DIGITS = 15
+
+# A run of digit groups separated by whitespace (including the no-break spaces
+# PDF extraction produces), dots, slashes or any dash, optionally with a leading
+# + and parenthesised area code, and ending in an optional extension
+_PHONE_SEPARATOR = r'[\s.\-/\u2010-\u2015\u2212]'
+_PHONE_CANDIDATE_PATTERN = re.compile(
+    r'(?<![\w+])\+?\(?\d[\d()]*(?:' + _PHONE_SEPARATOR + r'{1,3}\(?\d[\d()]*)*'
+    r'(?P<extension>\s*(?:(?i:ext)\.?|[xX]|#)\s*\d{1,6})?(?!\w)')
+_PHONE_GROUP_PATTERN = re.compile(r'\(?\d[\d()]*')
+_COUNTRY_CODE_PATTERN = re.compile(r'(?<![\w+])\+(\d{1,3})')
+
+# Countries whose postal address formats are recognised
+ADDRESS_COUNTRIES = ("US", "CA", "GB")
+
+_ADDRESS_SPECIAL_CHARS_PATTERN = re.compile(r'[^\w\s,.]')
+# Mirrors AddressParser._normalize_string, in the same order; dashes are
+# already gone after the special character pass
+_ADDRESS_NORMALIZATION = [
+    (re.compile(r'\r*(\n\r*)+'), ', '),
+    (re.compile(r'\s*(\,\s*)+'), ', '),
+    (re.compile(r'\s+'), ' '),
+]
+
+EMAIL_PATTERN = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+
+
+DEFAULT_SPACY_MODEL = os.environ.get("REDACTION_SPACY_MODEL", "en_core_web_sm")
+
+# How person names are found: "ner" runs the spaCy model over the whole text,
+# "gazetteer" uses name lists and resume layout only (detect_names_fast), and
+# "hybrid" is the gazetteer plus spaCy on just the candidates it can't decide
+NAME_DETECTORS = ("ner", "gazetteer", "hybrid")
+DEFAULT_NAME_DETECTOR = os.environ.get("REDACTION_NAME_DETECTOR", "ner")
+
+# remove_names only reads doc.ents, so the components below are never loaded
+NER_EXCLUDED_PIPES = ["tagger", "parser", "lemmatizer"]
+
+# Process-wide registry of loaded spaCy pipelines, keyed by model name
+_nlp_models: Dict[str, "Language"] = {}
+_nlp_models_lock = threading.Lock()
+
+
+def get_nlp(spacy_model_name: str = DEFAULT_SPACY_MODEL) -> "Language":
+    """
+    Return the shared NER-only pipeline for a spaCy model, loading it on first use.
+    
+    Args:
+        spacy_model_name: Name of the spaCy model to use for NER
+        
+    Returns:
+        The loaded spaCy pipeline
+        
+    Raises:
+        RuntimeError: If the model is not installed
+    """
+    nlp = _nlp_models.get(spacy_model_name)
+    if nlp is None:
+        with _nlp_models_lock:
+            nlp = _nlp_models.get(spacy_model_name)
+            if nlp is None:
+                nlp = _load_nlp(spacy_model_name)
+                _nlp_models[spacy_model_name] = nlp
+    return nlp
+
+
+def _load_nlp(spacy_model_name: str) -> "Language":
+    import spacy
+    try:
+        return spacy.load(spacy_model_name, exclude=NER_EXCLUDED_PIPES)
+    except OSError as e:
+        raise RuntimeError(
+            f"spaCy model '{spacy_model_name}' is not installed. "
+            f"Install it before starting the app: python -m spacy download {spacy_model_name}"
+        ) from e
+
+
+def warmup(spacy_model_names: Optional[Iterable[str]] = None) -> None:
+    """
+    Import the redaction dependencies and load the spaCy models and name lists at
+    startup, so the first request doesn't pay for it.
+    
+    Everything loaded here is process-wide and never modified afterwards, so a
+    server that calls this before forking its workers shares one copy of it
+    between them (see gunicorn.conf.py).
+    
+    Args:
+        spacy_model_names: Names of the spaCy models to load (None for those the
+            default name detector needs, see spacy_models_for)
+        
+    Raises:
+        RuntimeError: If any of the models is not installed
+    """
+    if spacy_model_names is None:
+        spacy_model_names = spacy_models_for(DEFAULT_NAME_DETECTOR)
+    for spacy_model_name in spacy_model_names:
+        nlp = get_nlp(spacy_model_name)
+        nlp("Warm up the pipeline.")
+    get_gazetteer()
+    import phonenumbers, PyPDF2  # noqa: F401
+    # phonenumbers loads each region's metadata the first time it is used
+    for region in PHONE_REGIONS:
+        phonenumbers.PhoneMetadata.metadata_for_region(region)
+    for country in ADDRESS_COUNTRIES:
+        _address_parser(country)
+
+
+def spacy_models_for(name_detector: str, spacy_model_name: str = DEFAULT_SPACY_MODEL) -> List[str]:
+    """
+    The spaCy models a name detector uses, for warmup().
+    
+    Args:
+        name_detector: One of NAME_DETECTORS
+        spacy_model_name: Name of the spaCy model to use for NER
+        
+    Returns:
+        [spacy_model_name], or no models for "gazetteer", which never loads one
+    """
+    return [] if name_detector == "gazetteer" else [spacy_model_name]
+
+
+def redact_pdf(uploaded_file: Union[BinaryIO, io.BytesIO, bytes, UploadBuffer],
+               spacy_model_name: str = DEFAULT_SPACY_MODEL,
+               cache: Optional[RedactionCache] = default_cache,
+               known_terms: Optional[Dict[str, Set[str]]] = None,
+               name_detector: str = DEFAULT_NAME_DETECTOR,
+               max_workers: Optional[int] = 1) -> str:
     """
     Remove sensitive information from a PDF file uploaded via Streamlit's file_uploader.
     
     Args:
-        uploaded_file: The PDF file object from st.file_uploader
+        uploaded_file: The PDF file object from st.file_uploader, the PDF's bytes, or
+            an UploadBuffer (which is left open for the caller to close)
         spacy_model_name: Name of the spaCy model to use for NER
+        cache: Cache of earlier results for the same file and configuration (None to disable)
+        known_terms: If given, filled with the sensitive strings that were removed, by
+            label, for rescan(); the cache never holds these, so it stays empty when
+            the result comes from the cache
+        name_detector: How to find person names, one of NAME_DETECTORS
+        max_workers: Size of the extraction pool for large documents (see
+            iter_pdf_pages); by default the PDF is extracted in this process
         
     Returns:
         Text with sensitive information removed
     """
-    # Load spaCy model
+    upload = UploadBuffer.load(uploaded_file)
     try:
-        nlp = spacy.load(spacy_model_name)
-    except OSError:
-        # Download the model if not available
-        spacy.cli.download(spacy_model_name)
-        nlp = spacy.load(spacy_model_name)
+        # The cache key is hashed straight from the upload's buffer and PdfReader
+        # reads the same buffer, so the PDF is never copied
+        if cache is not None:
+            cache_key = cache.make_key(upload.view, redaction_config(spacy_model_name, name_detector))
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        # Extract text from PDF
+        text = extract_text_from_pdf(upload.open(), max_workers)
+        if text:
+            doc = _parse(text, spacy_model_name, name_detector)
+            spans = detect_pii(text, doc, name_detector=name_detector, spacy_model_name=spacy_model_name)
+            if known_terms is not None:
+                _collect_terms(text, spans, known_terms)
+            redacted_text = apply_spans(text, spans)
+        else:
+            redacted_text = NO_TEXT
+        
+        if cache is not None:
+            cache.set(cache_key, redacted_text)
+        return redacted_text
+    finally:
+        # A buffer passed in belongs to the caller
+        if upload is not uploaded_file:
+            upload.close()
+
+
+def redaction_config(spacy_model_name: str = DEFAULT_SPACY_MODEL,
+                     name_detector: str = DEFAULT_NAME_DETECTOR) -> Dict[str, object]:
+    """
+    Describe everything that affects what redact_pdf returns, for cache keys.
     
-    # Extract text from PDF
-    text = extract_text_from_pdf(uploaded_file)
-    if not text:
-        return "no text"
+    Args:
+        spacy_model_name: Name of the spaCy model used for NER
+        name_detector: How person names are found, one of NAME_DETECTORS
+        
+    Returns:
+        JSON-serialisable configuration
+    """
+    return {
+        "spacy_model": spacy_model_name,
+        "name_detector": name_detector,
+        "phone_regions": list(PHONE_REGIONS),
+        "address_countries": list(ADDRESS_COUNTRIES),
+        "detector_version": DETECTOR_VERSION,
+    }
+
+
+def redact_pdf_pages(uploaded_file: Union[BinaryIO, io.BytesIO],
+                     spacy_model_name: str = DEFAULT_SPACY_MODEL,
+                     max_workers: Optional[int] = None,
+                     name_detector: str = DEFAULT_NAME_DETECTOR) -> Iterator[str]:
+    """
+    Redact a PDF page by page, yielding each page as soon as it is done.
     
-    # Apply redactions in sequence
-    redacted_text = text
-    redacted_text = remove_names(redacted_text, nlp)
-    redacted_text = remove_email_addresses(redacted_text)
-    redacted_text = remove_phone_numbers(redacted_text)
-    redacted_text = remove_addresses(redacted_text)
+    Only a few pages are held in memory at a time. Names found on a page are also
+    redacted on every later page; a name first recognised on a later page cannot
+    be removed from pages that were already yielded.
     
-    return redacted_text
+    Args:
+        uploaded_file: The PDF file object
+        spacy_model_name: Name of the spaCy model to use for NER
+        max_workers: Size of the extraction pool for large documents (see iter_pdf_pages)
+        name_detector: How to find person names, one of NAME_DETECTORS
+        
+    Returns:
+        Iterator over the redacted text of each page
+    """
+    known_names = set()
+    
+    for page_number, page_text in enumerate(iter_pdf_pages(uploaded_file, max_workers)):
+        doc = _parse(page_text, spacy_model_name, name_detector)
+        yield _redact_text(page_text, doc, known_names, name_detector, spacy_model_name,
+                           document_start=page_number == 0)
 
 
-def extract_text_from_pdf(pdf_file: Union[BinaryIO, io.BytesIO]) -> str:
+def redact_many(files: Iterable[Union[BinaryIO, io.BytesIO, bytes]],
+                n_process: int = 1,
+                batch_size: int = 8,
+                spacy_model_name: str = DEFAULT_SPACY_MODEL,
+                name_detector: str = DEFAULT_NAME_DETECTOR) -> Iterator[str]:
+    """
+    Redact a stream of PDF files, spreading the work across processes.
+    
+    Each worker process extracts the text of a batch of PDFs, runs NER over it with
+    nlp.pipe and applies the email, phone and address stages to the same batch, so
+    only PDF bytes and redacted text cross process boundaries.
+    
+    Args:
+        files: PDF file objects or raw PDF bytes
+        n_process: Number of worker processes (-1 for one per CPU)
+        batch_size: Number of documents handed to a worker at a time
+        spacy_model_name: Name of the spaCy model to use for NER
+        name_detector: How to find person names, one of NAME_DETECTORS
+        
+    Returns:
+        Iterator over the redacted texts, in the same order as the input files
+    """
+    if n_process == -1:
+        n_process = os.cpu_count() or 1
+    
+    batches = _batched((_read_pdf_bytes(f) for f in files), batch_size)
+    redact_batch = functools.partial(_redact_batch, spacy_model_name=spacy_model_name, name_detector=name_detector)
+    
+    if n_process == 1:
+        for batch in batches:
+            yield from redact_batch(batch)
+        return
+    
+    # An initializer that fails makes the pool respawn workers forever, so
+    # workers only load a model their detector will use
+    with multiprocessing.Pool(n_process, initializer=warmup,
+                              initargs=(spacy_models_for(name_detector, spacy_model_name),)) as pool:
+        # Keep a bounded window of batches in flight so large inputs stream
+        # through instead of being read into memory up front
+        pending = collections.deque()
+        for batch in batches:
+            pending.append(pool.apply_async(redact_batch, (batch,)))
+            if len(pending) >= 2 * n_process:
+                yield from pending.popleft().get()
+        while pending:
+            yield from pending.popleft().get()
+
+
+def _redact_batch(pdf_batch: List[bytes], spacy_model_name: str, name_detector: str) -> List[str]:
+    texts = [extract_text_from_pdf(io.BytesIO(pdf_bytes)) for pdf_bytes in pdf_batch]
+    if name_detector == "ner":
+        docs = iter(get_nlp(spacy_model_name).pipe([text for text in texts if text], batch_size=len(pdf_batch)))
+    else:
+        docs = itertools.repeat(None)
+    return [_redact_text(text, next(docs), None, name_detector, spacy_model_name) if text else NO_TEXT
+            for text in texts]
+
+
+def _redact_text(text: str, doc: Optional["Doc"], known_names: Optional[Set[str]] = None,
+                 name_detector: str = DEFAULT_NAME_DETECTOR,
+                 spacy_model_name: str = DEFAULT_SPACY_MODEL,
+                 document_start: bool = True) -> str:
+    # Every detector reports spans against the original text; they are merged
+    # and the output is built once
+    return apply_spans(text, detect_pii(text, doc, known_names, name_detector, spacy_model_name, document_start))
+
+
+def _parse(text: str, spacy_model_name: str, name_detector: str) -> Optional["Doc"]:
+    # Only the "ner" name detector reads a Doc of the whole text
+    if name_detector != "ner":
+        return None
+    nlp = get_nlp(spacy_model_name)
+    with stage_timer("ner"):
+        return nlp(text)
+
+
+def _read_pdf_bytes(pdf_file: Union[BinaryIO, io.BytesIO, bytes]) -> bytes:
+    if isinstance(pdf_file, bytes):
+        return pdf_file
+    return pdf_file.read()
+
+
+def _batched(items: Iterable[bytes], batch_size: int) -> Iterator[List[bytes]]:
+    iterator = iter(items)
+    while batch := list(itertools.islice(iterator, batch_size)):
+        yield batch
+
+
+@stage_timer("extract")
+def extract_text_from_pdf(pdf_file: Union[BinaryIO, io.BytesIO], max_workers: Optional[int] = 1) -> str:
     """
     Extract text from a PDF file object.
     
     Args:
         pdf_file: The PDF file object
+        max_workers: Size of the extraction pool for large documents (see
+            iter_pdf_pages); by default the PDF is extracted in this process
         
     Returns:
         Extracted text as a string
     """
     try:
-        reader = PdfReader(pdf_file)
-        text = ""
-        for page in reader.pages:
-            page_text = page.extract_text()
-            if page_text: 
-                cleaned_text = page_text.replace('\n ', ' ')
-                cleaned_text = cleaned_text.replace('\n', '')
-                cleaned_text = cleaned_text.strip()
-                text += cleaned_text
-        return text
+        return "".join(iter_pdf_pages(pdf_file, max_workers))
     except Exception as e:
         print(f"Error extracting text from PDF: {e}")
         return ""
 
 
+def iter_pdf_pages(pdf_file: Union[BinaryIO, io.BytesIO],
+                   max_workers: Optional[int] = 1) -> Iterator[str]:
+    """
+    Yield the cleaned text of each page of a PDF as it is extracted.
+    
+    If max_workers isn't 1, documents with at least PARALLEL_EXTRACTION_MIN_PAGES
+    pages are extracted by a pool of worker processes, a few chunks of pages at a
+    time, still in page order. A process that is itself a multiprocessing worker
+    (redact_many's pool, the job queue) always extracts on its own.
+    
+    Args:
+        pdf_file: The PDF file object
+        max_workers: Size of the extraction pool (None for one per CPU, 1 to
+            always extract in this process)
+        
+    Returns:
+        Iterator over the text of every page that has any
+    """
+    from PyPDF2 import PdfReader
+    reader = PdfReader(pdf_file)
+    page_count = len(reader.pages)
+    
+    # Pool workers may not start processes of their own, and would compete
+    # with their siblings for the same CPUs if they could
+    in_worker = multiprocessing.parent_process() is not None
+    if max_workers != 1 and not in_worker and page_count >= PARALLEL_EXTRACTION_MIN_PAGES:
+        del reader
+        pdf_file.seek(0)
+        yield from _iter_pdf_pages_parallel(pdf_file.read(), page_count, max_workers)
+        return
+    
+    for page in reader.pages:
+        cleaned_text = _clean_page_text(page.extract_text())
+        if cleaned_text:
+            yield cleaned_text
+
+
+def _clean_page_text(page_text: Optional[str]) -> str:
+    if not page_text:
+        return ""
+    cleaned_text = page_text.replace('\n ', ' ')
+    cleaned_text = cleaned_text.replace('\n', '')
+    return cleaned_text.strip()
+
+
+def _iter_pdf_pages_parallel(pdf_bytes: bytes, page_count: int,
+                             max_workers: Optional[int]) -> Iterator[str]:
+    max_workers = max_workers or os.cpu_count() or 1
+    chunks = ((start, min(start + EXTRACTION_CHUNK_PAGES, page_count))
+              for start in range(0, page_count, EXTRACTION_CHUNK_PAGES))
+    
+    # Each worker parses the document once; tasks only carry page ranges
+    with concurrent.futures.ProcessPoolExecutor(max_workers, initializer=_init_page_worker,
+                                                initargs=(pdf_bytes,)) as executor:
+        # Only a couple of chunks per worker are in flight, so finished pages
+        # don't pile up ahead of the consumer
+        pending = collections.deque()
+        for start, stop in chunks:
+            pending.append(executor.submit(_extract_page_range, start, stop))
+            if len(pending) >= 2 * max_workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+_worker_reader: Optional["PdfReader"] = None
+
+
+def _init_page_worker(pdf_bytes: bytes) -> None:
+    from PyPDF2 import PdfReader
+    global _worker_reader
+    _worker_reader = PdfReader(io.BytesIO(pdf_bytes))
+
+
+def _extract_page_range(start: int, stop: int) -> List[str]:
+    pages = (_clean_page_text(_worker_reader.pages[index].extract_text()) for index in range(start, stop))
+    return [page_text for page_text in pages if page_text]
+
+
+def detect_pii(text: str, doc: Optional["Doc"], known_names: Optional[Set[str]] = None,
+               name_detector: str = DEFAULT_NAME_DETECTOR,
+               spacy_model_name: str = DEFAULT_SPACY_MODEL,
+               document_start: bool = True) -> List[Span]:
+    """
+    Run every detector over the text and merge the results.
+    
+    Args:
+        text: The text to scan
+        doc: spaCy Doc for the same text; only read by the "ner" name detector,
+            and may be None for the others
+        known_names: Names found in earlier parts of the same document (see detect_names)
+        name_detector: How to find person names, one of NAME_DETECTORS
+        spacy_model_name: Name of the spaCy model the "hybrid" name detector falls back on
+        document_start: Whether the text begins at the start of the document
+            (see detect_names_fast)
+        
+    Returns:
+        Sorted, non-overlapping spans of sensitive text
+    """
+    spans = []
+    if name_detector == "ner":
+        spans.extend(detect_names(text, doc, known_names))
+    elif name_detector in NAME_DETECTORS:
+        nlp = get_nlp(spacy_model_name) if name_detector == "hybrid" else None
+        spans.extend(detect_names_fast(text, known_names, nlp, document_start=document_start))
+    else:
+        raise ValueError(f"Unknown name detector {name_detector!r}; expected one of {NAME_DETECTORS}")
+    spans.extend(detect_email_addresses(text))
+    spans.extend(detect_phone_numbers(text))
+    spans.extend(detect_addresses(text))
+    return merge_spans(spans)
+
+
+def merge_spans(spans: Iterable[Span]) -> List[Span]:
+    """
+    Combine overlapping spans into single spans.
+    
+    Args:
+        spans: Spans in any order, possibly overlapping
+        
+    Returns:
+        Sorted, non-overlapping spans; a merged span keeps the label of its earliest part
+    """
+    merged = []
+    for start, end, label in sorted(spans):
+        if merged and start < merged[-1][1]:
+            last_start, last_end, last_label = merged[-1]
+            merged[-1] = (last_start, max(last_end, end), last_label)
+        else:
+            merged.append((start, end, label))
+    return merged
+
+
+def apply_spans(text: str, spans: Iterable[Span], replacement: str = "") -> str:
+    """
+    Build the redacted text in a single pass.
+    
+    Args:
+        text: The original text
+        spans: Sorted, non-overlapping spans into the original text
+        replacement: String to put in place of each span
+        
+    Returns:
+        Text with every span replaced
+    """
+    pieces = []
+    position = 0
+    for start, end, _label in spans:
+        pieces.append(text[position:start])
+        pieces.append(replacement)
+        position = end
+    pieces.append(text[position:])
+    return "".join(pieces)
+
+
+@stage_timer("names")
+def detect_names(text: str, doc: "Doc", known_names: Optional[Set[str]] = None) -> List[Span]:
+    """
+    Find person names using spaCy NER.
+    
+    Every occurrence of a name the model recognised is reported, including
+    occurrences the model missed elsewhere in the text.
+    
+    Args:
+        text: The text to scan
+        doc: spaCy Doc for the same text
+        known_names: Names found in earlier parts of the same document; they are
+            also searched for, and the names found here are added to the set
+        
+    Returns:
+        PERSON spans
+    """
+    names = {ent.text for ent in doc.ents if ent.label_ == "PERSON"}
+    if known_names is not None:
+        known_names.update(names)
+        names = known_names
+    return find_terms(text, names, "PERSON")
+
+
+# Rule-based name detection (detect_names_fast). A name is two capitalised
+# words, optionally with a middle initial, that the gazetteer knows as a first
+# name and a surname; the resume's header line and names matching an email
+# address are accepted whatever the gazetteer says.
+
+# A capitalised word ("Nair", "McKay", "O'Brien", "Garcia-Lopez"), an all-caps word or an initial
+_NAME_WORD_PATTERN = re.compile(
+    r"(?<![\w'’-])(?:[A-Z](?:['’][A-Z])?[a-z]+(?:[A-Z][a-z]+)?(?:-[A-Z][a-z]+)*|[A-Z]{2,}(?:-[A-Z]{2,})*|[A-Z]\.)(?![\w'’-])")
+# What may separate the words of one name
+_NAME_GAP_PATTERN = re.compile(r"[ \t]{1,2}")
+# Something that looks like a phone number or email address in a resume's contact line
+_CONTACT_PATTERN = re.compile(r"@|\+?\(?\d[\d ().-]{6,}\d")
+
+# The header name must start this close to the beginning of the text, and
+# contact details must follow within HEADER_CONTACT_CHARS of it
+HEADER_MAX_OFFSET = 100
+HEADER_CONTACT_CHARS = 200
+# Words a resume may open with that are not part of the name
+HEADER_SKIP_WORDS = {"resume", "résumé", "curriculum", "vitae", "cv", "name", "contact", "profile"}
+# Words the census lists as surnames that, after a first name, are far more
+# often part of a street or place name ("Queen Street", "Mary Road")
+NOT_SURNAMES = {"street", "avenue", "road", "boulevard", "parkway", "drive", "court", "place", "square"}
+# Characters of surrounding text given to spaCy with an ambiguous candidate
+NAME_CONTEXT_CHARS = 60
+
+
+class _NameWord(NamedTuple):
+    start: int
+    end: int
+    text: str
+
+    @property
+    def is_initial(self) -> bool:
+        return self.text.endswith(".")
+
+
+@stage_timer("names")
+def detect_names_fast(text: str, known_names: Optional[Set[str]] = None,
+                      nlp: Optional["Language"] = None,
+                      gazetteer: Optional[NameGazetteer] = None,
+                      document_start: bool = True) -> List[Span]:
+    """
+    Find person names from name lists and resume layout, without running NER over the text.
+    
+    Candidates are pairs of capitalised words. A pair is a name when the first
+    word is a known first name and the second a known surname, when it opens the
+    resume and is followed by contact details, or when an email address in the
+    text is made of it ("jade.nair@", "jnair@"). Pairs with only one known word
+    are ambiguous: with nlp they are passed to spaCy along with a little
+    surrounding text, otherwise they are dropped.
+    
+    As with detect_names, every occurrence of each name found is reported.
+    
+    Args:
+        text: The text to scan
+        known_names: Names found in earlier parts of the same document; they are
+            also searched for, and the names found here are added to the set
+        nlp: spaCy pipeline to settle ambiguous candidates with (None to drop them)
+        gazetteer: Name lists to check candidates against (None for get_gazetteer())
+        document_start: Whether the text begins at the start of the document; the
+            opening words of a later page or of an excerpt aren't a header
+        
+    Returns:
+        PERSON spans
+    """
+    gazetteer = gazetteer or get_gazetteer()
+    runs = _name_runs(text)
+    handles = _email_handles(text)
+    names = set()
+    ambiguous = []
+    for run in runs:
+        for first, last in _name_pairs(run):
+            is_first_name = gazetteer.is_first_name(first.text)
+            is_surname = gazetteer.is_surname(last.text) and last.text.lower() not in NOT_SURNAMES
+            if (is_first_name and is_surname) or _matches_handle(first.text, last.text, handles):
+                names.add(text[first.start:last.end])
+            elif is_first_name or is_surname:
+                ambiguous.append((first.start, last.end))
+    
+    header_name = _header_name(text, runs) if document_start else None
+    if header_name:
+        names.add(header_name)
+    if nlp is not None and ambiguous:
+        names.update(_confirm_names(text, ambiguous, nlp))
+    
+    if known_names is not None:
+        known_names.update(names)
+        names = known_names
+    return find_terms(text, names, "PERSON")
+
+
+def _name_runs(text: str) -> List[List[_NameWord]]:
+    # Sequences of two or more name-like words separated only by spaces
+    runs = []
+    run = []
+    for match in _NAME_WORD_PATTERN.finditer(text):
+        if run and not _NAME_GAP_PATTERN.fullmatch(text, run[-1].end, match.start()):
+            if len(run) > 1:
+                runs.append(run)
+            run = []
+        run.append(_NameWord(match.start(), match.end(), match.group()))
+    if len(run) > 1:
+        runs.append(run)
+    return runs
+
+
+def _name_pairs(run: List[_NameWord]) -> Iterator[Tuple[_NameWord, _NameWord]]:
+    # (first, last) candidates in a run, allowing one middle initial between them
+    for index, first in enumerate(run):
+        if first.is_initial:
+            continue
+        following = index + 1
+        if following < len(run) and run[following].is_initial:
+            following += 1
+        if following < len(run) and not run[following].is_initial:
+            yield first, run[following]
+
+
+def _header_name(text: str, runs: List[List[_NameWord]]) -> Optional[str]:
+    # The first words of a resume, if they are followed by a contact line; text
+    # must be the resume from its beginning
+    if not runs:
+        return None
+    words = [word for word in runs[0] if word.text.lower() not in HEADER_SKIP_WORDS]
+    if len(words) < 2 or words[0].start > HEADER_MAX_OFFSET or words[0].is_initial:
+        return None
+    pair = next(_name_pairs(words), None)
+    if pair is None or pair[0] is not words[0]:
+        return None
+    first, last = pair
+    if not _CONTACT_PATTERN.search(text, last.end, last.end + HEADER_CONTACT_CHARS):
+        return None
+    return text[first.start:last.end]
+
+
+def _email_handles(text: str) -> Set[str]:
+    # The letters of each email address's local part: "jade.nair2" -> "jadenair"
+    handles = {re.sub(r"[^a-z]", "", match.group().split("@")[0].lower()) for match in EMAIL_PATTERN.finditer(text)}
+    handles.discard("")
+    return handles
+
+
+def _matches_handle(first: str, last: str, handles: Set[str]) -> bool:
+    if not handles:
+        return False
+    first = re.sub(r"[^a-z]", "", first.lower())
+    last = re.sub(r"[^a-z]", "", last.lower())
+    if len(first) < 2 or len(last) < 2:
+        return False
+    forms = {first + last, first[0] + last, first + last[0], last + first, last + first[0]}
+    return not forms.isdisjoint(handles)
+
+
+def _confirm_names(text: str, candidates: List[Tuple[int, int]], nlp: "Language") -> Set[str]:
+    # Run NER over a little text around each candidate and keep the PERSON
+    # entities that overlap one
+    windows = [(_word_start(text, max(0, start - NAME_CONTEXT_CHARS)),
+                _word_end(text, min(len(text), end + NAME_CONTEXT_CHARS))) for start, end in candidates]
+    confirmed = set()
+    with stage_timer("ner"):
+        docs = nlp.pipe(text[window_start:window_end] for window_start, window_end in windows)
+        for (start, end), (window_start, _window_end), doc in zip(candidates, windows, docs):
+            for ent in doc.ents:
+                if (ent.label_ == "PERSON" and ent.start_char + window_start < end
+                        and start < ent.end_char + window_start):
+                    confirmed.add(ent.text)
+    return confirmed
+
+
+def find_terms(text: str, terms: Iterable[str], label: str) -> List[Span]:
+    """
+    Find all whole-word occurrences of a set of strings in one scan.
+    
+    Args:
+        text: The text to scan
+        terms: Strings to look for
+        label: Label to give the spans
+        
+    Returns:
+        Spans for every occurrence, preferring the longest term at each position
+    """
+    pattern = _compile_terms(terms)
+    if pattern is None:
+        return []
+    return [(match.start(), match.end(), label) for match in pattern.finditer(text)]
+
+
+def _compile_terms(terms: Iterable[str]) -> Optional[re.Pattern]:
+    # Fold the terms into a prefix trie and emit it as one regex, so shared
+    # prefixes are matched once instead of once per term
+    trie = {}
+    for term in terms:
+        if not term:
+            continue
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[""] = {}
+    if not trie:
+        return None
+    # Not \b, which needs a word character at each end and so would never match
+    # terms such as "(617) 253-1000" or "+44 20 7946 0958"
+    return re.compile(r'(?<!\w)' + _trie_to_regex(trie) + r'(?!\w)')
+
+
+def _trie_to_regex(node: Dict[str, Dict]) -> str:
+    branches = [re.escape(char) + _trie_to_regex(child) for char, child in node.items() if char]
+    if not branches:
+        return ""
+    body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    if "" in node:
+        # A term ends here; the longer continuation is tried first
+        body = "(?:" + body + ")?"
+    return body
+
+
+@stage_timer("emails")
+def detect_email_addresses(text: str) -> List[Span]:
+    """
+    Find email addresses using regex.
+    
+    Args:
+        text: The text to scan
+        
+    Returns:
+        EMAIL spans
+    """
+    return [(match.start(), match.end(), "EMAIL") for match in EMAIL_PATTERN.finditer(text)]
+
+
+@stage_timer("phones")
+def detect_phone_numbers(text: str,
+                         regions: Iterable[str] = PHONE_REGIONS,
+                         region_hint: Optional[Iterable[str]] = None) -> List[Span]:
+    """
+    Find phone numbers using the phonenumbers library.
+    
+    The text is scanned once for runs of digit groups. Each run is validated
+    against the regions, longest stretch of groups first, so every number is
+    reported once at its offsets in the original text.
+    
+    Args:
+        text: The text to scan
+        regions: Regions to validate nationally formatted numbers against
+        region_hint: Regions known to apply to this text (see infer_phone_regions);
+            when given, the other regions are skipped
+        
+    Returns:
+        Sorted, non-overlapping PHONE spans
+    """
+    if region_hint is not None:
+        hinted = set(region_hint)
+        regions = [region for region in regions if region in hinted]
+    else:
+        regions = list(regions)
+    
+    spans = []
+    for candidate in _PHONE_CANDIDATE_PATTERN.finditer(text):
+        # The extension is redacted with the number it follows but not validated
+        digits_end = candidate.start("extension") if candidate.group("extension") else candidate.end()
+        groups = [(group.start(), group.end())
+                  for group in _PHONE_GROUP_PATTERN.finditer(text, candidate.start(), digits_end)]
+        # Running digit totals, so the digits in any stretch of groups is one subtraction
+        digit_totals = [0]
+        for group_start, group_end in groups:
+            digit_totals.append(digit_totals[-1] + sum(char.isdigit() for char in text[group_start:group_end]))
+        first = 0
+        while first < len(groups):
+            span = _match_phone_groups(text, groups, digit_totals, first, regions)
+            if span is None:
+                first += 1
+            else:
+                last_end = candidate.end() if span[1] == digits_end else span[1]
+                spans.append((span[0], last_end, "PHONE"))
+                while first < len(groups) and groups[first][0] < last_end:
+                    first += 1
+    
+    return spans
+
+
+def infer_phone_regions(text: str) -> List[str]:
+    """
+    Guess which regions' phone numbers appear in a text from its international prefixes.
+    
+    Args:
+        text: The text to scan
+        
+    Returns:
+        Region codes for every country calling code found, e.g. ["GB"] for "+44 ..."
+    """
+    import phonenumbers
+    regions = []
+    for match in _COUNTRY_CODE_PATTERN.finditer(text):
+        for digits in (match.group(1)[:1], match.group(1)[:2], match.group(1)[:3]):
+            region = phonenumbers.region_code_for_country_code(int(digits))
+            if region != phonenumbers.UNKNOWN_REGION:
+                if region not in regions:
+                    regions.append(region)
+                break
+    return regions
+
+
+def _match_phone_groups(text: str, groups: List[Tuple[int, int]], digit_totals: List[int], first: int,
+                        regions: List[str]) -> Optional[Tuple[int, int]]:
+    # Try the longest stretch of digit groups starting at `first` that parses
+    # as a valid number in any region. Every group has a digit, so no stretch
+    # longer than PHONE_MAX_DIGITS groups is tried however long the run is.
+    start = groups[first][0]
+    if start > 0 and text[start - 1] == "+":
+        start -= 1
+    farthest = first
+    while (farthest + 1 < len(groups)
+           and digit_totals[farthest + 2] - digit_totals[first] <= PHONE_MAX_DIGITS):
+        farthest += 1
+    for last in range(farthest, first - 1, -1):
+        digit_count = digit_totals[last + 1] - digit_totals[first]
+        if digit_count < PHONE_MIN_DIGITS:
+            break
+        if digit_count > PHONE_MAX_DIGITS:
+            continue
+        end = groups[last][1]
+        # A stretch cut out of a longer run of digits (e.g. "June 2023 617 253 1000")
+        # must also be grouped the way the number is normally written
+        whole_run = first == 0 and last == len(groups) - 1
+        if _is_valid_phone_number(text[start:end], regions, check_grouping=not whole_run):
+            return start, end
+    return None
+
+
+def _is_valid_phone_number(candidate: str, regions: List[str], check_grouping: bool) -> bool:
+    import phonenumbers
+    # Internationally formatted numbers carry their own region
+    for region in (None,) if candidate.startswith("+") else regions:
+        try:
+            number = phonenumbers.parse(candidate, region)
+        except phonenumbers.NumberParseException:
+            continue
+        if phonenumbers.is_valid_number(number) and (
+                not check_grouping or _has_standard_grouping(candidate, number)):
+            return True
+    return False
+
+
+def _has_standard_grouping(candidate: str, number: "phonenumbers.PhoneNumber") -> bool:
+    import phonenumbers
+    # Compare where the digit groups break, counted from the end so a missing
+    # national prefix or country code doesn't shift the comparison
+    breaks = _digit_group_breaks(candidate)
+    return any(breaks <= _digit_group_breaks(phonenumbers.format_number(number, number_format))
+               for number_format in (phonenumbers.PhoneNumberFormat.NATIONAL,
+                                     phonenumbers.PhoneNumberFormat.INTERNATIONAL))
+
+
+def _digit_group_breaks(formatted: str) -> set:
+    groups = [len(group) for group in re.findall(r'\d+', formatted)]
+    breaks = set()
+    remaining = 0
+    for length in reversed(groups[1:]):
+        remaining += length
+        breaks.add(remaining)
+    return breaks
+
+
+@stage_timer("addresses")
+def detect_addresses(text: str, countries: Iterable[str] = ADDRESS_COUNTRIES) -> List[Span]:
+    """
+    Find postal addresses using pyap.
+    
+    The text is normalized the way pyap expects while keeping a map from every
+    normalized character back to the original text, so each hit maps straight
+    to its original span.
+    
+    Args:
+        text: The text to scan
+        countries: Countries whose address formats are recognised
+        
+    Returns:
+        ADDRESS spans
+    """
+    normalized_text, offsets = _normalize_for_addresses(text)
+    if not normalized_text:
+        return []
+    
+    # A title-cased copy only helps when the input is all one case
+    process_texts = [normalized_text]
+    if not _has_mixed_case(text):
+        title_text = normalized_text.title()
+        if len(title_text) == len(normalized_text):
+            process_texts.append(title_text)
+    
+    spans = []
+    for country in countries:
+        parser = _address_parser(country)
+        for process_text in process_texts:
+            for address in parser.parse(process_text):
+                start = offsets[address.match_start]
+                end = offsets[address.match_end - 1] + 1
+                # pyap matches can run into the separator after the address
+                while end > start and (text[end - 1].isspace() or text[end - 1] == ","):
+                    end -= 1
+                spans.append((start, end, "ADDRESS"))
+    
+    return spans
+
+
+@functools.lru_cache(maxsize=None)
+def _address_parser(country: str) -> "AddressParser":
+    from pyap.parser import AddressParser
+    return AddressParser(country=country)
+
+
+def _has_mixed_case(text: str) -> bool:
+    return any(char.isupper() for char in text) and any(char.islower() for char in text)
+
+
+def _normalize_for_addresses(text: str) -> Tuple[str, List[int]]:
+    # Replace special characters with spaces, then apply pyap's own whitespace
+    # and comma normalization up front so pyap leaves the text unchanged and
+    # its match offsets line up with ours
+    normalized = _ADDRESS_SPECIAL_CHARS_PATTERN.sub(' ', text)
+    offsets = list(range(len(text)))
+    for pattern, replacement in _ADDRESS_NORMALIZATION:
+        normalized, offsets = _sub_with_offsets(pattern, replacement, normalized, offsets)
+    return normalized, offsets
+
+
+def _sub_with_offsets(pattern: re.Pattern, replacement: str, text: str,
+                      offsets: List[int]) -> Tuple[str, List[int]]:
+    # re.sub that also carries each character's original offset; replacement
+    # characters map to the start of the text they replaced
+    pieces = []
+    new_offsets = []
+    position = 0
+    for match in pattern.finditer(text):
+        pieces.append(text[position:match.start()])
+        new_offsets.extend(offsets[position:match.start()])
+        pieces.append(replacement)
+        new_offsets.extend([offsets[match.start()]] * len(replacement))
+        position = match.end()
+    if position == 0:
+        return text, offsets
+    pieces.append(text[position:])
+    new_offsets.extend(offsets[position:])
+    return "".join(pieces), new_offsets
+
+
+# Incremental re-scanning of edited text. The review step lets the user edit the
+# redacted text before it goes to Claude; rescan() checks each edit for pasted-back
+# personal information by running the detectors over the changed region only.
+
+# Characters of unchanged text re-scanned on each side of an edit, so that PII
+# straddling the edge of the edit is seen whole and NER has some context
+RESCAN_CONTEXT_CHARS = 80
+
+
+class ScanState(NamedTuple):
+    """What is known about a version of the text being edited."""
+    text: str
+    # Sensitive spans currently in the text
+    spans: List[Span]
+    # Sensitive strings found so far, by label (see redact_pdf's known_terms)
+    known_terms: Dict[str, List[str]]
+
+
+def start_scan(redacted_text: str, known_terms: Optional[Dict[str, Iterable[str]]] = None) -> ScanState:
+    """
+    Begin tracking edits to redact_pdf's output.
+    
+    Args:
+        redacted_text: Text returned by redact_pdf, assumed to be free of sensitive spans
+        known_terms: The strings redact_pdf removed, by label
+        
+    Returns:
+        State to pass to rescan()
+    """
+    return ScanState(redacted_text, [], {label: sorted(terms) for label, terms in (known_terms or {}).items()})
+
+
+def scan_text(text: str, known_terms: Optional[Dict[str, Iterable[str]]] = None,
+              spacy_model_name: str = DEFAULT_SPACY_MODEL) -> ScanState:
+    """
+    Run every detector over a whole text, for when there is no earlier state to build on.
+    
+    Args:
+        text: The text to scan
+        known_terms: Sensitive strings to look for as well, by label
+        spacy_model_name: Name of the spaCy model to use for NER
+        
+    Returns:
+        State to pass to rescan(), whose spans are everything found
+    """
+    terms = {label: set(values) for label, values in (known_terms or {}).items()}
+    spans = _detect_with_terms(text, terms, spacy_model_name)
+    return ScanState(text, spans, {label: sorted(values) for label, values in terms.items()})
+
+
+def rescan(state: ScanState, new_text: str,
+           spacy_model_name: str = DEFAULT_SPACY_MODEL,
+           context: int = RESCAN_CONTEXT_CHARS) -> Tuple[ScanState, List[Span]]:
+    """
+    Find personal information added by an edit, scanning only the part that changed.
+    
+    The old and new text are compared by their common prefix and suffix; the
+    detectors, plus a search for the known terms, then run over the changed region
+    and context characters either side. Spans outside that window are carried over
+    from the old state, shifted to their new offsets.
+    
+    Args:
+        state: State of the previous version (from start_scan, scan_text or rescan)
+        new_text: The edited text
+        spacy_model_name: Name of the spaCy model to use for NER
+        context: Characters of unchanged text to re-scan on each side of the edit
+        
+    Returns:
+        The new state, and the spans in the window that weren't already known
+    """
+    old_text = state.text
+    prefix = _common_prefix_length(old_text, new_text)
+    suffix = _common_suffix_length(old_text, new_text, prefix)
+    if prefix == len(old_text) == len(new_text):
+        return state, []
+    old_end, new_end = len(old_text) - suffix, len(new_text) - suffix
+    shift = new_end - old_end
+    
+    window_start = _word_start(new_text, max(0, prefix - context))
+    window_end = _word_end(new_text, min(len(new_text), new_end + context))
+    window = new_text[window_start:window_end]
+    
+    terms = {label: set(values) for label, values in state.known_terms.items()}
+    found = [(start + window_start, end + window_start, label)
+             for start, end, label in _detect_with_terms(window, terms, spacy_model_name,
+                                                         document_start=window_start == 0)]
+    
+    # Spans not wholly inside the window are carried over; those inside its
+    # context part are found again by the re-scan, so only the rest of what it
+    # finds is new
+    shifted = _shift_spans(state.spans, prefix, old_end, shift)
+    carried = [span for span in shifted if span[0] < window_start or span[1] > window_end]
+    previous = {(start, end) for start, end, _label in shifted}
+    new_spans = [span for span in found if (span[0], span[1]) not in previous
+                 and not any(start < span[1] and span[0] < end for start, end, _label in carried)]
+    
+    new_state = ScanState(new_text, merge_spans(carried + found),
+                          {label: sorted(values) for label, values in terms.items()})
+    return new_state, new_spans
+
+
+def _detect_with_terms(text: str, known_terms: Dict[str, Set[str]], spacy_model_name: str,
+                       document_start: bool = True) -> List[Span]:
+    """detect_pii plus a search for known terms; names found are added to known_terms."""
+    doc = _parse(text, spacy_model_name, DEFAULT_NAME_DETECTOR)
+    spans = detect_pii(text, doc, known_terms.setdefault("PERSON", set()), name_detector=DEFAULT_NAME_DETECTOR,
+                       spacy_model_name=spacy_model_name, document_start=document_start)
+    for label, terms in known_terms.items():
+        if label != "PERSON":
+            spans.extend(find_terms(text, terms, label))
+    return merge_spans(spans)
+
+
+def _collect_terms(text: str, spans: Iterable[Span], known_terms: Dict[str, Set[str]]) -> None:
+    for start, end, label in spans:
+        known_terms.setdefault(label, set()).add(text[start:end].strip())
+
+
+def _shift_spans(spans: Iterable[Span], old_start: int, old_end: int, shift: int) -> List[Span]:
+    # Spans untouched by an edit of old_start..old_end, at their offsets after it
+    return [(start, end, label) if end <= old_start else (start + shift, end + shift, label)
+            for start, end, label in spans if end <= old_start or start >= old_end]
+
+
+def _common_prefix_length(a: str, b: str) -> int:
+    # Binary search on slice comparisons, which run in C, rather than a
+    # character-by-character loop
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[low:middle] == b[low:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def _common_suffix_length(a: str, b: str, prefix: int) -> int:
+    # Length of the common suffix that doesn't overlap the common prefix
+    low, high = 0, min(len(a), len(b)) - prefix
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[len(a) - middle:len(a) - low] == b[len(b) - middle:len(b) - low]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def _word_start(text: str, index: int) -> int:
+    # Move index back to the start of the word it falls in
+    while index > 0 and not text[index - 1].isspace():
+        index -= 1
+    return index
+
+
+def _word_end(text: str, index: int) -> int:
+    # Move index forward to the end of the word it falls in
+    while index < len(text) and not text[index].isspace():
+        index += 1
+    return index
+
+
 def remove_names(text: str, nlp) -> str:
     """
     Remove person names using spaCy NER.
@@ -79,16 +1173,7 @@ def remove_names(text: str, nlp) -> str:
     Returns:
         Text with names removed
     """
-    doc = nlp(text)
-    redacted = text
-    
-    for ent in doc.ents:
-        if ent.label_ == "PERSON":
-            # Remove all occurrences with word boundaries
-            pattern = r'\b' + re.escape(ent.text) + r'\b'
-            redacted = re.sub(pattern, "", redacted)
-    
-    return redacted
+    return apply_spans(text, detect_names(text, nlp(text)))
 
 
 def remove_email_addresses(text: str) -> str:
@@ -101,9 +1186,7 @@ def remove_email_addresses(text: str) -> str:
     Returns:
         Text with email addresses removed
     """
-    email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-    redacted = re.sub(email_pattern, "", text)
-    return redacted
+    return apply_spans(text, detect_email_addresses(text))
 
 
 def remove_phone_numbers(text: str) -> str:
@@ -116,17 +1199,8 @@ def remove_phone_numbers(text: str) -> str:
     Returns:
         Text with phone numbers removed
     """
-    redacted = text
-    
-    # Search for phone numbers in multiple regions
-    for region in ["US", "GB", "CA", "AU", "IN"]:
-        for match in phonenumbers.PhoneNumberMatcher(redacted, region):
-            phone_number = match.raw_string
-            # Remove the specific match
-            start, end = match.start, match.end
-            redacted = redacted[:start] + redacted[end:]
-    
-    return redacted
+    return apply_spans(text, detect_phone_numbers(text))
+
 
 def remove_addresses(text: str) -> str:
     """
@@ -134,48 +1208,9 @@ def remove_addresses(text: str) -> str:
     
     Args:
         text: The text to redact
-        replacements: Dictionary to store replacements
         
     Returns:
         Text with addresses redacted
     """
+    return apply_spans(text, merge_spans(detect_addresses(text)))
 
-    redacted = text
-    
-    # First, create a normalized version for address detection
-    # Replace special characters with spaces
-    normalized_text = re.sub(r'[^\w\s,.]', ' ', text)
-    
-    # Find addresses for multiple countries
-    for country in ["US", "CA", "GB"]:
-        # Try with both original and normalized versions
-        for process_text in [normalized_text, normalized_text.title()]:
-            addresses = pyap.parse(process_text, country=country)
-            
-            for address in addresses:
-                address_text = address.full_address
-                
-                # Find the address in the original text
-                # This can be tricky since we normalized the text for detection
-                original_address = find_original_address(text, address_text)
-                
-                # Replace in the text - need to be careful with special chars in addresses
-                if original_address:
-                    pattern = re.escape(original_address)
-                    redacted = re.sub(pattern, "", redacted)
-    
-    return redacted
-
-def find_original_address(original_text, normalized_address):
-    """
-    Try to find the original address in the text based on the normalized version.
-    This is a simplistic approach and might need improvement for edge cases.
-    """
-    # Create a pattern from normalized address, allowing for different separators
-    parts = re.split(r'[\s,]+', normalized_address)
-    pattern = r'[^\w]*'.join(re.escape(part) for part in parts if part)
-    
-    matches = re.search(pattern, original_text, re.IGNORECASE)
-    if matches:
-        return matches.group(0)
-    return None
\ No newline at end of file
@@ -0,0 +1,239 @@
+"""
+Caching for Claude responses.
+
+A cache backend maps a key built by make_key() to the response text. Two
+backends are provided: MemoryResponseCache for a single process and
+SQLiteResponseCache for sharing responses between processes and restarts.
+Each backend also has async_get/async_set for coroutines; SQLite's run in a
+worker thread. SingleFlight (AsyncSingleFlight for coroutines) makes
+concurrent identical requests share one upstream call.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from cachetools import TTLCache
+
+DEFAULT_TTL_SECONDS = 60 * 60
+DEFAULT_MAX_ENTRIES = 256
+
+
+def make_key(**parts: Any) -> str:
+    """
+    Hash the inputs that determine a response.
+    
+    Args:
+        **parts: JSON-serialisable request inputs (model, system message, prompt, ...)
+        
+    Returns:
+        Hex digest to use as the cache key
+    """
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache(ABC):
+    """Interface of a response cache backend."""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response, or None if it is missing or expired."""
+
+    @abstractmethod
+    def set(self, key: str, value: str) -> None:
+        """Store a response."""
+
+    async def async_get(self, key: str) -> Optional[str]:
+        """get() for coroutines; it runs in a worker thread so blocking I/O stays off the event loop."""
+        return await asyncio.to_thread(self.get, key)
+
+    async def async_set(self, key: str, value: str) -> None:
+        """set() for coroutines; it runs in a worker thread so blocking I/O stays off the event loop."""
+        await asyncio.to_thread(self.set, key, value)
+
+
+class MemoryResponseCache(ResponseCache):
+    """In-process cache with per-entry TTL and LRU eviction."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl: float = DEFAULT_TTL_SECONDS):
+        self._cache = TTLCache(maxsize=max_entries, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            return self._cache.get(key)
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._cache[key] = value
+
+    # Nothing here blocks for long, so coroutines call it directly
+    async def async_get(self, key: str) -> Optional[str]:
+        return self.get(key)
+
+    async def async_set(self, key: str, value: str) -> None:
+        self.set(key, value)
+
+
+class SQLiteResponseCache(ResponseCache):
+    """SQLite-backed cache with per-entry TTL and least-recently-used eviction."""
+
+    def __init__(self, path: str, max_entries: int = DEFAULT_MAX_ENTRIES, ttl: float = DEFAULT_TTL_SECONDS):
+        self._path = path
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock, self._connect() as connection:
+            row = connection.execute(
+                "SELECT value FROM responses WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            if row is None:
+                return None
+            connection.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            return row[0]
+
+    def set(self, key: str, value: str) -> None:
+        now = time.time()
+        with self._lock, self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO responses (key, value, expires_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, value, now + self._ttl, now),
+            )
+            connection.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+            connection.execute(
+                "DELETE FROM responses WHERE key NOT IN "
+                "(SELECT key FROM responses ORDER BY last_used DESC LIMIT ?)",
+                (self._max_entries,),
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self._path, timeout=30)
+
+
+def cache_from_env() -> Optional[ResponseCache]:
+    """
+    Build the cache backend selected by the environment.
+    
+    RESPONSE_CACHE_BACKEND is "memory" (the default), "sqlite" or "none";
+    RESPONSE_CACHE_TTL, RESPONSE_CACHE_MAX_ENTRIES and RESPONSE_CACHE_PATH
+    tune it.
+    
+    Returns:
+        The configured backend, or None when caching is disabled
+    """
+    backend = os.environ.get("RESPONSE_CACHE_BACKEND", "memory").lower()
+    ttl = float(os.environ.get("RESPONSE_CACHE_TTL", DEFAULT_TTL_SECONDS))
+    max_entries = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+    if backend == "none":
+        return None
+    if backend == "sqlite":
+        path = os.environ.get("RESPONSE_CACHE_PATH", "claude_responses.sqlite3")
+        return SQLiteResponseCache(path, max_entries=max_entries, ttl=ttl)
+    if backend == "memory":
+        return MemoryResponseCache(max_entries=max_entries, ttl=ttl)
+    raise ValueError(f"Unknown RESPONSE_CACHE_BACKEND: {backend}")
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[str] = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Collapse concurrent calls for the same key into one."""
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[], str]) -> str:
+        """
+        Run fn, unless a call for the same key is already running.
+        
+        Args:
+            key: Identifies identical calls
+            fn: Produces the result
+            
+        Returns:
+            The result of fn, from this call or from the one already in flight
+            
+        Raises:
+            Whatever fn raised, in every caller that shared the call
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+        else:
+            try:
+                call.result = fn()
+            except BaseException as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines running on one event loop."""
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[str]]) -> str:
+        """
+        Await fn(), unless a call for the same key is already running.
+        
+        Args:
+            key: Identifies identical calls
+            fn: Coroutine function producing the result
+            
+        Returns:
+            The result of fn, from this call or from the one already in flight
+        """
+        future = self._calls.get(key)
+        if future is not None:
+            # shield: a waiter being cancelled mustn't cancel the shared call
+            return await asyncio.shield(future)
+
+        future = self._calls[key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark it retrieved in case nobody else was waiting
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
@@ -0,0 +1,87 @@
+"""
+Server-sent events for the streaming Claude routes, shared by privacv and privacv_asgi.
+
+Each streaming route responds with "chunk" events carrying ready-to-append
+HTML as Claude writes (or "section" events from the fan-out review), then a
+"done" event, or an "error" event if the call fails part way. These
+generators produce the event text; each app wraps them in its own framework's
+streaming response with SSE_HEADERS.
+"""
+import json
+
+from claude_utils import async_clean_claude_stream, clean_claude_response, clean_claude_stream
+
+SSE_MEDIA_TYPE = "text/event-stream"
+# Keep proxies (nginx in particular) from buffering the stream
+SSE_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+
+def sse_event(event, data):
+    """Format one server-sent event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def sse_chunks(chunks, on_complete=None, on_error=None):
+    """
+    Turn text chunks into "chunk" events, then "done" (or "error").
+
+    Args:
+        chunks: Iterator over raw Markdown text from Claude
+        on_complete: Called after the last chunk, before the "done" event
+        on_error: Called if the stream fails, before the "error" event
+    """
+    try:
+        for html in clean_claude_stream(chunks):
+            yield sse_event('chunk', {'html': html})
+        if on_complete is not None:
+            on_complete()
+        yield sse_event('done', {'success': True})
+    except Exception as e:
+        print(e)
+        if on_error is not None:
+            on_error()
+        yield sse_event('error', {'error': str(e), 'success': False})
+
+
+async def async_sse_chunks(chunks, on_complete=None, on_error=None):
+    """
+    Async version of sse_chunks.
+
+    Args:
+        chunks: Async iterator over raw Markdown text from Claude
+        on_complete: Coroutine function awaited after the last chunk, before the "done" event
+        on_error: Coroutine function awaited if the stream fails, before the "error" event
+    """
+    try:
+        async for html in async_clean_claude_stream(chunks):
+            yield sse_event('chunk', {'html': html})
+        if on_complete is not None:
+            await on_complete()
+        yield sse_event('done', {'success': True})
+    except Exception as e:
+        print(e)
+        if on_error is not None:
+            await on_error()
+        yield sse_event('error', {'error': str(e), 'success': False})
+
+
+def sse_sections(sections):
+    """Turn (section, text) pairs from the fan-out review into "section" events, then "done" (or "error")."""
+    try:
+        for section, text in sections:
+            yield sse_event('section', {'section': section, 'html': clean_claude_response(text)})
+        yield sse_event('done', {'success': True})
+    except Exception as e:
+        print(e)
+        yield sse_event('error', {'error': str(e), 'success': False})
+
+
+async def async_sse_sections(sections):
+    """Async version of sse_sections, for an async iterator of (section, text) pairs."""
+    try:
+        async for section, text in sections:
+            yield sse_event('section', {'section': section, 'html': clean_claude_response(text)})
+        yield sse_event('done', {'success': True})
+    except Exception as e:
+        print(e)
+        yield sse_event('error', {'error': str(e), 'success': False})
@@ -0,0 +1,56 @@
+// Reads the server-sent events of the /stream and /sections routes (see sse.py).
+//
+// POSTs body to url and calls handlers[event] with the data of every "chunk" or
+// "section" event as it arrives. Resolves once the "done" event comes, and
+// rejects on an "error" event, or if the route answered with JSON instead of a
+// stream (e.g. a 400 for a missing field).
+async function postEvents(url, body, handlers) {
+    const response = await fetch(url, {
+        method: 'POST',
+        body: body
+    });
+    if (!(response.headers.get('Content-Type') || '').startsWith('text/event-stream')) {
+        const data = await response.json();
+        throw new Error(data.error || 'Request failed');
+    }
+
+    const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+    let buffer = '';
+    while (true) {
+        const {value, done} = await reader.read();
+        if (done) {
+            throw new Error('The response ended before it was complete');
+        }
+        buffer += value;
+        // Events are separated by a blank line
+        let end;
+        while ((end = buffer.indexOf('\n\n')) !== -1) {
+            const event = parseEvent(buffer.slice(0, end));
+            buffer = buffer.slice(end + 2);
+            if (event.name === 'done') {
+                reader.cancel();
+                return event.data;
+            }
+            if (event.name === 'error') {
+                reader.cancel();
+                throw new Error(event.data.error || 'Request failed');
+            }
+            if (handlers[event.name]) {
+                handlers[event.name](event.data);
+            }
+        }
+    }
+}
+
+function parseEvent(text) {
+    let name = 'message';
+    const data = [];
+    for (const line of text.split('\n')) {
+        if (line.startsWith('event:')) {
+            name = line.slice(6).trim();
+        } else if (line.startsWith('data:')) {
+            data.push(line.slice(5).trimStart());
+        }
+    }
+    return {name: name, data: JSON.parse(data.join('\n'))};
+}
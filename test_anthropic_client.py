@@ -0,0 +1,66 @@
+# Checks that Claude calls share one pooled connection, using a local
+# stand-in for the Messages API instead of the real one
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import anthropic_client
+from claude_utils import get_full_resume_review
+from mock_interview_integration import conduct_mock_interview
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep connections open between requests
+
+    def do_POST(self):
+        self.server.connections.add(self.client_address)
+        self.rfile.read(int(self.headers["Content-Length"]))
+        body = json.dumps({
+            "id": "msg_standin",
+            "type": "message",
+            "role": "assistant",
+            "model": "claude-3-7-sonnet-20250219",
+            "content": [{"type": "text", "text": "Tell me about a project you led."}],
+            "stop_reason": "end_turn",
+            "stop_sequence": None,
+            "usage": {"input_tokens": 10, "output_tokens": 8},
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def test_connections_are_reused_across_turns(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    server.connections = set()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setenv("ANTHROPIC_BASE_URL", f"http://127.0.0.1:{server.server_port}")
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+    anthropic_client.reset_client()
+    try:
+        get_full_resume_review("Redacted resume text", "Job description")
+        turn = conduct_mock_interview("Redacted resume text", "Job description")
+        for answer in ["I built a data pipeline.", "It saved ten hours a week."]:
+            turn = conduct_mock_interview("Redacted resume text", "Job description",
+                                          answer, turn["interview_state"])
+
+        assert len(turn["interview_state"]["messages"]) == 6
+        # one review and three interview turns over a single connection
+        assert len(server.connections) == 1
+    finally:
+        anthropic_client.reset_client()
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_connections_are_reused_across_turns(monkeypatch)
+    print("ok")
@@ -0,0 +1,48 @@
+# Checks on InterviewStore's transcript log and file permissions
+import os
+import stat
+
+from interview_store import InterviewStore
+from mock_interview_integration import new_interview_state
+
+
+def usage(input_tokens):
+    return {"input_tokens": input_tokens, "output_tokens": 1, "cache_creation_input_tokens": 0,
+            "cache_read_input_tokens": 0, "latency_ms": 5}
+
+
+def test_load_starts_after_summarized_messages(tmp_path):
+    store = InterviewStore(str(tmp_path / "store"))
+    interview_id = store.create("Redacted resume text", "Job description", new_interview_state())
+    for turn in range(8):
+        _, _, state = store.load(interview_id)
+        state["messages"] += [{"role": "user", "content": f"answer {turn}"},
+                              {"role": "assistant", "content": f"question {turn}"}]
+        state["usage"].append(usage(turn))
+        if turn in (3, 6):
+            # What compact_interview_state does: fold all but the last turn
+            folded = len(state["messages"]) - 2
+            state["summary"] = f"Summary up to turn {turn}"
+            state["messages"] = state["messages"][folded:]
+            state["summarized_messages"] += folded
+        store.save(interview_id, state)
+
+    resume_text, _, state = store.load(interview_id)
+    assert resume_text == "Redacted resume text"
+    assert [message["content"] for message in state["messages"]] == \
+        ["answer 6", "question 6", "answer 7", "question 7"]
+    assert state["summary"] == "Summary up to turn 6"
+    assert state["summarized_messages"] == 12
+    # Only the records after the last summarized message are read back
+    assert [entry["input_tokens"] for entry in state["usage"]] == [5, 6, 7]
+    meta = store._read_meta(interview_id)
+    assert 0 < meta.active_offset < os.path.getsize(store._transcript_path(interview_id))
+
+
+def test_store_is_private_to_its_owner(tmp_path):
+    store = InterviewStore(str(tmp_path / "store"))
+    interview_id = store.create("Redacted resume text", "Job description", new_interview_state())
+    for path in (store.root, store._interview_dir(interview_id)):
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o700
+    for path in (store._transcript_path(interview_id), store._meta_path(interview_id)):
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
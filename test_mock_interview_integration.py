@@ -0,0 +1,58 @@
+# Checks on interview compaction, with a fake client in place of the Messages API
+from types import SimpleNamespace
+
+import mock_interview_integration
+from mock_interview_integration import conduct_mock_interview
+
+USAGE = SimpleNamespace(input_tokens=10, output_tokens=8,
+                        cache_creation_input_tokens=0, cache_read_input_tokens=0)
+
+
+class FakeMessages:
+    def __init__(self, summary_fails):
+        self.summary_fails = summary_fails
+        self.summary_calls = 0
+
+    def create(self, **request):
+        if "system" not in request:  # only the summary request has no system prompt
+            self.summary_calls += 1
+            if self.summary_fails:
+                raise RuntimeError("summary request failed")
+            text = "Summary of the interview so far."
+        else:
+            text = "Tell me about a project you led. " * 10
+        return SimpleNamespace(content=[SimpleNamespace(text=text)], usage=USAGE)
+
+
+def run_interview(monkeypatch, messages, turns):
+    monkeypatch.setattr(mock_interview_integration, "get_client", lambda: SimpleNamespace(messages=messages))
+    monkeypatch.setattr(mock_interview_integration, "INTERVIEW_SUMMARY_THRESHOLD_TOKENS", 200)
+    monkeypatch.setattr(mock_interview_integration, "INTERVIEW_KEEP_TURNS", 2)
+    monkeypatch.setattr(mock_interview_integration, "INTERVIEW_SUMMARY_MIN_TOKENS", 150)
+    turn = conduct_mock_interview("Redacted resume text", "Job description")
+    for _ in range(turns):
+        turn = conduct_mock_interview("Redacted resume text", "Job description",
+                                      "I built a data pipeline. " * 10, turn["interview_state"])
+    return turn
+
+
+def test_failed_summary_keeps_the_turn(monkeypatch):
+    messages = FakeMessages(summary_fails=True)
+    turn = run_interview(monkeypatch, messages, turns=6)
+
+    assert turn["success"]
+    state = turn["interview_state"]
+    # Nothing was folded, and every turn past the threshold tried again
+    assert state["summarized_messages"] == 0
+    assert len(state["messages"]) == 14
+    assert messages.summary_calls > 1
+
+
+def test_summary_waits_for_enough_turns_to_fold(monkeypatch):
+    messages = FakeMessages(summary_fails=False)
+    turn = run_interview(monkeypatch, messages, turns=10)
+
+    state = turn["interview_state"]
+    assert state["summary"] == "Summary of the interview so far."
+    # Each summary folds at least INTERVIEW_SUMMARY_MIN_TOKENS, not one turn at a time
+    assert messages.summary_calls < state["summarized_messages"] // 2
@@ -0,0 +1,109 @@
+# Checks on redactr's detectors that don't need a spaCy model
+import time
+
+import pytest
+
+import redactr
+
+# A table flattened by extraction: one long run of small digit groups
+TABLE = " ".join(str(i % 97) for i in range(800))
+
+
+def test_phone_number_after_long_digit_run_is_found():
+    text = f"Scores: {TABLE}. Call 617 253 1000"
+    spans = redactr.detect_phone_numbers(text)
+    assert [text[start:end] for start, end, _ in spans] == ["617 253 1000"]
+
+
+@pytest.mark.parametrize("number", [
+    "617\u2013253\u20131000",  # en dash
+    "617\u2014253\u20141000",  # em dash
+    "617\u2011253\u20111000",  # non-breaking hyphen
+    "617\xa0253\xa01000",
+    "+44\xa020\xa07946\xa00958",
+    "617-253-1000x123",
+    "617-253-1000ext12",
+    "617-253-1000 ext. 12",
+])
+def test_phone_number_as_pdf_extraction_writes_it(number):
+    # Separators and extensions as they come out of PDFs; the extension is redacted too
+    text = f"Phone: {number}. Email below"
+    spans = redactr.detect_phone_numbers(text)
+    assert [text[start:end] for start, end, _ in spans] == [number]
+
+
+def test_phone_scan_is_linear_in_long_digit_runs():
+    # With no regions to validate against, what's left is the scan itself,
+    # which used to recount every stretch of groups and took seconds here
+    started = time.perf_counter()
+    assert redactr.detect_phone_numbers(" ".join([TABLE] * 4), regions=()) == []
+    assert time.perf_counter() - started < 1
+
+
+def test_header_name_only_at_document_start():
+    # Words followed by contact details only count as the resume's header name
+    # when the text really starts the document
+    excerpt = "Research Supervisor, 617-253-1000. Contact for more."
+    assert redactr.detect_names_fast(excerpt) != []
+    assert redactr.detect_names_fast(excerpt, document_start=False) == []
+
+
+# rescan() with the gazetteer name detector, which needs no spaCy model. The
+# filler keeps the spans further from each edit than the re-scanned context.
+FILLER = "Built data pipelines and dashboards for the analytics group. " * 4
+RESUME = "Summary\n" + FILLER + "Contact: 617-253-1000\n" + FILLER + "Email: cv@example.com\n"
+
+
+@pytest.fixture
+def resume_scan(monkeypatch):
+    monkeypatch.setattr(redactr, "DEFAULT_NAME_DETECTOR", "gazetteer")
+    return redactr.scan_text(RESUME, {"PERSON": ["Xochiquetzal Brannigan"]})
+
+
+def span_texts(text, spans):
+    return [text[start:end] for start, end, _ in spans]
+
+
+def assert_matches_full_scan(state):
+    # Carried-over and re-found spans together are what a fresh scan finds
+    assert state.spans == redactr.scan_text(state.text, state.known_terms).spans
+
+
+def test_rescan_finds_inserted_phone_number(resume_scan):
+    at = RESUME.index("Email")
+    text = RESUME[:at] + "Or call +44 20 7946 0958.\n" + RESUME[at:]
+    state, new_spans = redactr.rescan(resume_scan, text)
+    assert span_texts(text, new_spans) == ["+44 20 7946 0958"]
+    assert span_texts(text, state.spans) == ["617-253-1000", "+44 20 7946 0958", "cv@example.com"]
+    assert_matches_full_scan(state)
+
+
+def test_rescan_shifts_spans_after_a_deletion(resume_scan):
+    text = RESUME.replace("Built data pipelines and dashboards for the analytics group. ", "", 1)
+    state, new_spans = redactr.rescan(resume_scan, text)
+    assert new_spans == []
+    assert span_texts(text, state.spans) == ["617-253-1000", "cv@example.com"]
+    assert_matches_full_scan(state)
+
+
+def test_rescan_edit_next_to_known_span_finds_nothing_new(resume_scan):
+    text = RESUME.replace("Contact:", "Mobile phone:")
+    state, new_spans = redactr.rescan(resume_scan, text)
+    assert new_spans == []
+    assert span_texts(text, state.spans) == ["617-253-1000", "cv@example.com"]
+    assert_matches_full_scan(state)
+
+
+def test_rescan_reports_an_edited_number_again(resume_scan):
+    text = RESUME.replace("617-253-1000", "617-253-1001")
+    state, new_spans = redactr.rescan(resume_scan, text)
+    assert span_texts(text, new_spans) == ["617-253-1001"]
+    assert_matches_full_scan(state)
+
+
+def test_rescan_finds_pasted_known_term(resume_scan):
+    at = RESUME.index("Contact")
+    text = RESUME[:at] + "Reference: Xochiquetzal Brannigan. " + RESUME[at:]
+    state, new_spans = redactr.rescan(resume_scan, text)
+    assert span_texts(text, new_spans) == ["Xochiquetzal Brannigan"]
+    assert_matches_full_scan(state)
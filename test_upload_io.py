@@ -0,0 +1,31 @@
+# Checks that uploads are exposed without copies, in memory and once spilled to disk
+from upload_io import UploadBuffer, spool_file
+
+DATA = bytes(range(256)) * 64
+
+
+def fill_spool(max_size):
+    spool = spool_file(max_size)
+    for start in range(0, len(DATA), 1000):
+        spool.write(DATA[start:start + 1000])
+    spool.seek(0)
+    return spool
+
+
+def test_small_upload_is_read_from_memory():
+    with fill_spool(len(DATA) + 1) as spool, UploadBuffer.load(spool) as upload:
+        assert not spool.rolled
+        assert upload.view == DATA
+        # Both views are of the same memory
+        with spool.file.getbuffer() as memory:
+            memory[0] = 255
+        assert upload.view[0] == 255
+        assert upload.open().read()[1:] == DATA[1:]
+
+
+def test_large_upload_is_mapped_from_its_file():
+    with fill_spool(4096) as spool, UploadBuffer.load(spool) as upload:
+        assert spool.rolled
+        assert upload.size == len(DATA)
+        assert upload.view == DATA
+        assert upload.open().read() == DATA
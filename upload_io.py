@@ -0,0 +1,179 @@
+"""
+Buffers for uploaded PDFs and chunking for downloads, without temp-file round trips.
+
+An upload is read once, into an UploadSpool that stays in memory up to
+UPLOAD_SPOOL_MAX_BYTES and moves to an unnamed temporary file beyond that.
+UploadBuffer then exposes those bytes two ways without copying them: as a
+buffer (the BytesIO's own memory, or an mmap of the spilled file) for hashing
+and cache keys, and as a seekable file for PdfReader.
+
+Downloads are served from the text already in memory; large ones are sent as
+a stream of encoded chunks rather than one encoded copy.
+"""
+import io
+import mmap
+import os
+import tempfile
+from typing import BinaryIO, Iterator, Optional, Union
+
+# Uploads larger than this are spooled to disk (and memory-mapped) instead of held in memory
+SPOOL_MAX_BYTES = int(os.environ.get("UPLOAD_SPOOL_MAX_BYTES", 1024 * 1024))
+# Downloads of at least this many characters are streamed in chunks of DOWNLOAD_CHUNK_CHARS
+STREAM_DOWNLOAD_MIN_CHARS = 256 * 1024
+DOWNLOAD_CHUNK_CHARS = 64 * 1024
+# Size of the reads when copying a stream into a spool
+COPY_CHUNK_BYTES = 64 * 1024
+
+
+class UploadSpool:
+    """
+    A writable file for one upload: a BytesIO until it grows past max_size, then
+    an unnamed temporary file.
+
+    Works like tempfile.SpooledTemporaryFile, except that the file currently
+    holding the data is public (file, rolled), so UploadBuffer can use it
+    without relying on the stdlib class's private attributes.
+    """
+
+    def __init__(self, max_size: int = SPOOL_MAX_BYTES):
+        self.max_size = max_size
+        self.file: Union[io.BytesIO, BinaryIO] = io.BytesIO()
+        self.rolled = False
+
+    def rollover(self) -> None:
+        """Move the data to a temporary file, if it isn't in one already."""
+        if self.rolled:
+            return
+        file = tempfile.TemporaryFile()
+        file.write(self.file.getbuffer())
+        file.seek(self.file.tell())
+        self.file.close()
+        self.file = file
+        self.rolled = True
+
+    def write(self, data) -> int:
+        written = self.file.write(data)
+        if not self.rolled and self.file.tell() > self.max_size:
+            self.rollover()
+        return written
+
+    def read(self, size: int = -1) -> bytes:
+        return self.file.read(size)
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        return self.file.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self.file.tell()
+
+    def flush(self) -> None:
+        self.file.flush()
+
+    def fileno(self) -> int:
+        return self.file.fileno()
+
+    def readable(self) -> bool:
+        return True
+
+    def writable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    @property
+    def closed(self) -> bool:
+        return self.file.closed
+
+    def close(self) -> None:
+        self.file.close()
+
+    def __enter__(self) -> "UploadSpool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def spool_file(max_size: int = SPOOL_MAX_BYTES) -> UploadSpool:
+    """A writable spool for an upload, for a form parser to stream the file into."""
+    return UploadSpool(max_size)
+
+
+class UploadBuffer:
+    """
+    The bytes of one upload, as a zero-copy buffer and as a seekable file.
+
+    Use it as a context manager, or call close(), to release the buffer and
+    mapping before the spool is closed.
+    """
+
+    def __init__(self, spool: Union[UploadSpool, io.BytesIO, bytes], owned: bool = False):
+        """
+        Args:
+            spool: A spool holding the complete upload (see spool_file), a BytesIO,
+                or bytes
+            owned: Close the spool in close(); otherwise whoever passed it in does
+        """
+        self._spool = spool
+        self._owned = owned
+        self._map: Optional[mmap.mmap] = None
+        if isinstance(spool, bytes):
+            self._file = io.BytesIO(spool)  # shares spool's memory until written to
+            self.view = memoryview(spool)
+            return
+        # An UploadSpool keeps its data in a BytesIO until it rolls over to a real file
+        spooled = isinstance(spool, UploadSpool)
+        self._file = spool.file if spooled else spool
+        if spooled and spool.rolled:
+            spool.flush()
+            size = os.fstat(spool.fileno()).st_size
+            if size:
+                self._map = mmap.mmap(spool.fileno(), 0, access=mmap.ACCESS_READ)
+                self._file = self._map
+            self.view = memoryview(self._map if self._map is not None else b"")
+        else:
+            self.view = self._file.getbuffer()
+
+    @classmethod
+    def from_stream(cls, stream: BinaryIO, max_size: int = SPOOL_MAX_BYTES) -> "UploadBuffer":
+        """Copy a stream into a new spool, for sources that weren't spooled as they arrived."""
+        spool = spool_file(max_size)
+        while chunk := stream.read(COPY_CHUNK_BYTES):
+            spool.write(chunk)
+        return cls(spool, owned=True)
+
+    @classmethod
+    def load(cls, source: Union["UploadBuffer", BinaryIO, bytes]) -> "UploadBuffer":
+        """Wrap bytes or a spool, or copy any other stream into one; an UploadBuffer is returned as is."""
+        if isinstance(source, (UploadBuffer, bytes, io.BytesIO, UploadSpool)):
+            return source if isinstance(source, UploadBuffer) else cls(source)
+        return cls.from_stream(source)
+
+    @property
+    def size(self) -> int:
+        return self.view.nbytes
+
+    def open(self) -> BinaryIO:
+        """The upload as a file positioned at its start; every call returns the same file."""
+        self._file.seek(0)
+        return self._file
+
+    def close(self) -> None:
+        self.view.release()
+        if self._map is not None:
+            self._map.close()
+        if self._owned:
+            self._spool.close()
+
+    def __enter__(self) -> "UploadBuffer":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def iter_encoded(text: str, chunk_chars: int = DOWNLOAD_CHUNK_CHARS) -> Iterator[bytes]:
+    """UTF-8 encode text a chunk at a time, for streaming it as a response body."""
+    for start in range(0, len(text), chunk_chars):
+        yield text[start:start + chunk_chars].encode("utf-8")